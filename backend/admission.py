@@ -0,0 +1,175 @@
+"""
+准入控制：限制同时处理的投票提交数，超出部分在有界队列中按先后顺序等待
+
+- 正在处理的请求达到上限时，新请求排队；队列已满或排队超时立即返回 503 + Retry-After
+- 单个客户端（X-Client-ID 请求头，缺省为来源地址）的处理中加排队请求数超过上限时返回 429
+- 处理中与排队的请求数通过 /metrics 暴露（voting_admission_in_flight / voting_admission_queue_depth）
+
+请求线程不再堆积在存储锁上，排队时间有上限，过载时客户端很快得到可重试的响应。
+
+用法：
+    admission.install(app, AdmissionController(), endpoints=("submit_vote", "submit_batch"))
+"""
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Event, Lock
+from typing import Dict, Iterable, Optional
+
+from backend.config import (
+    ADMISSION_MAX_IN_FLIGHT, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT, ADMISSION_PER_CLIENT
+)
+from backend.metrics import (
+    ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTS, ADMISSION_QUEUE_SECONDS
+)
+
+# 平均处理时间的指数滑动平均系数
+_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """请求未被接纳"""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """有界队列加并发上限"""
+
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, queue_size: int = ADMISSION_QUEUE_SIZE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT, per_client: int = ADMISSION_PER_CLIENT):
+        """
+        :param max_in_flight: 同时处理的请求数上限
+        :param queue_size: 排队请求数上限
+        :param queue_timeout: 最长排队时间（秒）
+        :param per_client: 单个客户端处理中加排队的请求数上限，0 表示不限制
+        """
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.per_client = per_client
+        self._lock = Lock()
+        self._in_flight = 0
+        self._waiters = deque()
+        self._clients: Dict[str, int] = {}
+        self._service_seconds = 0.05  # 平均处理时间估计，用于计算 Retry-After
+
+    def acquire(self, client_id: Optional[str] = None):
+        """
+        获取处理名额，需要时排队等待
+        :raises AdmissionRejected: 客户端超限（429）、队列已满或排队超时（503）
+        """
+        with self._lock:
+            if self.per_client and self._clients.get(client_id, 0) >= self.per_client:
+                raise self._reject(429, "client_limit")
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                self._add_client(client_id, 1)
+                self._update_gauges()
+                return
+            if len(self._waiters) >= self.queue_size:
+                raise self._reject(503, "queue_full")
+            waiter = Event()
+            self._waiters.append(waiter)
+            self._add_client(client_id, 1)
+            self._update_gauges()
+
+        start = time.perf_counter()
+        granted = waiter.wait(self.queue_timeout)
+        ADMISSION_QUEUE_SECONDS.observe(time.perf_counter() - start)
+        if granted:
+            return
+        with self._lock:
+            # 超时与被唤醒可能同时发生，以加锁后的状态为准
+            if waiter.is_set():
+                return
+            self._waiters.remove(waiter)
+            self._add_client(client_id, -1)
+            self._update_gauges()
+            raise self._reject(503, "queue_timeout")
+
+    def release(self, client_id: Optional[str] = None, service_seconds: float = None):
+        """归还名额，有排队的请求时直接交给队首"""
+        with self._lock:
+            self._add_client(client_id, -1)
+            if service_seconds is not None:
+                self._service_seconds += _EWMA_ALPHA * (service_seconds - self._service_seconds)
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self._in_flight -= 1
+            self._update_gauges()
+
+    @contextmanager
+    def admit(self, client_id: Optional[str] = None):
+        self.acquire(client_id)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(client_id, time.perf_counter() - start)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "max_in_flight": self.max_in_flight,
+                "queue_size": self.queue_size,
+            }
+
+    def _reject(self, status: int, reason: str) -> AdmissionRejected:
+        """构造拒绝异常（调用方需持有 _lock）"""
+        ADMISSION_REJECTS.inc(reason=reason)
+        # 按当前队列长度和平均处理时间估计多久后会有空闲名额
+        backlog = len(self._waiters) + 1
+        retry_after = max(1, math.ceil(backlog * self._service_seconds / max(self.max_in_flight, 1)))
+        return AdmissionRejected(status, reason, retry_after)
+
+    def _add_client(self, client_id, delta: int):
+        count = self._clients.get(client_id, 0) + delta
+        if count > 0:
+            self._clients[client_id] = count
+        else:
+            self._clients.pop(client_id, None)
+
+    def _update_gauges(self):
+        ADMISSION_IN_FLIGHT.set(self._in_flight)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+
+def install(app, controller: AdmissionController, endpoints: Iterable[str]):
+    """为 Flask 应用的指定视图函数启用准入控制"""
+    from flask import jsonify, request
+
+    endpoints = frozenset(endpoints)
+
+    @app.before_request
+    def _admit():
+        if request.endpoint not in endpoints:
+            return None
+        client_id = request.headers.get("X-Client-ID") or request.remote_addr
+        try:
+            controller.acquire(client_id)
+        except AdmissionRejected as e:
+            message = "Too many concurrent requests" if e.status == 429 else "Server busy"
+            response = jsonify({"error": message, "reason": e.reason})
+            response.status_code = e.status
+            response.headers["Retry-After"] = str(e.retry_after)
+            return response
+        request.environ["voting.admission"] = (client_id, time.perf_counter())
+        return None
+
+    @app.teardown_request
+    def _release(exc):
+        admitted = request.environ.pop("voting.admission", None)
+        if admitted is not None:
+            client_id, start = admitted
+            controller.release(client_id, time.perf_counter() - start)
+
+    return app
@@ -1,50 +1,108 @@
 "主应用"
+import asyncio
 import requests
 import json
+import threading
 import time
-from typing import Dict
+from typing import Callable, Dict, List, Optional
 import os
-from .config import SHAREHOLDERS_FILE
-from backend.models.vote import Voter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .config import SHAREHOLDERS_FILE, AUTH_SERVER_PORT, VOTER_SERVER_PORT, TALLY_SERVER_PORT
+from backend.auth.registry import ShareholderRegistry
+from backend.crypto.elgamal import PublicKey
+from backend.vote.weighted_encrypt import encrypt_ballot, public_key_from_dict
+
+# (连接超时, 读取超时)，单位秒
+DEFAULT_TIMEOUT = (3.05, 30)
+
+
+class _SubmitSafeRetry(Retry):
+    """
+    按方法区分可重试的状态码：
+    - GET 是幂等的，502/504 也可以重试
+    - POST 只在 429/503 时重试：这是服务器准入控制在处理请求之前的拒绝；
+      502/504 由网关返回时服务器可能已经提交了投票，重发会被当作重复投票拒绝
+    """
+    POST_RETRY_STATUS = frozenset({429, 503})
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method.upper() == "POST" and status_code not in self.POST_RETRY_STATUS:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def create_session(pool_size: int = 32, retries: int = 3) -> requests.Session:
+    """
+    创建带连接池的 HTTP 会话（keep-alive 复用 TCP 连接）
+    连接失败时请求未发出，总是重试；GET 对 429/502/503/504 重试，POST 只对 429/503 重试，
+    服务器准入控制返回的 Retry-After 会被遵守。读取超时不重试，避免重复提交
+    """
+    retry = _SubmitSafeRetry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        backoff_factor=0.2,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 
 class VoterClient:
-    def __init__(self):
-        """初始化客户端"""
-        self.auth_url = "http://localhost:5001"  # 认证服务器
-        self.vote_url = "http://localhost:5000"  # 投票服务器
-        self.tally_url = "http://localhost:5002"  # 计票服务器
+    def __init__(self, session: requests.Session = None, timeout=DEFAULT_TIMEOUT,
+                 registry: ShareholderRegistry = None, verbose: bool = True):
+        """
+        初始化客户端
+        :param session: 共享的 HTTP 会话，默认新建一个带连接池的会话
+        :param timeout: 请求超时
+        :param registry: 共享的股东名册，默认首次登录时打开
+        :param verbose: 是否打印过程信息（批量代理投票时关闭）
+        """
+        self.auth_url = f"http://localhost:{AUTH_SERVER_PORT}"  # 认证服务器
+        self.vote_url = f"http://localhost:{VOTER_SERVER_PORT}"  # 投票服务器
+        self.tally_url = f"http://localhost:{TALLY_SERVER_PORT}"  # 计票服务器
+        self.session = session or create_session()
+        self.timeout = timeout
+        self.verbose = verbose
         self.credential = None
         self.voter_info = None
+        self.last_receipt = None
+        self._public_key = None
         self.shareholders_file = SHAREHOLDERS_FILE
+        self._registry = registry
+        
+    @property
+    def registry(self) -> ShareholderRegistry:
+        """股东名册（首次登录时打开）"""
+        if self._registry is None:
+            self._registry = ShareholderRegistry(seed_file=self.shareholders_file)
+        return self._registry
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
         
     def login(self, voter_id: str) -> bool:
         """股东登录"""
         try:
-            if not os.path.exists(self.shareholders_file):
-                print(f"股东信息文件不存在: {self.shareholders_file}")
+            voter = self.registry.get(voter_id)
+            if voter is None:
+                self._log("无效的股东ID")
                 return False
                 
-            with open(self.shareholders_file, "r") as f:
-                shareholders = json.load(f)
-            
-            if voter_id not in shareholders["shareholders"]:
-                print("无效的股东ID")
-                return False
-                
-            # 将JSON数据转换为Voter对象
-            data = shareholders["shareholders"][voter_id]
-            self.voter_info = Voter(
-                name=data["name"],
-                uuid=data["uuid"],
-                voter_id=data["voter_id"],
-                voter_type=data["voter_type"],
-                weight=data["weight"]
-            )
-            print(f"欢迎, {self.voter_info.name}!")
+            self.voter_info = voter
+            self._log(f"欢迎, {self.voter_info.name}!")
             return True
             
         except Exception as e:
-            print(f"登录失败: {e}")
+            self._log(f"登录失败: {e}")
             return False
     
     def request_credential(self) -> bool:
@@ -65,61 +123,47 @@ class VoterClient:
                 }
             }
             
-            print(f"请求凭证数据: {request_data}")
+            self._log(f"请求凭证数据: {request_data}")
             
             # 3. 发送请求
-            response = requests.post(
+            response = self.session.post(
                 f"{self.auth_url}/auth/request_credential",
-                json=request_data
+                json=request_data,
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
                 self.credential = response.json()
-                print(f"获取到凭证: {self.credential}")
+                self._log(f"获取到凭证: {self.credential}")
                 return True
             else:
                 error_msg = response.json().get('error', '未知错误')
-                print(f"请求凭证失败: {error_msg}")
+                self._log(f"请求凭证失败: {error_msg}")
                 return False
                 
         except Exception as e:
-            print(f"请求凭证失败: {e}")
+            self._log(f"请求凭证失败: {e}")
             return False
     
     def cast_vote(self, vote: int) -> bool:
         """提交投票"""
         if vote not in (0, 1):
-            print("投票值必须是0或1")
+            self._log("投票值必须是0或1")
             return False
             
         if not self.credential:
-            print("未获取投票凭证，请先登录并获取凭证")
+            self._log("未获取投票凭证，请先登录并获取凭证")
             return False
             
         try:
-            print("正在加密投票...")
-            print(f"投票值: {vote}, 权重: {self.voter_info.weight}")
-            
-            # 1. 加密投票数据
-            encrypt_request = {
-                "vote": vote,
-                "weight": self.voter_info.weight
-            }
-            print(f"发送加密请求: {encrypt_request}")
-            
-            response = requests.post(
-                f"{self.tally_url}/encrypt",
-                json=encrypt_request
-            )
+            self._log("正在本地加密投票...")
+            weight = int(self.credential["weight"])
+            self._log(f"投票值: {vote}, 权重: {weight}")
             
-            if response.status_code != 200:
-                error_msg = response.json().get('error', '未知错误')
-                print(f"投票加密失败: {error_msg}")
-                print(f"服务器响应: {response.text}")
-                return False
-                
-            encrypted_vote = response.json()
-            print(f"投票已加密: {encrypted_vote}")
+            # 1. 用选举公钥在本地加密投票并生成证明（明文不离开客户端），附上凭证的权重签名
+            encrypted_vote = encrypt_ballot(self.get_public_key(), vote, weight,
+                                            self.credential.get("weight_signature"))
+            self._log(f"投票已加密: {encrypted_vote}")
             
             # 2. 构建完整的投票请求
             vote_request = {
@@ -127,34 +171,153 @@ class VoterClient:
                 "credential": self.credential,
                 "voter_id": self.voter_info.voter_id
             }
-            print(f"准备提交投票请求: {vote_request}")
+            self._log(f"准备提交投票请求: {vote_request}")
             
             # 3. 发送投票请求
-            response = requests.post(
+            response = self.session.post(
                 f"{self.tally_url}/submit",
                 json=vote_request,
-                headers={'Content-Type': 'application/json'}
+                headers={'Content-Type': 'application/json'},
+                timeout=self.timeout
             )
             
-            print(f"服务器响应状态码: {response.status_code}")
-            print(f"服务器响应内容: {response.text}")
+            self._log(f"服务器响应状态码: {response.status_code}")
+            self._log(f"服务器响应内容: {response.text}")
             
             if response.status_code == 200:
                 result = response.json()
-                print("投票成功!")
-                print(f"投票索引: {result.get('vote_index')}")
+                self._log("投票成功!")
+                self._log(f"投票索引: {result.get('vote_index')}")
+                self._log(f"投票回执: {result.get('receipt_code')}")
+                self.last_receipt = result
                 return True
             else:
                 error_msg = response.json().get('error', '未知错误')
-                print(f"投票提交失败: {error_msg}")
+                self._log(f"投票提交失败: {error_msg}")
                 return False
                 
         except Exception as e:
-            print(f"投票过程出错: {e}")
+            self._log(f"投票过程出错: {e}")
             import traceback
-            print(f"详细错误信息:\n{traceback.format_exc()}")
+            self._log(f"详细错误信息:\n{traceback.format_exc()}")
             return False
 
+    def get_public_key(self) -> PublicKey:
+        """获取选举公钥（首次使用时从计票服务器下载）"""
+        if self._public_key is None:
+            response = self.session.get(f"{self.tally_url}/public_key", timeout=self.timeout)
+            response.raise_for_status()
+            self._public_key = public_key_from_dict(response.json())
+        return self._public_key
+
+    def verify_vote(self, vote_index: int) -> Optional[Dict]:
+        """验证已提交的投票"""
+        try:
+            response = self.session.get(f"{self.tally_url}/verify/{vote_index}", timeout=self.timeout)
+            result = response.json()
+            if result.get("verified"):
+                self._log(f"投票 {vote_index} 验证通过")
+            else:
+                self._log(f"投票 {vote_index} 验证失败: {result.get('error', '未知错误')}")
+            return result
+        except Exception as e:
+            self._log(f"验证投票失败: {e}")
+            return None
+
+    def get_result(self) -> Optional[Dict]:
+        """查看计票结果"""
+        try:
+            response = self.session.get(f"{self.tally_url}/tally/result", timeout=self.timeout)
+            result = response.json()
+            if response.status_code == 200 and "error" not in result:
+                self._log(f"总票数: {result.get('total_votes')}, 总权重: {result.get('total_weight')}")
+                self._log(f"计票结果: {result.get('result')}")
+            else:
+                self._log(f"获取结果失败: {result.get('error', '未知错误')}")
+            return result
+        except Exception as e:
+            self._log(f"获取结果失败: {e}")
+            return None
+
+
+class AsyncVoterClient:
+    """
+    并发代理投票客户端：托管机构在一台机器上为大量账户投票
+    每个股东一个 VoterClient，共享同一份股东名册和公钥；
+    阻塞的 HTTP 调用放到线程中执行，由信号量限制并发数
+    requests.Session 不保证线程安全，每个工作线程使用自己的会话（线程内的请求依次执行，仍可复用连接）
+    """
+
+    def __init__(self, concurrency: int = 32, session_factory: Callable[[], requests.Session] = None,
+                 timeout=DEFAULT_TIMEOUT, registry: ShareholderRegistry = None):
+        """
+        :param session_factory: 为每个工作线程创建会话，默认 create_session
+        """
+        self.concurrency = concurrency
+        self.session_factory = session_factory or (lambda: create_session(pool_size=2))
+        self.timeout = timeout
+        self.registry = registry or ShareholderRegistry(seed_file=SHAREHOLDERS_FILE)
+        self._public_key = None
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._sessions_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """当前线程的会话，首次使用时创建"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self.session_factory()
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _new_client(self) -> VoterClient:
+        client = VoterClient(session=self.session, timeout=self.timeout,
+                             registry=self.registry, verbose=False)
+        client._public_key = self._public_key  # 所有账户共用一份公钥
+        return client
+
+    def _vote_one(self, voter_id: str, vote: int) -> Dict:
+        """登录、领取凭证并投票（在线程中执行）"""
+        client = self._new_client()
+        if not client.login(voter_id):
+            return {"voter_id": voter_id, "success": False, "error": "Invalid voter ID"}
+        if not client.request_credential():
+            return {"voter_id": voter_id, "success": False, "error": "Credential request failed"}
+        if not client.cast_vote(vote):
+            return {"voter_id": voter_id, "success": False, "error": "Vote submission failed"}
+        return {
+            "voter_id": voter_id,
+            "success": True,
+            "vote_index": client.last_receipt.get("vote_index"),
+            "receipt_code": client.last_receipt.get("receipt_code")
+        }
+
+    async def cast_votes(self, ballots: Dict[str, int]) -> Dict[str, Dict]:
+        """
+        并发为多个股东投票
+        :param ballots: {股东ID: 投票值}
+        :return: {股东ID: 结果}
+        """
+        if self._public_key is None:
+            self._public_key = await asyncio.to_thread(lambda: self._new_client().get_public_key())
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(voter_id, vote):
+            async with semaphore:
+                return await asyncio.to_thread(self._vote_one, voter_id, vote)
+
+        results = await asyncio.gather(*(run(v, b) for v, b in ballots.items()))
+        return {result["voter_id"]: result for result in results}
+
+    def close(self):
+        """关闭所有线程创建的会话"""
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+
 def main():
     """主程序"""
     client = VoterClient()
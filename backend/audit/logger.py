@@ -1,49 +1,300 @@
-from typing import Dict
+"""
+审计日志：按大小和时间轮转的只追加分段文件（JSON Lines）
+- 调用方只把记录放入有界队列，由后台线程批量写入，提交投票的热路径上不再创建文件
+- 队列满时调用方阻塞等待（背压）；写入失败（如磁盘满）时记录错误并计数，写入线程继续运行，
+  之后的 flush() 返回 False，计票结果写入失败时抛出 AuditLogError
+- 刷盘策略：always（每批 fsync）、interval（按间隔 fsync，默认）、never（交给操作系统）
+- 每个进程独占创建自己的分段文件，多个工作进程可共用同一目录
+
+分段文件名 audit-<序号>.jsonl，每行一条记录：
+    {"timestamp", "type": "vote_operation" | "tally_result", ...}
+"""
+from typing import Dict, Optional
+import atexit
 import json
+import logging
 import os
+import queue
+import re
+import threading
+import time
 from datetime import datetime
 
+from backend.metrics import AUDIT_RECORDS_DROPPED, AUDIT_WRITE_ERRORS
+
+logger = logging.getLogger(__name__)
+
+AUDIT_LOG_DIR = os.environ.get("AUDIT_LOG_DIR", os.path.join(os.path.dirname(__file__), "logs"))
+# 单个分段的最大字节数和最长时间（秒），超过后轮转
+SEGMENT_MAX_BYTES = int(os.environ.get("AUDIT_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+SEGMENT_MAX_SECONDS = float(os.environ.get("AUDIT_SEGMENT_SECONDS", "3600"))
+# 刷盘策略与 interval 策略下的 fsync 间隔（秒）
+FSYNC_POLICY = os.environ.get("AUDIT_FSYNC", "interval")
+FSYNC_INTERVAL = float(os.environ.get("AUDIT_FSYNC_INTERVAL", "1.0"))
+# 待写入记录的队列上限
+QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", "10000"))
+# 写入计票结果时等待落盘的最长时间（秒）
+FLUSH_TIMEOUT = float(os.environ.get("AUDIT_FLUSH_TIMEOUT", "10"))
+
+SEGMENT_PATTERN = re.compile(r"^audit-(\d{8})\.jsonl$")
+FSYNC_POLICIES = ("always", "interval", "never")
+
+# 写入批次的最大记录数
+_BATCH_SIZE = 512
+_STOP = object()
+
+
+def segment_name(seq: int) -> str:
+    return f"audit-{seq:08d}.jsonl"
+
+
+def list_segments(log_dir: str):
+    """按序号返回目录中的分段文件 [(序号, 路径)]"""
+    if not os.path.isdir(log_dir):
+        return []
+    segments = []
+    for name in os.listdir(log_dir):
+        match = SEGMENT_PATTERN.match(name)
+        if match:
+            segments.append((int(match.group(1)), os.path.join(log_dir, name)))
+    return sorted(segments)
+
+
+class AuditLogError(RuntimeError):
+    """审计记录未能写入"""
+
+
+class _Flush:
+    """写入线程处理到该标记时通知等待者，ok 表示此前的记录都已写入"""
+    __slots__ = ("event", "fsync", "ok")
+
+    def __init__(self, fsync: bool):
+        self.event = threading.Event()
+        self.fsync = fsync
+        self.ok = True
+
+
 class AuditLogger:
-    def __init__(self):
-        self.log_dir = os.path.join(os.path.dirname(__file__), "logs")
+    def __init__(self, log_dir: str = None, segment_max_bytes: int = SEGMENT_MAX_BYTES,
+                 segment_max_seconds: float = SEGMENT_MAX_SECONDS, fsync_policy: str = FSYNC_POLICY,
+                 fsync_interval: float = FSYNC_INTERVAL, queue_size: int = QUEUE_SIZE):
+        """
+        :param log_dir: 分段文件目录
+        :param segment_max_bytes: 分段大小上限
+        :param segment_max_seconds: 分段时间上限
+        :param fsync_policy: always / interval / never
+        :param fsync_interval: interval 策略下两次 fsync 的最小间隔
+        :param queue_size: 待写入队列上限，满时调用方阻塞
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}")
+        self.log_dir = log_dir or AUDIT_LOG_DIR
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_seconds = segment_max_seconds
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
         os.makedirs(self.log_dir, exist_ok=True)
-        
-    def log_tally_result(self, result: Dict):
-        """记录计票结果"""
-        timestamp = datetime.now().isoformat()
-        log_file = os.path.join(self.log_dir, f"tally_{timestamp}.json")
-        
-        audit_data = {
-            "timestamp": timestamp,
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._segment_path = None
+        self._segment_opened = 0.0
+        self._last_fsync = 0.0
+        self._closed = False
+        self._write_failed = False  # 上一个 flush 标记之后有记录写入失败
+        self._thread = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    # ---------- 写入接口 ----------
+
+    def log_tally_result(self, result: Dict, timeout: float = FLUSH_TIMEOUT):
+        """
+        记录计票结果（等待落盘后返回分段文件路径）
+        :raises AuditLogError: 写入失败或超时未落盘
+        """
+        self._enqueue("tally_result", {
             "total_votes": result["total_votes"],
             "total_weight": result["total_weight"],
             "result": result["result"],
             "proof": result["proof"],
             "merkle_root": result.get("merkle_root")
-        }
-        
-        with open(log_file, "w") as f:
-            json.dump(audit_data, f, indent=2)
-            
-        return log_file
-    
+        })
+        if not self.flush(fsync=True, timeout=timeout):
+            raise AuditLogError("Failed to write tally result to the audit log")
+        return self._segment_path
+
     def log_vote_operation(self, operation: str, vote_data: Dict):
-        """记录投票操作
-        
+        """记录投票操作（异步写入）
+
         Args:
             operation: 操作类型 ("submit", "verify", etc.)
             vote_data: 投票相关数据
         """
-        timestamp = datetime.now().isoformat()
-        log_file = os.path.join(self.log_dir, f"vote_{operation}_{timestamp}.json")
-        
-        audit_data = {
-            "timestamp": timestamp,
+        self._enqueue("vote_operation", {
             "operation": operation,
             "voter_id": vote_data.get("voter_id"),
             "vote_index": vote_data.get("vote_index"),
             "status": "success"
-        }
-        
-        with open(log_file, "w") as f:
-            json.dump(audit_data, f, indent=2)
\ No newline at end of file
+        })
+
+    def flush(self, fsync: bool = False, timeout: float = None) -> bool:
+        """
+        等待此前提交的记录全部写入（fsync=True 时同时落盘）
+        :return: 全部写入成功返回 True；有记录写入失败或等待超时返回 False
+        """
+        if self._thread is None:
+            return True
+        marker = _Flush(fsync)
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.event.wait(timeout) and marker.ok
+
+    def close(self):
+        """写完队列中的记录并停止写入线程"""
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+        atexit.unregister(self.close)
+
+    @property
+    def segment_path(self) -> Optional[str]:
+        """当前写入的分段文件"""
+        return self._segment_path
+
+    def _enqueue(self, record_type: str, fields: Dict):
+        if self._closed:
+            raise RuntimeError("Audit logger is closed")
+        self._ensure_thread()
+        record = {"timestamp": datetime.now().isoformat(), "type": record_type}
+        record.update(fields)
+        self._queue.put(record)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    # ---------- 写入线程 ----------
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                # 尽量把已排队的记录合并为一次写入
+                while len(batch) < _BATCH_SIZE and not isinstance(item, _Flush) and item is not _STOP:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                try:
+                    if self._write_batch(batch):
+                        return
+                except Exception as e:
+                    # 单批写入失败（如磁盘满）不能让写入线程退出，否则队列填满后所有调用方都会永久阻塞
+                    self._write_error(batch, e)
+                    if any(item is _STOP for item in batch):
+                        return
+        finally:
+            try:
+                self._close_segment()
+            except OSError as e:
+                logger.error(f"关闭审计日志分段失败: {e}")
+
+    def _write_error(self, batch, error: Exception):
+        """记录写入失败，丢弃当前分段（下一批写入新分段），并通知这批中的 flush 等待者"""
+        records = sum(1 for item in batch if item is not _STOP and not isinstance(item, _Flush))
+        logger.error(f"写入审计日志失败，丢失 {records} 条记录: {error}")
+        AUDIT_WRITE_ERRORS.inc()
+        AUDIT_RECORDS_DROPPED.inc(records)
+        self._write_failed = True
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        markers = [item for item in batch if isinstance(item, _Flush)]
+        for marker in markers:
+            marker.ok = False
+            marker.event.set()
+        if markers:
+            self._write_failed = False
+
+    def _write_batch(self, batch) -> bool:
+        """写入一批记录，遇到停止标记返回 True"""
+        lines = []
+        markers = []
+        stop = False
+        for item in batch:
+            if item is _STOP:
+                stop = True
+            elif isinstance(item, _Flush):
+                markers.append(item)
+            else:
+                lines.append(json.dumps(item, sort_keys=True, ensure_ascii=False) + "\n")
+
+        if lines:
+            self._rotate_if_needed()
+            self._file.write("".join(lines))
+            self._file.flush()
+
+        now = time.monotonic()
+        if self._file is not None and (
+            self.fsync_policy == "always" and lines
+            or any(m.fsync for m in markers)
+            or self.fsync_policy == "interval" and now - self._last_fsync >= self.fsync_interval
+        ):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+        for marker in markers:
+            marker.ok = not self._write_failed
+            marker.event.set()
+        if markers:
+            self._write_failed = False
+        return stop
+
+    def _rotate_if_needed(self):
+        if self._file is not None:
+            too_big = self._file.tell() >= self.segment_max_bytes
+            too_old = time.monotonic() - self._segment_opened >= self.segment_max_seconds
+            if not (too_big or too_old):
+                return
+            self._close_segment()
+        self._open_segment()
+
+    def _open_segment(self):
+        """以独占方式创建下一个分段（其他进程已占用的序号跳过）"""
+        existing = list_segments(self.log_dir)
+        seq = existing[-1][0] + 1 if existing else 1
+        while True:
+            path = os.path.join(self.log_dir, segment_name(seq))
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+                break
+            except FileExistsError:
+                seq += 1
+        self._file = os.fdopen(fd, "w", encoding="utf-8")
+        self._segment_path = path
+        self._segment_opened = time.monotonic()
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.flush()
+            if self.fsync_policy != "never":
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
@@ -0,0 +1,315 @@
+"""
+审计日志查询：为每个分段维护索引，按条件直接定位到匹配的记录
+
+索引 audit-<序号>.idx.db 是与分段放在同一目录的 SQLite 数据库（可随时删除，查询时重建）：
+    meta        已建索引的分段字节数、记录数、分段内记录的时间范围（用于跳过整个分段）
+    postings    (字段, 取值, 记录偏移)，字段为 type / operation / voter_id / vote_index
+    time_marks  稀疏时间标记 (时间, 偏移)，每 TIME_MARK_INTERVAL 条记录一个
+分段只追加，之后新增的部分增量补建：只插入新记录的行，不重写已有索引
+
+用法：
+    query = AuditQuery()
+    query.find(voter_id="v1", operation="submit")
+    query.find(record_type="tally_result", since="2026-10-01", until="2026-10-02")
+
+命令行：
+    python -m backend.audit.query --voter-id v1 --operation submit
+    python -m backend.audit.query --type tally_result --since 2026-10-01T09:00
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from backend.audit.logger import AUDIT_LOG_DIR, list_segments
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = ".idx.db"
+# 每隔多少条记录保存一个时间标记
+TIME_MARK_INTERVAL = 256
+# 建立倒排索引的字段
+INDEXED_FIELDS = ("type", "operation", "voter_id", "vote_index")
+# 求交集时先取的字段（匹配的记录通常最少）
+SELECTIVITY_ORDER = ("vote_index", "voter_id", "operation", "type")
+
+TimeBound = Optional[Union[str, datetime]]
+
+
+def index_path(segment_path: str) -> str:
+    return segment_path[:-len(".jsonl")] + INDEX_SUFFIX
+
+
+class SegmentIndex:
+    """单个分段的索引"""
+
+    def __init__(self, segment_path: str):
+        self.segment_path = segment_path
+        # 索引可以从分段重建，不需要持久性保证；超时等待其他查询进程补建完成
+        self._conn = sqlite3.connect(index_path(segment_path), isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " field INTEGER NOT NULL, value TEXT NOT NULL, offset INTEGER NOT NULL,"
+            " PRIMARY KEY (field, value, offset)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS time_marks (time TEXT NOT NULL, offset INTEGER PRIMARY KEY);"
+        )
+        self.meta = self._meta()
+
+    def _meta(self) -> Dict:
+        meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        if meta.get("version") != INDEX_VERSION:
+            return {"version": None, "size": 0, "records": 0, "first_time": None, "last_time": None}
+        return meta
+
+    def _clear(self):
+        """清空索引（在事务内调用）"""
+        for table in ("meta", "postings", "time_marks"):
+            self._conn.execute(f"DELETE FROM {table}")
+
+    @property
+    def size(self) -> int:
+        return self.meta["size"]
+
+    @property
+    def records(self) -> int:
+        return self.meta["records"]
+
+    def update(self) -> "SegmentIndex":
+        """
+        为分段新增的部分补建索引（已索引的部分不再读取）
+        末尾不完整的一行（写入线程正在写）留到下次再处理
+        """
+        size = os.path.getsize(self.segment_path)
+        if size == self.size and self.meta["version"] == INDEX_VERSION:
+            return self
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 其他查询进程可能刚补建过，以事务内读到的位置为准
+            meta = self._meta()
+            if size < meta["size"] or meta["version"] != INDEX_VERSION:
+                # 分段被截断或替换，或索引格式不同：重新建立
+                self._clear()
+                meta = {"version": INDEX_VERSION, "size": 0, "records": 0,
+                        "first_time": None, "last_time": None}
+            postings: List[Tuple[int, str, int]] = []
+            marks: List[Tuple[str, int]] = []
+            records = meta["records"]
+            with open(self.segment_path, "rb") as f:
+                f.seek(meta["size"])
+                offset = meta["size"]
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        record = None
+                    if isinstance(record, dict):
+                        timestamp = record.get("timestamp")
+                        if timestamp:
+                            if meta["first_time"] is None:
+                                meta["first_time"] = timestamp
+                            meta["last_time"] = timestamp
+                            if records % TIME_MARK_INTERVAL == 0:
+                                marks.append((timestamp, offset))
+                        for field, name in enumerate(INDEXED_FIELDS):
+                            value = record.get(name)
+                            if value is not None:
+                                postings.append((field, str(value), offset))
+                        records += 1
+                    offset += len(line)
+            # 按主键顺序插入，B 树只在末尾追加
+            postings.sort()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO postings (field, value, offset) VALUES (?, ?, ?)", postings
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO time_marks (time, offset) VALUES (?, ?)", marks
+            )
+            meta.update(size=offset, records=records)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", list(meta.items())
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self.meta = meta
+        return self
+
+    def match_offsets(self, keys: Dict[str, str]) -> Iterator[int]:
+        """
+        各条件偏移的交集，按偏移顺序逐个返回（按需读取，配合 limit 不必取出全部偏移）
+        从取值最分散的字段（投票索引、投票人）开始，其余条件逐条按主键探查
+        """
+        names = sorted(keys, key=SELECTIVITY_ORDER.index)
+        sql = "SELECT offset FROM postings p WHERE field = ? AND value = ?"
+        params = [INDEXED_FIELDS.index(names[0]), keys[names[0]]]
+        for name in names[1:]:
+            sql += (" AND EXISTS (SELECT 1 FROM postings"
+                    " WHERE field = ? AND value = ? AND offset = p.offset)")
+            params += [INDEXED_FIELDS.index(name), keys[name]]
+        rows = self._conn.execute(sql + " ORDER BY offset", params)
+        return (offset for offset, in rows)
+
+    def scan_start(self, since: Optional[str]) -> int:
+        """最后一个时间早于 since 的标记之后才可能出现匹配记录"""
+        if since is None:
+            return 0
+        row = self._conn.execute(
+            "SELECT offset FROM time_marks WHERE time < ? ORDER BY offset DESC LIMIT 1", (since,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        self._conn.close()
+
+
+def update_index(segment_path: str, index: SegmentIndex = None) -> SegmentIndex:
+    """打开（或沿用）分段索引并为新增部分补建索引"""
+    return (index or SegmentIndex(segment_path)).update()
+
+
+def _time_str(value: TimeBound) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+class AuditQuery:
+    """审计日志查询接口，索引在首次查询时建立并在之后增量更新"""
+
+    def __init__(self, log_dir: str = None):
+        self.log_dir = log_dir or AUDIT_LOG_DIR
+        # 分段路径 -> 索引，避免每次查询都重新打开索引
+        self._indexes: Dict[str, SegmentIndex] = {}
+
+    def refresh(self) -> List[str]:
+        """为所有分段补建索引，返回分段路径列表"""
+        paths = []
+        for _, path in list_segments(self.log_dir):
+            self._indexes[path] = update_index(path, self._indexes.get(path))
+            paths.append(path)
+        return paths
+
+    def close(self):
+        for index in self._indexes.values():
+            index.close()
+        self._indexes.clear()
+
+    def find(self, operation: str = None, voter_id: str = None, vote_index: int = None,
+             record_type: str = None, since: TimeBound = None, until: TimeBound = None,
+             limit: int = None) -> List[Dict]:
+        """
+        按条件查询审计记录，结果按写入顺序返回
+        :param operation: 投票操作类型（submit、verify 等）
+        :param voter_id: 投票人ID
+        :param vote_index: 投票索引
+        :param record_type: 记录类型（vote_operation、tally_result）
+        :param since: 起始时间（含），ISO 格式字符串或 datetime
+        :param until: 截止时间（含）
+        :param limit: 最多返回的记录数
+        """
+        since, until = _time_str(since), _time_str(until)
+        keys = {
+            "type": record_type,
+            "operation": operation,
+            "voter_id": voter_id,
+            "vote_index": vote_index,
+        }
+        keys = {name: str(value) for name, value in keys.items() if value is not None}
+
+        results = []
+        for path in self.refresh():
+            index = self._indexes[path]
+            if index.records == 0:
+                continue
+            # 时间范围不重叠的分段整个跳过
+            last_time, first_time = index.meta["last_time"], index.meta["first_time"]
+            if since is not None and last_time is not None and last_time < since:
+                continue
+            if until is not None and first_time is not None and first_time > until:
+                continue
+
+            remaining = None if limit is None else limit - len(results)
+            if keys:
+                records = self._read_offsets(path, index.match_offsets(keys), since, until)
+            else:
+                records = self._scan(path, index, since, until)
+            for record in records:
+                results.append(record)
+                if remaining is not None and len(results) >= limit:
+                    return results
+        return results
+
+    @staticmethod
+    def _in_range(record: Dict, since: Optional[str], until: Optional[str]) -> bool:
+        timestamp = record.get("timestamp") or ""
+        return (since is None or timestamp >= since) and (until is None or timestamp <= until)
+
+    def _read_offsets(self, path: str, offsets: Iterator[int], since, until) -> Iterator[Dict]:
+        with open(path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                record = json.loads(f.readline())
+                if self._in_range(record, since, until):
+                    yield record
+
+    def _scan(self, path: str, index: SegmentIndex, since, until) -> Iterator[Dict]:
+        """无字段条件时按时间标记定位起点顺序读取"""
+        start = index.scan_start(since)
+        with open(path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                offset += len(line)
+                if offset > index.size:
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                timestamp = record.get("timestamp") or ""
+                if until is not None and timestamp > until:
+                    break
+                if since is None or timestamp >= since:
+                    yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查询审计日志")
+    parser.add_argument("--log-dir", default=None, help="审计日志目录（默认 AUDIT_LOG_DIR）")
+    parser.add_argument("--type", dest="record_type", default=None, help="vote_operation 或 tally_result")
+    parser.add_argument("--operation", default=None, help="投票操作类型，如 submit")
+    parser.add_argument("--voter-id", default=None)
+    parser.add_argument("--vote-index", type=int, default=None)
+    parser.add_argument("--since", default=None, help="起始时间（ISO 格式，含）")
+    parser.add_argument("--until", default=None, help="截止时间（ISO 格式，含）")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--reindex", action="store_true", help="只为所有分段补建索引")
+    args = parser.parse_args(argv)
+
+    query = AuditQuery(args.log_dir)
+    try:
+        if args.reindex:
+            print(f"已索引 {len(query.refresh())} 个分段")
+            return 0
+
+        records = query.find(
+            operation=args.operation, voter_id=args.voter_id, vote_index=args.vote_index,
+            record_type=args.record_type, since=args.since, until=args.until, limit=args.limit
+        )
+        for record in records:
+            print(json.dumps(record, ensure_ascii=False, sort_keys=True))
+        return 0
+    finally:
+        query.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,48 +26,32 @@
      1. 检查序列号 `m_i` 是否首次使用（防重复投票）。  
      2. 用认证机构公钥验证签名有效性 
    - **双重保障**：唯一序列号防重投，数字签名防伪造。"""
-from typing import Dict, Set, Tuple
-import json
-import os
+from typing import Dict, List, Optional, Tuple
 import random
-from backend.config import load_rsa_keys
-from .blind_signature import BlindClient, BlindSigner
+from backend.keys import rsa_public_key
+from .blind_signature import BlindClient, BlindSigner, full_domain_hash
+from .nullifier_store import NullifierStore, credential_id
+from .batch_verify import BatchRSAVerifier
+from backend.metrics import STAGE_SECONDS, CREDENTIAL_REJECTS
 
 class CredentialVerifier:
     """投票资格验证器"""
     
-    def __init__(self):
+    def __init__(self, nullifier_store: NullifierStore = None):
         """初始化验证器"""
-        self.used_serials: Set[int] = set()  # 已使用的序列号集合
-        self.n, self.e, _ = load_rsa_keys()  # 只需要公钥(n,e)
-        self._load_used_serials()  # 从文件加载已使用序列号
-        self.signer = BlindSigner()  # 初始化签名者
-    
-    def _load_used_serials(self):
-        """从文件加载已使用的序列号"""
-        try:
-            # 存储在auth目录下的used_serials.json
-            path = os.path.join(os.path.dirname(__file__), "used_serials.json")
-            if os.path.exists(path):
-                with open(path, "r") as f:
-                    data = json.load(f)
-                    self.used_serials = set(map(int, data["used_serials"]))
-            else:
-                self.used_serials = set()
-        except Exception as e:
-            print(f"加载已用序列号失败: {e}")
-            self.used_serials = set()   
-    def _save_used_serials(self):
-        """保存已使用的序列号到文件"""
-        try:
-            path = os.path.join(os.path.dirname(__file__), "used_serials.json")
-            with open(path, "w") as f:
-                json.dump({
-                    "used_serials": list(map(str, self.used_serials))
-                }, f, indent=2)
-        except Exception as e:
-            print(f"保存已用序列号失败: {e}")
+        # 已使用的序列号存储（懒加载，多进程共享）
+        self.used_serials = nullifier_store if nullifier_store is not None else NullifierStore()
+        self.n, self.e = rsa_public_key()  # 只需要公钥(n,e)
+        self._signer = None  # 签名者（需要私钥）仅在签名时才加载
+        # 批量签名验证（带已验证凭证的LRU缓存）
+        self.batch_verifier = BatchRSAVerifier(self.n, self.e)
             
+    @property
+    def signer(self) -> BlindSigner:
+        if self._signer is None:
+            self._signer = BlindSigner()
+        return self._signer
+
     def generate_credential(self) -> Dict:
         """
         生成投票资格证书（包含所有步骤）
@@ -84,12 +68,12 @@ class CredentialVerifier:
 
     def generate_blinded_serial(self) -> Tuple[int, int, int]:
         """
-        生成盲化的序列号（步骤1&2）
+        生成盲化的序列号（步骤1&2），被盲化的是序列号的全域哈希
         返回: (blinded_msg, r, m_i)
         """
         m_i = random.getrandbits(256)  # 生成随机序列号
         client = BlindClient(self.n, self.e)
-        blinded_msg, r = client.blind(m_i)
+        blinded_msg, r = client.blind(full_domain_hash(m_i, self.n))
         return blinded_msg, r, m_i
 
     def sign_blinded_message(self, blinded_msg: int) -> int:
@@ -98,6 +82,10 @@ class CredentialVerifier:
         """
         return self.signer.sign(blinded_msg)
 
+    def sign_serial(self, serial: int) -> int:
+        """对序列号的全域哈希签名（非盲签发，签发凭证使用）"""
+        return self.signer.sign(full_domain_hash(serial, self.n))
+
     def create_credential(self, signed_blinded: int, r: int, m_i: int) -> Dict:
         """
         创建最终凭证（步骤4）
@@ -110,44 +98,123 @@ class CredentialVerifier:
             'signature': signature
         }
 
+    def _parse_credential(self, credential: Dict) -> Optional[Tuple[str, int, int]]:
+        """
+        解析凭证，返回 (防重标识, 被签名消息, 签名)，格式无效返回 None
+        支持两种格式：
+        - 脱盲凭证 {serial_number, signature}：签名针对序列号的全域哈希，以序列号防重
+        - 签发凭证 {voter_id, blinded_serial, signed_blinded, weight}：签名针对 blinded_serial 的全域哈希，
+          以被签名的 blinded_serial 防重（签名不覆盖股东ID，换一个股东ID重放同一凭证仍是同一防重标识）
+        """
+        try:
+            if not isinstance(credential, dict):
+                return None
+            if all(k in credential for k in ['serial_number', 'signature']):
+                serial_number = int(credential['serial_number'])
+                if serial_number < 0:
+                    return None
+                return (
+                    str(serial_number),
+                    full_domain_hash(serial_number, self.n),
+                    int(credential['signature'])
+                )
+            if all(k in credential for k in ['signed_blinded', 'voter_id', 'weight', 'blinded_serial']):
+                int(credential['weight'])
+                serial = int(credential['blinded_serial'])
+                if serial < 0:
+                    return None
+                return (
+                    str(serial),
+                    full_domain_hash(serial, self.n),
+                    int(credential['signed_blinded'])
+                )
+        except (TypeError, ValueError):
+            pass
+        return None
+
+    def credential_id(self, credential: Dict) -> Optional[str]:
+        """凭证的公开标识（只解析、不校验签名），格式无效返回 None"""
+        item = self._parse_credential(credential)
+        return credential_id(item[0]) if item else None
+
+    def check_credential_signature(self, credential: Dict) -> Optional[str]:
+        """
+        只校验凭证格式和签名，不登记防重标识（可在工作进程中并行执行）
+        :return: 有效时返回防重标识，否则返回 None
+        """
+        item = self._parse_credential(credential)
+        if item is None:
+            return None
+        nullifier, message, signature = item
+        return nullifier if self.batch_verifier.verify(message, signature) else None
+
+    def check_credential_signatures(self, credentials: List[Dict]) -> List[Optional[str]]:
+        """check_credential_signature 的批量版本，签名一次性批量验证"""
+        nullifiers = [None] * len(credentials)
+        parsed = [(i, item) for i, item in enumerate(map(self._parse_credential, credentials)) if item]
+        signature_ok = self.batch_verifier.verify_batch(
+            [(message, signature) for _, (_, message, signature) in parsed]
+        )
+        for (i, (nullifier, _, _)), ok in zip(parsed, signature_ok):
+            if ok:
+                nullifiers[i] = nullifier
+        return nullifiers
+
     def verify_credential(self, credential: Dict) -> bool:
         """验证投票资格证明"""
+        return self.verify_credentials_batch([credential])[0]
+
+    def verify_credentials_batch(self, credentials: List[Dict]) -> List[bool]:
+        """
+        批量验证投票资格证明
+        先批量验证签名，通过后逐个原子地登记防重标识
+        """
+        results = [False] * len(credentials)
         try:
             # 1. 检查凭证格式
-            if not isinstance(credential, dict) or not all(k in credential for k in ['signed_blinded', 'voter_id', 'weight']):
-                print("凭证格式无效")
-                return False
-                    
-            # 2. 验证签名
-            signed_blinded = int(credential['signed_blinded'])
-            voter_id = credential['voter_id']
-            weight = int(credential['weight'])
-            
-            # 使用公钥验证签名
-            expected = pow(signed_blinded, self.e, self.n)
-            # TODO: 实现正确的签名验证逻辑
-            
-            # 3. 检查是否重复投票
-            if voter_id in self.used_serials:
-                print(f"股东 {voter_id} 已经投票")
-                return False
-                
-            # 4. 记录已投票
-            self.used_serials.add(voter_id)
-            self._save_used_serials()
-            
-            return True
-                
+            parsed = []
+            with STAGE_SECONDS.time(operation="verify_credential", stage="parse"):
+                for i, credential in enumerate(credentials):
+                    item = self._parse_credential(credential)
+                    if item is None:
+                        print("凭证格式无效")
+                        CREDENTIAL_REJECTS.inc(reason="invalid_format")
+                    else:
+                        parsed.append((i, item))
+
+            # 2. 使用公钥批量验证签名
+            with STAGE_SECONDS.time(operation="verify_credential", stage="signature"):
+                signature_ok = self.batch_verifier.verify_batch(
+                    [(message, signature) for _, (_, message, signature) in parsed]
+                )
+
+            # 3. 检查是否重复投票并记录（原子操作）
+            with STAGE_SECONDS.time(operation="verify_credential", stage="nullifier"):
+                for (i, (nullifier, _, _)), ok in zip(parsed, signature_ok):
+                    if not ok:
+                        print("凭证签名无效")
+                        CREDENTIAL_REJECTS.inc(reason="invalid_signature")
+                    elif not self.used_serials.check_and_insert(nullifier):
+                        print(f"凭证 {nullifier} 已经投票")
+                        CREDENTIAL_REJECTS.inc(reason="already_used")
+                    else:
+                        results[i] = True
+
         except Exception as e:
             print(f"凭证验证失败: {e}")
-            return False
+        return results
+
 
+    def release_credential(self, credential: Dict):
+        """撤销凭证的防重登记（已通过 verify_credential 的选票未能存储时调用），凭证可以重新提交"""
+        item = self._parse_credential(credential)
+        if item is not None:
+            self.used_serials.remove_many([item[0]])
 
     def _verify_signature(self, serial_number: int, signature: int) -> bool:
-        """验证RSA签名"""
-        return pow(signature, self.e, self.n) == serial_number
+        """验证序列号的RSA签名（针对全域哈希）"""
+        return pow(signature, self.e, self.n) == full_domain_hash(serial_number, self.n)
     
     def clear_used_serials(self):
         """清空已使用序列号(仅用于测试)"""
-        self.used_serials.clear()
-        self._save_used_serials()
\ No newline at end of file
+        self.used_serials.clear()
\ No newline at end of file
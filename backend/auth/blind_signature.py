@@ -1,32 +1,123 @@
 #此文件实现基于RSA的盲签名
 from Crypto.PublicKey import RSA
+from Crypto.Util import number
+from collections import deque
+from threading import Event, Lock, Thread
+import hashlib
 import math
 from dataclasses import dataclass
 from typing import Tuple
-from ..config import load_rsa_keys
+from ..config import load_rsa_private_key
 @dataclass
 class BlindSigner:
-    def __init__(self):
-        """初始化盲签名者，加载 RSA 公私钥"""
-        self.n, self.e,self.d = load_rsa_keys()
+    def __init__(self, key: dict = None):
+        """
+        初始化签名者，加载 RSA 公私钥及 CRT 分量
+        :param key: 私钥（格式同 keys.rsa_private_key()），默认使用凭证密钥
+        """
+        key = key or load_rsa_private_key()
+        self.n, self.e, self.d = key["n"], key["e"], key["d"]
+        self.p, self.q = key["p"], key["q"]
+        self.dp, self.dq, self.qinv = key["dp"], key["dq"], key["qinv"]
 
     def sign(self, blinded_message: int) -> int:
         # 真实的 RSA 签名为：s = blinded_message^d mod n
-        return pow(blinded_message, self.d, self.n)
+        # 使用 CRT 分别在模 p、模 q 下计算，约快 3~4 倍
+        c = blinded_message % self.n
+        m1 = pow(c, self.dp, self.p)
+        m2 = pow(c, self.dq, self.q)
+        h = (self.qinv * (m1 - m2)) % self.p
+        signature = m2 + h * self.q
+
+        # 故障检查：CRT 计算出错会泄露分解，错误结果绝不返回
+        if pow(signature, self.e, self.n) != c:
+            return pow(c, self.d, self.n)
+        return signature
+
+def full_domain_hash(message: int, n: int) -> int:
+    """
+    全域哈希（FDH）：把序列号映射为模 n 的均匀值，签名和验证都针对哈希值
+    直接对序列号签名时，任取 s 即可伪造凭证 (s^e mod n, s)
+    """
+    data = message.to_bytes((message.bit_length() + 7) // 8 or 1, "big")
+    length = (n.bit_length() + 7) // 8 + 16  # 多取 128 位，取模后的偏差可忽略
+    digest = b"".join(
+        hashlib.sha256(b"credential-fdh" + counter.to_bytes(4, "big") + data).digest()
+        for counter in range((length + 31) // 32)
+    )
+    return int.from_bytes(digest[:length], "big") % n
+
+def random_blinding_factor(n: int, e: int) -> Tuple[int, int]:
+    """
+    生成盲化因子 (r, r^e mod n)
+    r 只需是模 n 的单位元，不必是素数；取满长度的随机数比 128 位素数更安全
+    """
+    while True:
+        r = number.getRandomRange(2, n - 1)
+        if math.gcd(r, n) == 1:
+            return r, pow(r, e, n)
+
+
+class BlindingPool:
+    """
+    预计算的盲化因子池，在关键路径之外生成 (r, r^e mod n)
+    池空时退回即时生成；可选后台线程在低于水位时自动补充
+    """
+
+    def __init__(self, n: int, e: int, size: int = 64, background: bool = False):
+        self.n = n
+        self.e = e
+        self.size = size
+        self._pairs = deque()
+        self._lock = Lock()
+        self._need_refill = Event()
+        self._stopped = False
+        if background:
+            Thread(target=self._refill_loop, daemon=True).start()
+            self._need_refill.set()
+
+    def fill(self, count: int = None):
+        """补充盲化因子到池满（或补充指定数量）"""
+        count = self.size - len(self._pairs) if count is None else count
+        for _ in range(max(0, count)):
+            pair = random_blinding_factor(self.n, self.e)
+            with self._lock:
+                self._pairs.append(pair)
+
+    def take(self) -> Tuple[int, int]:
+        """取出一对 (r, r^e mod n)，每对只使用一次"""
+        with self._lock:
+            pair = self._pairs.popleft() if self._pairs else None
+            if len(self._pairs) < self.size // 2:
+                self._need_refill.set()
+        return pair or random_blinding_factor(self.n, self.e)
+
+    def _refill_loop(self):
+        while not self._stopped:
+            self._need_refill.wait()
+            self._need_refill.clear()
+            self.fill()
+
+    def stop(self):
+        self._stopped = True
+        self._need_refill.set()
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
 
 class BlindClient:
-    def __init__(self, n: int, e: int):
+    def __init__(self, n: int, e: int, pool: BlindingPool = None):
         self.n = n
         self.e = e
+        self.pool = pool
 #注意这里的r不是self.r
     def blind(self, message: int) -> Tuple[int, int]:
-        from Crypto.Util.number import getPrime, inverse
-        r = getPrime(128)
-        while True:
-            if r < self.n and math.gcd(r, self.n) == 1:
-                break
-            r = getPrime(128)
-        blinded = (message * pow(r, self.e, self.n)) % self.n
+        if self.pool is not None:
+            r, r_e = self.pool.take()
+        else:
+            r, r_e = random_blinding_factor(self.n, self.e)
+        blinded = (message * r_e) % self.n
         return blinded, r
 
     def unblind(self, signed_blinded: int, r: int) -> int:
@@ -0,0 +1,198 @@
+"""
+已使用序列号（nullifier）存储，用于防止重复投票
+- 磁盘：SQLite 表只追加不修改（WAL 模式下每票一次追加写）；只有批量提交中未能存储的选票会撤销登记
+- 内存：Bloom 过滤器挡在精确索引之前，绝大多数首次投票无需查盘
+- 检查并插入由唯一约束保证原子性，多个工作进程共享同一文件也不会重复
+"""
+import hashlib
+import json
+import math
+import os
+import sqlite3
+from threading import Lock
+
+NULLIFIER_DB_PATH = os.environ.get(
+    "NULLIFIER_DB_PATH",
+    os.path.join(os.path.dirname(__file__), "used_serials.db")
+)
+# 旧版 JSON 存储（仅用于迁移）
+LEGACY_USED_SERIALS_PATH = os.path.join(os.path.dirname(__file__), "used_serials.json")
+
+
+class BloomFilter:
+    """简单的 Bloom 过滤器，使用 SHA256 摘要做双重哈希"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, digest: bytes):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+def nullifier_digest(nullifier) -> bytes:
+    """序列号（或股东ID）的定长摘要"""
+    return hashlib.sha256(str(nullifier).encode()).digest()
+
+
+def credential_id(nullifier) -> str:
+    """凭证的公开标识（防重标识摘要的十六进制），权重签名与之绑定"""
+    return nullifier_digest(nullifier).hex()
+
+
+class NullifierStore:
+    """已使用序列号存储（首次访问时懒加载）"""
+
+    def __init__(self, path: str = NULLIFIER_DB_PATH, capacity: int = 1_000_000,
+                 error_rate: float = 0.001):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = Lock()
+        self._conn = None
+        self._bloom = None
+        self._last_id = 0  # Bloom 过滤器已覆盖到的最大行号
+
+    def _open(self):
+        """打开数据库并把已有记录载入 Bloom 过滤器"""
+        if self._conn is not None:
+            return
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS nullifiers ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " digest BLOB NOT NULL UNIQUE)"
+        )
+        self._conn = conn
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._last_id = 0
+        if self.path == NULLIFIER_DB_PATH and os.path.exists(LEGACY_USED_SERIALS_PATH):
+            self._migrate_legacy()
+        self._catch_up()
+
+    def _catch_up(self):
+        """把其他进程新写入的记录补进 Bloom 过滤器"""
+        rows = self._conn.execute(
+            "SELECT id, digest FROM nullifiers WHERE id > ? ORDER BY id",
+            (self._last_id,)
+        )
+        for row_id, digest in rows:
+            self._bloom.add(digest)
+            self._last_id = row_id
+
+    def _exists(self, digest: bytes) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM nullifiers WHERE digest = ?", (digest,)
+        ).fetchone()
+        return row is not None
+
+    def _migrate_legacy(self):
+        """导入旧版 used_serials.json"""
+        try:
+            with open(LEGACY_USED_SERIALS_PATH, "r") as f:
+                serials = json.load(f).get("used_serials", [])
+        except (json.JSONDecodeError, AttributeError) as e:
+            print(f"旧版已用序列号文件无法读取，跳过迁移: {e}")
+            return
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO nullifiers (digest) VALUES (?)",
+            [(nullifier_digest(s),) for s in serials]
+        )
+        os.replace(LEGACY_USED_SERIALS_PATH, LEGACY_USED_SERIALS_PATH + ".migrated")
+
+    def contains(self, nullifier) -> bool:
+        """序列号是否已使用"""
+        digest = nullifier_digest(nullifier)
+        with self._lock:
+            self._open()
+            if digest not in self._bloom:
+                self._catch_up()
+                if digest not in self._bloom:
+                    return False
+            return self._exists(digest)
+
+    def check_and_insert(self, nullifier) -> bool:
+        """
+        原子地检查并记录序列号
+        :return: 首次使用返回 True，已使用过返回 False
+        """
+        digest = nullifier_digest(nullifier)
+        with self._lock:
+            self._open()
+            # Bloom 命中时先精确确认，重复投票无需写盘即可拒绝
+            if digest in self._bloom and self._exists(digest):
+                return False
+            try:
+                # 唯一约束保证跨进程的原子性
+                self._conn.execute("INSERT INTO nullifiers (digest) VALUES (?)", (digest,))
+            except sqlite3.IntegrityError:
+                self._bloom.add(digest)
+                return False
+            self._bloom.add(digest)
+            return True
+
+    def check_and_insert_many(self, nullifiers) -> list:
+        """
+        在一个事务中检查并记录多个序列号（批量提交使用）
+        :return: 与输入一一对应，首次使用为 True；同一批内重复出现的只有第一个为 True
+        """
+        digests = [nullifier_digest(n) for n in nullifiers]
+        results = []
+        with self._lock:
+            self._open()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for digest in digests:
+                    if digest in self._bloom and self._exists(digest):
+                        results.append(False)
+                        continue
+                    try:
+                        self._conn.execute("INSERT INTO nullifiers (digest) VALUES (?)", (digest,))
+                    except sqlite3.IntegrityError:
+                        results.append(False)
+                    else:
+                        results.append(True)
+                    self._bloom.add(digest)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return results
+
+    def remove_many(self, nullifiers):
+        """
+        撤销登记（批量提交中已登记但未能存储的选票使用，凭证可以重新提交）
+        Bloom 过滤器无法删除，之后命中时由数据库精确确认
+        """
+        digests = [(nullifier_digest(n),) for n in nullifiers]
+        if not digests:
+            return
+        with self._lock:
+            self._open()
+            self._conn.executemany("DELETE FROM nullifiers WHERE digest = ?", digests)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._open()
+            return self._conn.execute("SELECT COUNT(*) FROM nullifiers").fetchone()[0]
+
+    def clear(self):
+        """清空所有记录（仅用于测试）"""
+        with self._lock:
+            self._open()
+            self._conn.execute("DELETE FROM nullifiers")
+            # AUTOINCREMENT 保证行号不回退，_last_id 无需重置
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
@@ -0,0 +1,268 @@
+"""
+股东名册：SQLite 键值存储，按 voter_id O(1) 查询
+支持逐条登记、分页浏览，以及从过户代理导出的百万行名册流式批量导入
+另记录每名股东已领取的投票凭证数，用于限制签发次数
+
+命令行批量导入（默认拒绝已登记的股东ID，--upsert 更新已登记股东）：
+    python -m backend.auth.registry import [--upsert] shareholders.csv
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+from backend.config import REGISTRY_DB_PATH
+from backend.models.vote import Voter
+
+# 每个事务写入的行数
+IMPORT_BATCH_SIZE = 10000
+
+# 导入模式：insert 遇到已登记的股东ID时拒绝该行，upsert 更新已登记股东的权重（以及给出的姓名、类型）
+IMPORT_MODES = ("insert", "upsert")
+
+
+def _row_to_voter(row) -> Voter:
+    voter_id, name, uuid, voter_type, weight = row
+    return Voter(name=name, uuid=uuid, voter_id=voter_id, voter_type=voter_type, weight=weight)
+
+
+def _normalize(record: Dict) -> Tuple[str, Optional[str], str, Optional[str], int]:
+    """校验一条股东记录；缺少的姓名和类型保留为 None，由写入时决定（新股东必须有姓名）"""
+    voter_id = str(record["voter_id"]).strip()
+    if not voter_id:
+        raise ValueError("Empty voter_id")
+    weight = int(record["weight"])
+    if weight < 0:
+        raise ValueError("Negative weight")
+    return (
+        voter_id,
+        str(record["name"]) if record.get("name") else None,
+        str(record.get("uuid") or uuid4()),
+        str(record["voter_type"]) if record.get("voter_type") else None,
+        weight
+    )
+
+
+class ShareholderRegistry:
+    """股东名册"""
+
+    def __init__(self, path: str = REGISTRY_DB_PATH, seed_file: str = None):
+        """
+        :param path: 名册数据库路径
+        :param seed_file: 名册为空时从该 JSON 文件导入（兼容旧版 shareholders.json）
+        """
+        self.path = path
+        self._lock = Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shareholders ("
+            " voter_id TEXT PRIMARY KEY,"
+            " name TEXT NOT NULL,"
+            " uuid TEXT NOT NULL,"
+            " voter_type TEXT NOT NULL,"
+            " weight INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS credential_issuance ("
+            " voter_id TEXT PRIMARY KEY,"
+            " issued INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        if seed_file and os.path.exists(seed_file) and len(self) == 0:
+            self.import_file(seed_file)
+
+    def get(self, voter_id: str) -> Optional[Voter]:
+        """按股东ID查询"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT voter_id, name, uuid, voter_type, weight FROM shareholders WHERE voter_id = ?",
+                (voter_id,)
+            ).fetchone()
+        return _row_to_voter(row) if row else None
+
+    def __contains__(self, voter_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM shareholders WHERE voter_id = ?", (voter_id,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM shareholders").fetchone()[0]
+
+    def add(self, voter: Voter) -> bool:
+        """登记新股东，ID已存在时返回 False"""
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO shareholders (voter_id, name, uuid, voter_type, weight) VALUES (?, ?, ?, ?, ?)",
+                    (voter.voter_id, voter.name, voter.uuid, voter.voter_type, voter.weight)
+                )
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def reserve_credentials(self, voter_ids: List[str], limit: int) -> List[bool]:
+        """
+        在一个事务中为每个股东登记一次凭证签发，已领取 limit 张的不再登记
+        :return: 与输入一一对应，登记成功（可以签发）为 True
+        """
+        results = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for voter_id in voter_ids:
+                    cursor = self._conn.execute(
+                        "INSERT INTO credential_issuance (voter_id, issued) VALUES (?, 1)"
+                        " ON CONFLICT(voter_id) DO UPDATE SET issued = issued + 1 WHERE issued < ?",
+                        (voter_id, limit)
+                    )
+                    results.append(cursor.rowcount == 1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return results
+
+    def credentials_issued(self, voter_id: str) -> int:
+        """股东已领取的凭证数"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT issued FROM credential_issuance WHERE voter_id = ?", (voter_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def list(self, limit: int = 100, after: str = None) -> List[Voter]:
+        """
+        按股东ID顺序分页（键集分页，翻页代价与名册大小无关）
+        :param after: 上一页最后一个股东ID
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT voter_id, name, uuid, voter_type, weight FROM shareholders"
+                " WHERE voter_id > ? ORDER BY voter_id LIMIT ?",
+                (after or "", limit)
+            ).fetchall()
+        return [_row_to_voter(row) for row in rows]
+
+    def bulk_import(self, records: Iterable[Dict], batch_size: int = IMPORT_BATCH_SIZE,
+                    mode: str = "insert") -> Dict:
+        """
+        流式批量导入
+        :param mode: "insert" 已登记的股东ID作为错误行拒绝；
+                     "upsert" 更新已登记股东的权重，记录中给出的姓名、类型才覆盖，保留原 uuid
+        :return: {"imported": 成功行数, "rejected": 无效行数, "errors": 前若干条错误}
+        """
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"Unsupported import mode: {mode}")
+        imported = 0
+        rejected = 0
+        errors = []
+        batch = []
+
+        def reject(line_no: int, error: str):
+            nonlocal rejected
+            rejected += 1
+            if len(errors) < 100:
+                errors.append({"line": line_no, "error": error})
+
+        def write(row) -> Optional[str]:
+            """写入一行，失败时返回错误信息"""
+            voter_id, name, uuid, voter_type, weight = row
+            if mode == "upsert":
+                updated = self._conn.execute(
+                    "UPDATE shareholders SET name = COALESCE(?, name),"
+                    " voter_type = COALESCE(?, voter_type), weight = ? WHERE voter_id = ?",
+                    (name, voter_type, weight, voter_id)
+                ).rowcount
+                if updated:
+                    return None
+            if name is None:
+                return "Missing name"
+            inserted = self._conn.execute(
+                "INSERT INTO shareholders (voter_id, name, uuid, voter_type, weight)"
+                " VALUES (?, ?, ?, ?, ?) ON CONFLICT(voter_id) DO NOTHING",
+                (voter_id, name, uuid, voter_type or "shareholder", weight)
+            ).rowcount
+            return None if inserted else "Shareholder ID already exists"
+
+        def flush():
+            nonlocal imported
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    for line_no, row in batch:
+                        error = write(row)
+                        if error is None:
+                            imported += 1
+                        else:
+                            reject(line_no, error)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+        for line_no, record in enumerate(records, start=1):
+            try:
+                batch.append((line_no, _normalize(record)))
+            except (KeyError, TypeError, ValueError) as e:
+                reject(line_no, str(e))
+                continue
+            if len(batch) >= batch_size:
+                flush()
+                batch = []
+
+        if batch:
+            flush()
+
+        return {"imported": imported, "rejected": rejected, "errors": errors}
+
+    def import_stream(self, stream: io.TextIOBase, fmt: str, mode: str = "insert") -> Dict:
+        """
+        从文本流导入
+        :param fmt: "csv"（表头含 voter_id,name,weight 等列）或 "jsonl"（每行一个JSON对象）
+        :param mode: 见 bulk_import
+        """
+        if fmt == "csv":
+            return self.bulk_import(csv.DictReader(stream), mode=mode)
+        if fmt == "jsonl":
+            return self.bulk_import((json.loads(line) for line in stream if line.strip()), mode=mode)
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    def import_file(self, path: str, mode: str = "insert") -> Dict:
+        """按扩展名导入 .csv / .jsonl，或旧版 {"shareholders": {...}} 格式的 .json"""
+        if path.endswith(".json"):
+            with open(path, "r") as f:
+                data = json.load(f)
+            return self.bulk_import(data["shareholders"].values(), mode=mode)
+
+        fmt = "csv" if path.endswith(".csv") else "jsonl"
+        with open(path, "r", newline="") as f:
+            return self.import_stream(f, fmt, mode)
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    mode = "insert"
+    if "--upsert" in argv:
+        argv = [arg for arg in argv if arg != "--upsert"]
+        mode = "upsert"
+    if len(argv) != 2 or argv[0] != "import":
+        print("用法: python -m backend.auth.registry import [--upsert] <shareholders.csv|.jsonl|.json>")
+        return 1
+    result = ShareholderRegistry().import_file(argv[1], mode)
+    print(f"导入 {result['imported']} 行，拒绝 {result['rejected']} 行")
+    for error in result["errors"]:
+        print(f"  第 {error['line']} 行: {error['error']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"盲签名进程池：批量签发凭证时把 RSA 签名分摊到多个 CPU 核"
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threading import Lock
+from typing import Iterator, List, Tuple
+from .blind_signature import BlindSigner
+
+# 每个工作进程各自持有一个签名者（只在进程启动时加载一次密钥）
+_worker_signer = None
+
+
+def _init_worker():
+    global _worker_signer
+    _worker_signer = BlindSigner()
+
+
+def _sign_chunk(items: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """在工作进程中签名一批 (位置, 盲化消息)"""
+    return [(position, _worker_signer.sign(message)) for position, message in items]
+
+
+class SigningPool:
+    """签名进程池（懒启动）"""
+
+    def __init__(self, workers: int = None, chunk_size: int = 64):
+        """
+        :param workers: 工作进程数，默认为 CPU 核数
+        :param chunk_size: 每个任务包含的消息数，减少进程间通信开销
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._lock = Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def sign_stream(self, messages: List[Tuple[int, int]]) -> Iterator[Tuple[int, int]]:
+        """
+        并行签名，按完成顺序逐个产出结果
+        :param messages: [(位置, 盲化消息)]
+        :return: 迭代器，产出 (位置, 签名)
+        """
+        executor = self._get_executor()
+        futures = [
+            executor.submit(_sign_chunk, messages[i:i + self.chunk_size])
+            for i in range(0, len(messages), self.chunk_size)
+        ]
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            # 客户端中途断开时取消尚未开始的任务
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
@@ -1,61 +1,56 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from backend.auth.auth import CredentialVerifier
 from backend.auth.blind_signature import BlindSigner
+from backend.auth.nullifier_store import credential_id
+from backend.tally.controller import CredentialVerifier as WeightSigner
+from backend.auth.signing_pool import SigningPool
+import hmac
+import io
 import os
 import json
+from backend.auth.registry import IMPORT_MODES, ShareholderRegistry
 from backend.models.vote import Voter
+from backend.config import AUTH_SERVER_PORT, CREDENTIALS_PER_VOTER, REGISTRY_ADMIN_TOKEN
+from backend import metrics
 from uuid import uuid4
 
 app = Flask(__name__)
+metrics.install(app)
 verifier = CredentialVerifier()
+weight_signer = WeightSigner()
+signing_pool = SigningPool()
 
-# 存储股东信息的文件路径
+# 单次批量签发的最大请求数
+MAX_CREDENTIAL_BATCH = 50000
+
+# 旧版股东信息文件（名册为空时导入）
 SHAREHOLDERS_FILE = os.path.join(os.path.dirname(__file__), "shareholders.json")
 
+# 分页浏览的最大页大小
+MAX_PAGE_SIZE = 1000
+
 # 初始化股东数据
-def init_shareholders():
-    """初始化或加载股东数据"""
-    if not os.path.exists(SHAREHOLDERS_FILE):
-        default_shareholders = {
-            "shareholders": {
-                "shareholder_001": {
-                    "name": "张三",
-                    "uuid": str(uuid4()),
-                    "voter_id": "shareholder_001",
-                    "voter_type": "shareholder",
-                    "weight": 5
-                },
-                "shareholder_002": {
-                    "name": "李四",
-                    "uuid": str(uuid4()),
-                    "voter_id": "shareholder_002",
-                    "voter_type": "shareholder",
-                    "weight": 3
-                },
-                "shareholder_003": {
-                    "name": "王五",
-                    "uuid": str(uuid4()),
-                    "voter_id": "shareholder_003",
-                    "voter_type": "shareholder",
-                    "weight": 2
-                }
-            }
-        }
-        with open(SHAREHOLDERS_FILE, "w") as f:
-            json.dump(default_shareholders, f, indent=2, ensure_ascii=False)
-    
-    with open(SHAREHOLDERS_FILE, "r") as f:
-        data = json.load(f)
-        # 转换为 Voter 对象
-        return {
-            "shareholders": {
-                voter_id: Voter(**info)
-                for voter_id, info in data["shareholders"].items()
-            }
-        }
+def init_shareholders() -> ShareholderRegistry:
+    """初始化或加载股东名册"""
+    registry = ShareholderRegistry(seed_file=SHAREHOLDERS_FILE)
+    if len(registry) == 0:
+        default_shareholders = [
+            ("shareholder_001", "张三", 5),
+            ("shareholder_002", "李四", 3),
+            ("shareholder_003", "王五", 2)
+        ]
+        for voter_id, name, weight in default_shareholders:
+            registry.add(Voter(
+                name=name,
+                uuid=str(uuid4()),
+                voter_id=voter_id,
+                voter_type="shareholder",
+                weight=weight
+            ))
+    return registry
 
 # 加载股东数据
-shareholders_data = init_shareholders()
+registry = init_shareholders()
 
 def _verify_voter_identity(voter_id: str) -> bool:
     """
@@ -63,7 +58,7 @@ def _verify_voter_identity(voter_id: str) -> bool:
     :param voter_id: 股东ID
     :return: 是否为有效股东
     """
-    return voter_id in shareholders_data["shareholders"]
+    return voter_id in registry
 
 def _calculate_voter_weight(voter_id: str) -> int:
     """
@@ -71,21 +66,46 @@ def _calculate_voter_weight(voter_id: str) -> int:
     :param voter_id: 股东ID
     :return: 股东权重
     """
-    if voter_id in shareholders_data["shareholders"]:
-        return shareholders_data["shareholders"][voter_id]["weight"]
-    return 0
+    voter = registry.get(voter_id)
+    return voter.weight if voter else 0
+
+def _require_admin():
+    """
+    校验管理员令牌（Authorization: Bearer <REGISTRY_ADMIN_TOKEN>）
+    :return: 校验失败时的错误响应，通过时返回 None
+    """
+    if not REGISTRY_ADMIN_TOKEN:
+        return jsonify({"error": "Registry import is disabled (REGISTRY_ADMIN_TOKEN not set)"}), 403
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme != "Bearer" or not hmac.compare_digest(token.encode(), REGISTRY_ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Admin credential required"}), 401
+    return None
 
 # 添加股东管理接口
 @app.route('/auth/shareholders', methods=['GET'])
 def get_shareholders():
-    """获取所有股东信息"""
-    return jsonify(shareholders_data)
+    """
+    分页获取股东信息
+    参数: limit（页大小）, after（上一页返回的 next_after）
+    """
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    voters = registry.list(limit=limit, after=request.args.get('after'))
+    return jsonify({
+        "shareholders": {voter.voter_id: voter.to_dict() for voter in voters},
+        "total": len(registry),
+        "next_after": voters[-1].voter_id if len(voters) == limit else None
+    })
 
 @app.route('/auth/shareholders/<voter_id>', methods=['GET'])
 def get_shareholder(voter_id):
     """获取特定股东信息"""
-    if voter_id in shareholders_data["shareholders"]:
-        return jsonify(shareholders_data["shareholders"][voter_id])
+    voter = registry.get(voter_id)
+    if voter:
+        return jsonify(voter.to_dict())
     return jsonify({"error": "Shareholder not found"}), 404
 
 @app.route('/auth/shareholders', methods=['POST'])
@@ -96,67 +116,90 @@ def add_shareholder():
         if not all(k in data for k in ["voter_id", "name", "weight"]):
             return jsonify({"error": "Missing required fields"}), 400
         
-        voter_id = data["voter_id"]
-        if voter_id in shareholders_data["shareholders"]:
-            return jsonify({"error": "Shareholder ID already exists"}), 400
-        
         # 创建新的Voter对象
         new_shareholder = Voter(
             name=data["name"],
             uuid=str(uuid4()),
-            voter_id=voter_id,
+            voter_id=data["voter_id"],
             voter_type="shareholder",
             weight=int(data["weight"])
         )
         
-        # 转换为字典并保存
-        shareholders_data["shareholders"][voter_id] = {
-            "name": new_shareholder.name,
-            "uuid": new_shareholder.uuid,
-            "voter_id": new_shareholder.voter_id,
-            "voter_type": new_shareholder.voter_type,
-            "weight": new_shareholder.weight
-        }
-        
-        with open(SHAREHOLDERS_FILE, "w") as f:
-            json.dump(shareholders_data, f, indent=2, ensure_ascii=False)
+        if not registry.add(new_shareholder):
+            return jsonify({"error": "Shareholder ID already exists"}), 400
         
         return jsonify({"success": True})
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/auth/shareholders/import', methods=['POST'])
+def import_shareholders():
+    """
+    流式批量导入股东名册（需要管理员令牌）
+    请求体为 CSV（Content-Type: text/csv）或 NDJSON（application/x-ndjson），边读边写入
+    参数: mode=insert（默认，已登记的股东ID作为错误行拒绝）或 mode=upsert（更新已登记股东）
+    """
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    mode = request.args.get('mode', 'insert')
+    if mode not in IMPORT_MODES:
+        return jsonify({"error": f"Invalid mode (expected one of {', '.join(IMPORT_MODES)})"}), 400
+    fmt = "csv" if request.mimetype == "text/csv" else "jsonl"
+    try:
+        stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        result = registry.import_stream(stream, fmt, mode)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
 @app.route('/auth/request_credential', methods=['POST'])
 def request_credential():
-    """请求投票凭证"""
+    """
+    请求投票凭证
+    权重取自股东名册（不采用请求中的 voter_info），每名股东最多领取 CREDENTIALS_PER_VOTER 张
+    凭证附带绑定该凭证的权重签名，投票时放入 encrypted_vote.weight_signature
+    """
     try:
         data = request.get_json()
-        if not all(k in data for k in ['voter_id', 'blinded_serial', 'voter_info']):
+        if not all(k in data for k in ['voter_id', 'blinded_serial']):
             return jsonify({"error": "Missing required fields"}), 400
         
         # 验证股东身份
         voter_id = data['voter_id']
-        if not _verify_voter_identity(voter_id):
+        if not isinstance(voter_id, str) or not _verify_voter_identity(voter_id):
             return jsonify({
                 "error": "Invalid voter ID",
                 "message": "此ID不在股东名单中"
             }), 403
         
-        # 转换并签名盲化消息
+        # 对序列号的全域哈希签名（签名不覆盖股东ID，序列号即防重标识）
         try:
             blinded_msg = int(data['blinded_serial'])
-            signed_blinded = verifier.sign_blinded_message(blinded_msg)
-        except ValueError as e:
+            if blinded_msg < 0:
+                raise ValueError("blinded_serial must be non-negative")
+        except (TypeError, ValueError) as e:
             return jsonify({
                 "error": "Invalid blinded serial format",
                 "message": str(e)
             }), 400
-        
+
+        if not registry.reserve_credentials([voter_id], CREDENTIALS_PER_VOTER)[0]:
+            return jsonify({"error": "Credential limit reached"}), 403
+        with metrics.STAGE_SECONDS.time(operation="issue_credential", stage="sign"):
+            signed_blinded = verifier.sign_serial(blinded_msg)
+        weight = _calculate_voter_weight(voter_id)
+        with metrics.STAGE_SECONDS.time(operation="issue_credential", stage="sign_weight"):
+            weight_signature = weight_signer.sign_weight(credential_id(blinded_msg), weight)
+
         # 生成凭证
         credential = {
             "voter_id": voter_id,
+            "blinded_serial": str(blinded_msg),
             "signed_blinded": str(signed_blinded),
-            "weight": data['voter_info']['weight']
+            "weight": weight,
+            "weight_signature": weight_signature
         }
         
         return jsonify(credential)
@@ -164,5 +207,78 @@ def request_credential():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/auth/request_credentials_batch', methods=['POST'])
+def request_credentials_batch():
+    """
+    批量请求投票凭证（托管银行为大量实益股东一次性登记）
+    请求: {"requests": [{"voter_id", "blinded_serial"}, ...]}
+    响应: NDJSON 流，每行一个结果，按签名完成顺序返回
+    每名股东最多领取 CREDENTIALS_PER_VOTER 张凭证，超出的请求逐项拒绝
+    盲签名凭证不附带权重签名：签发时不知道脱盲后的序列号，无法在不关联身份的前提下绑定权重
+    """
+    data = request.get_json()
+    if not data or not isinstance(data.get('requests'), list):
+        return jsonify({"error": "Missing required fields"}), 400
+
+    items = data['requests']
+    if len(items) > MAX_CREDENTIAL_BATCH:
+        return jsonify({"error": f"Batch too large (max {MAX_CREDENTIAL_BATCH})"}), 413
+
+    # 一次遍历完成格式与身份校验
+    rejected = []
+    to_sign = []
+    voter_ids = []
+    seen = set()
+    for position, item in enumerate(items):
+        voter_id = item.get('voter_id') if isinstance(item, dict) else None
+        voter_ids.append(voter_id)
+        if voter_id is None or 'blinded_serial' not in item:
+            rejected.append((position, "Missing required fields"))
+        elif not isinstance(voter_id, str):
+            rejected.append((position, "Invalid voter ID format"))
+        elif voter_id in seen:
+            rejected.append((position, "Duplicate voter ID in batch"))
+        elif not _verify_voter_identity(voter_id):
+            rejected.append((position, "Invalid voter ID"))
+        else:
+            try:
+                to_sign.append((position, int(item['blinded_serial'])))
+                seen.add(voter_id)
+            except (TypeError, ValueError):
+                rejected.append((position, "Invalid blinded serial format"))
+
+    # 一个事务中登记全部签发次数
+    reserved = registry.reserve_credentials([voter_ids[position] for position, _ in to_sign],
+                                            CREDENTIALS_PER_VOTER)
+    for (position, _), ok in zip(to_sign, reserved):
+        if not ok:
+            rejected.append((position, "Credential limit reached"))
+    to_sign = [item for item, ok in zip(to_sign, reserved) if ok]
+    messages = dict(to_sign)
+
+    def generate():
+        for position, error in rejected:
+            yield json.dumps({
+                "position": position,
+                "voter_id": voter_ids[position],
+                "error": error
+            }) + "\n"
+        # 数量很少时直接签名，省去进程池的调度开销
+        if len(to_sign) <= signing_pool.chunk_size:
+            results = ((position, verifier.sign_blinded_message(m)) for position, m in to_sign)
+        else:
+            results = signing_pool.sign_stream(to_sign)
+        for position, signed_blinded in results:
+            voter_id = voter_ids[position]
+            yield json.dumps({
+                "position": position,
+                "voter_id": voter_id,
+                "blinded_serial": str(messages[position]),
+                "signed_blinded": str(signed_blinded),
+                "weight": _calculate_voter_weight(voter_id)
+            }) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 if __name__ == '__main__':
-    app.run(port=5001)
\ No newline at end of file
+    app.run(port=AUTH_SERVER_PORT)
\ No newline at end of file
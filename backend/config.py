@@ -1,91 +1,33 @@
 "密钥配置"
 
 import os
-import json
-from Crypto.PublicKey import ElGamal
-from Crypto import Random
-""" 
-    elgamal_params
-"""
-PARAM_BITS = 1024
-CACHE_FILE = f"elgamal_params_{PARAM_BITS}.json"
-
-def generate_and_cache_elgamal_keys(bits=PARAM_BITS):
-    """使用 PyCryptodome 生成 ElGamal 密钥，并缓存参数"""
-    key = ElGamal.generate(bits, Random.new().read)
-    params = {
-        "p": str(key.p),
-        "g": str(key.g),
-        "y": str(key.y),  # 公钥部分
-        "x": str(key.x)   # 私钥部分
-    }
-    with open(CACHE_FILE, "w") as f:
-        json.dump(params, f)
-    print(f"已生成并缓存 ElGamal 参数到 {CACHE_FILE}")
-    return int(key.p), int(key.g), int(key.y), int(key.x)
+# 密钥由 backend.keys 在进程内统一加载并缓存，这里保留原有的加载接口
+from backend.keys import (
+    PARAM_BITS, RSA_BITS, ELGAMAL_GROUP, ELGAMAL_KEY_FILE, RSA_KEY_FILE, KeysMissingError,
+    elgamal_keys, rsa_private_key
+)
 
-def load_elgamal_keys():
-    """从缓存加载 ElGamal 参数（不存在则自动生成）"""
-    if not os.path.exists(CACHE_FILE):
-        return generate_and_cache_elgamal_keys()
-
-    with open(CACHE_FILE, "r") as f:
-        data = json.load(f)
-        return (
-            int(data["p"]),
-            int(data["g"]),
-            int(data["y"]),
-            int(data["x"])
-        )
-    
-
-from Crypto.PublicKey import RSA
-RSA_BITS = 2048
-RSA_CACHE_FILE = f"rsa_params_{RSA_BITS}.json"
-
-def generate_and_cache_rsa_keys(bits=2048, save_to_file=True):
-    """
-    生成 RSA 密钥对
-
-    参数:
-        bits (int): 密钥长度，通常是 2048 bit
-        save_to_file (bool): 是否将密钥保存为文件（默认 False）
-        public_key_file (str): 公钥保存路径（默认 'rsa_public.pem'）
-        private_key_file (str): 私钥保存路径（默认 'rsa_private.pem'）
-
-    返回:
-        (public_key_pem: str, private_key_pem: str)
-    """
-    # 生成密钥对
-    key = RSA.generate(bits,Random.new().read)
 
-    # 导出为 PEM 格式字符串
-    rsa_params = {
-        "n": str(key.n),  # modulus
-        "e": str(key.e),  # public exponent
-        "d": str(key.d)   # private exponent
-    }
-
-    # 可选保存为文件
-    if save_to_file:
-        with open(RSA_CACHE_FILE, "w") as f:
-            json.dump(rsa_params, f)
-        print(f"已生成并缓存 RSA 参数到 {RSA_CACHE_FILE}")
-        return int(rsa_params["n"]), int(rsa_params["e"]), int(rsa_params["d"])
+def load_elgamal_keys():
+    """ElGamal 参数 (p, g, y, x)，缺少密钥文件时抛出 KeysMissingError"""
+    return elgamal_keys()
 
-    return int(rsa_params["n"]), int(rsa_params["e"]), int(rsa_params["d"])
 
 def load_rsa_keys():
     """
-    从缓存加载 RSA 参数（如果不存在则生成）
+    RSA 参数，缺少密钥文件时抛出 KeysMissingError
     返回：n, e, d
     """
-    if not os.path.exists(RSA_CACHE_FILE):
-        return generate_and_cache_rsa_keys()
+    key = rsa_private_key()
+    return key["n"], key["e"], key["d"]
+
 
-    with open(RSA_CACHE_FILE, "r") as f:
-        data = json.load(f)
-        return int(data["n"]), int(data["e"]), int(data["d"])
+def load_rsa_private_key() -> dict:
+    """
+    加载含 CRT 分量的 RSA 私钥
+    返回: {"n", "e", "d", "p", "q", "dp", "dq", "qinv"}（均为 int）
+    """
+    return rsa_private_key()
 
 
 # 基础路径配置
@@ -99,4 +41,44 @@ os.makedirs(DATA_DIR, exist_ok=True)
 SHAREHOLDERS_FILE = os.environ.get(
     "SHAREHOLDERS_FILE",
     os.path.join(DATA_DIR, "shareholders.json")
-)
\ No newline at end of file
+)
+# 股东名册数据库
+REGISTRY_DB_PATH = os.environ.get(
+    "SHAREHOLDER_REGISTRY_DB",
+    os.path.join(DATA_DIR, "shareholders.db")
+)
+
+# 股东名册管理员令牌：批量导入名册需在请求头 Authorization: Bearer <令牌> 中提供，未配置时禁止导入
+REGISTRY_ADMIN_TOKEN = os.environ.get("REGISTRY_ADMIN_TOKEN", "")
+
+# 每名股东最多可领取的投票凭证数（每张凭证对应一票）
+CREDENTIALS_PER_VOTER = int(os.environ.get("CREDENTIALS_PER_VOTER", "1"))
+
+# 服务端口（可用环境变量覆盖，便于在一台机器上启动多套实例做压测）
+AUTH_SERVER_PORT = int(os.environ.get("AUTH_SERVER_PORT", "5001"))
+VOTER_SERVER_PORT = int(os.environ.get("VOTER_SERVER_PORT", "5000"))
+TALLY_SERVER_PORT = int(os.environ.get("TALLY_SERVER_PORT", "5002"))
+# 计票服务器的工作进程数，大于1时以 prefork 方式运行，各进程共享磁盘上的投票存储
+TALLY_WORKERS = int(os.environ.get("TALLY_WORKERS", "1"))
+
+# 只读接口（计票结果、投票验证）的响应缓存条目数
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "1024"))
+
+# 只读从节点：端口、主节点（计票服务器）地址、拉取日志的间隔（秒）
+FOLLOWER_SERVER_PORT = int(os.environ.get("FOLLOWER_SERVER_PORT", "5003"))
+REPLICATION_LEADER_URL = os.environ.get("REPLICATION_LEADER_URL", f"http://localhost:{TALLY_SERVER_PORT}")
+REPLICATION_POLL_INTERVAL = float(os.environ.get("REPLICATION_POLL_INTERVAL", "0.5"))
+
+# 批量验证：单个请求最多验证的票数（每票都要完整验证一次零知识证明）
+VERIFY_BATCH_MAX = int(os.environ.get("VERIFY_BATCH_MAX", "100"))
+
+# 批量提交：单个请求的最大选票数，以及并行验证使用的进程数（0 表示在请求线程中验证）
+SUBMIT_BATCH_MAX = int(os.environ.get("SUBMIT_BATCH_MAX", "100000"))
+SUBMIT_BATCH_WORKERS = int(os.environ.get("SUBMIT_BATCH_WORKERS", str(os.cpu_count() or 1)))
+
+# 投票提交的准入控制：同时处理的请求数、排队上限、最长排队时间（秒）、
+# 单个客户端（X-Client-ID 或来源地址）的并发上限（0 表示不限制）
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "8"))
+ADMISSION_QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+ADMISSION_PER_CLIENT = int(os.environ.get("ADMISSION_PER_CLIENT", "0"))
@@ -2,6 +2,7 @@
 # backend/crypto/single_ballot.py
 
 from backend.utils import crypto_utils
+from Crypto.Util import number
 from typing import Tuple
 from dataclasses import dataclass
 from backend.crypto.elgamal import PublicKey
@@ -20,75 +21,75 @@ class ZKProof_01:
 
 
 class ORProof:
+    """
+    加权 0/1 选票的 OR 证明：分支 1 固定证明明文为 0，分支 2 固定证明明文为 weight
+    真实分支按明文选定，另一分支用模拟器生成；挑战和响应都在模 q 下计算
+    """
     def __init__(self,pk:PublicKey):
         self.p = pk.p
+        self.q = pk.q
         self.g = pk.g
         self.y = pk.y
-    ##验证第一步，客户生成com1和com2
-    def generate_proof_step1(self, m, c):
-        self.w = crypto_utils.randint(0, self.p)
-        A1 = pow(self.g, self.w, self.p)
-        B1 = pow(self.y, self.w, self.p)
-        self.com1 = (A1, B1) 
 
+    def _simulate(self, c, plaintext):
+        """模拟“明文为 plaintext”的分支：先取挑战和响应，再倒推承诺"""
         alpha, beta = c
-        m2 = (1 - m) % self.p
-
-        self.cha2 = crypto_utils.randint(0, self.p)
-        self.resp2 = crypto_utils.randint(0, self.p)
-
-        A2 = pow(self.g, self.resp2, self.p) * crypto_utils.inverse_mod(pow(alpha, self.cha2, self.p), self.p) % self.p
-        temp = beta * crypto_utils.inverse_mod(pow(self.g, m2, self.p), self.p) % self.p
-        B2 = pow(self.y, self.resp2, self.p) * crypto_utils.inverse_mod(pow(temp, self.cha2, self.p), self.p) % self.p
-        self.com2 = (A2, B2)
-
+        cha = number.getRandomRange(1, self.q)
+        resp = number.getRandomRange(0, self.q)
+        A = pow(self.g, resp, self.p) * crypto_utils.inverse_mod(pow(alpha, cha, self.p), self.p) % self.p
+        temp = beta * crypto_utils.inverse_mod(pow(self.g, plaintext, self.p), self.p) % self.p
+        B = pow(self.y, resp, self.p) * crypto_utils.inverse_mod(pow(temp, cha, self.p), self.p) % self.p
+        return (A, B), cha, resp
+
+    ##验证第一步，客户生成com1（明文为 0 的分支）和com2（明文为 weight 的分支），m 对应的分支为真实分支
+    def generate_proof_step1(self, m, c, weight=1):
+        if m not in (0, 1):
+            raise ValueError("Vote must be 0 or 1")
+        self.real = 1 if m == 0 else 2
+        self.w = number.getRandomRange(1, self.q)
+        real_com = (pow(self.g, self.w, self.p), pow(self.y, self.w, self.p))
+        if self.real == 1:
+            self.com1 = real_com
+            self.com2, self.cha2, self.resp2 = self._simulate(c, weight)
+        else:
+            self.com1, self.cha1, self.resp1 = self._simulate(c, 0)
+            self.com2 = real_com
         return self.com1, self.com2
-    
-    ##验证第三步，客户生成cha1和resp1、发送cha1、resp1、cha2、resp2给计票中心
+
+    ##验证第三步，客户按挑战完成真实分支，发送cha1、resp1、cha2、resp2给计票中心
     def generate_proof_step2(self, cha, r):
-        self.cha1 = (cha - self.cha2) % self.p
-        self.resp1 = r * self.cha1 + self.w
+        if self.real == 1:
+            self.cha1 = (cha - self.cha2) % self.q
+            self.resp1 = (self.w + r * self.cha1) % self.q
+        else:
+            self.cha2 = (cha - self.cha1) % self.q
+            self.resp2 = (self.w + r * self.cha2) % self.q
         return self.cha1, self.resp1, self.cha2, self.resp2
-    
 
-#V方开始检验：投票者需要向V方发送cha2、cha1、resp1、resp2；V方检验com1和com2的有效性（当m=0的时候，必须有一个通过；m=1的时候，也必须有一个通过），并验证cha1和cha2的关系
+
+#V方检验：cha1+cha2 ≡ cha (mod q)，分支 1 证明密文的明文为 0，分支 2 证明明文为 weight，两个分支都必须通过
     @staticmethod
-    def verify_proof(c, com1, com2, cha, cha1, cha2, resp1, resp2, pk_v):
+    def verify_proof(c, com1, com2, cha, cha1, cha2, resp1, resp2, pk_v, weight=1):
         zkproof=ZKProof_01(com1=com1, com2=com2, cha1=cha1, cha2=cha2, resp1=resp1, resp2=resp2)
         alpha, beta = c
-        p, _, g, y = pk_v
-        A1, B1 = com1
-        A2, B2 = com2
+        p, q, g, y = pk_v
+        cha1, cha2 = cha1 % q, cha2 % q
 
-        if (cha1 + cha2) % p != cha % p:
+        if (cha1 + cha2) % q != cha % q:
             print("cha1+cha2!=cha")
             return False
-        
-        left_A1 = pow(g, resp1, p)
-        right_A1 = A1 * pow(alpha, cha1, p) % p
-
-        left_B1 = pow(y, resp1, p)
-        right_B1 = B1 * pow(beta, cha1, p) % p
-
-        left_A2 = pow(g, resp2, p)
-        right_A2 = A2 * pow(alpha, cha2, p) % p
-
-        left_B2 = pow(y, resp2, p)
-        right_B2 = B2 * pow(beta, cha2, p) % p
-
-        # try both paths
-        ###当m=0时，beta=beta，com1和com2必须有一个通过检验
-        
-        if (left_A1 == right_A1 and left_B1 == right_B1) or (left_A2 == right_A2 and left_B2 == right_B2):
-            ###当m=1时，beta=beta/g，com1和com2必须有一个通过检验
-            temp = beta * crypto_utils.inverse_mod(g, p) % p
-            right_B1 = B1 * pow(temp, cha1, p) % p
-            right_B2 = B2 * pow(temp, cha2, p) % p
-
-            if (left_A1 == right_A1 and left_B1 == right_B1) or (left_A2 == right_A2 and left_B2 == right_B2):
-                zkproof.verified = True
-
+        # 子挑战为 0 的分支对任何密文都成立，等于没有证明
+        if cha1 == 0 or cha2 == 0:
+            return zkproof
+        if not all(0 < v < p for v in (*com1, *com2)):
+            return zkproof
+
+        def branch_ok(com, cha_i, resp_i, target):
+            A, B = com
+            return (pow(g, resp_i, p) == A * pow(alpha, cha_i, p) % p and
+                    pow(y, resp_i, p) == B * pow(target, cha_i, p) % p)
+
+        # 分支 1：beta = y^r（明文为 0）；分支 2：beta / g^weight = y^r（明文为 weight）
+        beta_minus_w = beta * crypto_utils.inverse_mod(pow(g, weight, p), p) % p
+        zkproof.verified = branch_ok(com1, cha1, resp1, beta) and branch_ok(com2, cha2, resp2, beta_minus_w)
         return zkproof
-
-
-
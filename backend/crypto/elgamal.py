@@ -2,7 +2,7 @@
 
 from Crypto.Util import number
 from backend.utils.crypto_utils import mod_exp, inverse_mod
-from backend.config import load_elgamal_keys
+from backend.keys import elgamal_keys, discrete_log_table
 from dataclasses import dataclass
 from typing import Tuple
 
@@ -22,8 +22,8 @@ class PublicKey:
 
 class ExponentialElGamal:
     def __init__(self,decrypt_enabled: bool = False):
-        """从配置文件加载 ElGamal 公共参数"""
-        self.p, self.g, self.y, self.x = load_elgamal_keys()
+        """从进程内共享的密钥注册表获取 ElGamal 公共参数"""
+        self.p, self.g, self.y, self.x = elgamal_keys()
         self.q = (self.p - 1) // 2
         self.pk = PublicKey(self.p, self.g, self.q, self.y)
 
@@ -83,17 +83,14 @@ class ExponentialElGamal:
     
     def solve_discrete_log(self, g_m, max_value=100):
         """
-        通过穷举计算离散对数
-        适用于小值域（如投票计票）
-        票数小，穷举合适
+        查表计算离散对数
+        适用于小值域（如投票计票），查找表在进程内共享，只需计算一次
         """
         
         if max_value is None:
             max_value = 100  # 默认支持100票
         
-        accum = 1
-        for m in range(0, max_value + 1):
-            if accum == g_m:
-                return m
-            accum = (accum * self.g) % self.p
-        raise ValueError("Discrete log solution not found in range")
\ No newline at end of file
+        m = discrete_log_table(max_value).get(g_m)
+        if m is None or m > max_value:
+            raise ValueError("Discrete log solution not found in range")
+        return m
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+标准化的 ElGamal 群参数（安全素数 p = 2q + 1，生成元 g = 2 生成 q 阶子群）
+
+- RFC 3526 MODP 群：p = 2^N - 2^(N-64) - 1 + 2^64 * (floor(2^(N-130) * pi) + C)
+- RFC 7919 FFDHE 群：p = 2^N - 2^(N-64) - 1 + 2^64 * (floor(2^(N-130) * e) + C)
+
+使用标准群时只需在本地生成密钥对，不必再花几分钟搜索安全素数
+"""
+from dataclasses import dataclass
+from typing import Dict
+
+# RFC 3526 第3节，2048 位 MODP 群（IKE 群 14）
+_MODP2048_HEX = (
+    "FFFFFFFF FFFFFFFF C90FDAA2 2168C234 C4C6628B 80DC1CD1 29024E08 8A67CC74 "
+    "020BBEA6 3B139B22 514A0879 8E3404DD EF9519B3 CD3A431B 302B0A6D F25F1437 "
+    "4FE1356D 6D51C245 E485B576 625E7EC6 F44C42E9 A637ED6B 0BFF5CB6 F406B7ED "
+    "EE386BFB 5A899FA5 AE9F2411 7C4B1FE6 49286651 ECE45B3D C2007CB8 A163BF05 "
+    "98DA4836 1C55D39A 69163FA8 FD24CF5F 83655D23 DCA3AD96 1C62F356 208552BB "
+    "9ED52907 7096966D 670C354E 4ABC9804 F1746C08 CA18217C 32905E46 2E36CE3B "
+    "E39E772C 180E8603 9B2783A2 EC07A28F B5C55DF0 6F4C52C9 DE2BCBF6 95581718 "
+    "3995497C EA956AE5 15D22618 98FA0510 15728E5A 8AACAA68 FFFFFFFF FFFFFFFF"
+)
+
+# RFC 3526 第4节，3072 位 MODP 群（IKE 群 15）
+_MODP3072_HEX = (
+    "FFFFFFFF FFFFFFFF C90FDAA2 2168C234 C4C6628B 80DC1CD1 29024E08 8A67CC74 "
+    "020BBEA6 3B139B22 514A0879 8E3404DD EF9519B3 CD3A431B 302B0A6D F25F1437 "
+    "4FE1356D 6D51C245 E485B576 625E7EC6 F44C42E9 A637ED6B 0BFF5CB6 F406B7ED "
+    "EE386BFB 5A899FA5 AE9F2411 7C4B1FE6 49286651 ECE45B3D C2007CB8 A163BF05 "
+    "98DA4836 1C55D39A 69163FA8 FD24CF5F 83655D23 DCA3AD96 1C62F356 208552BB "
+    "9ED52907 7096966D 670C354E 4ABC9804 F1746C08 CA18217C 32905E46 2E36CE3B "
+    "E39E772C 180E8603 9B2783A2 EC07A28F B5C55DF0 6F4C52C9 DE2BCBF6 95581718 "
+    "3995497C EA956AE5 15D22618 98FA0510 15728E5A 8AAAC42D AD33170D 04507A33 "
+    "A85521AB DF1CBA64 ECFB8504 58DBEF0A 8AEA7157 5D060C7D B3970F85 A6E1E4C7 "
+    "ABF5AE8C DB0933D7 1E8C94E0 4A25619D CEE3D226 1AD2EE6B F12FFA06 D98A0864 "
+    "D8760273 3EC86A64 521F2B18 177B200C BBE11757 7A615D6C 770988C0 BAD946E2 "
+    "08E24FA0 74E5AB31 43DB5BFC E0FD108E 4B82D120 A93AD2CA FFFFFFFF FFFFFFFF"
+)
+
+# RFC 7919 附录 A.1，ffdhe2048
+_FFDHE2048_HEX = (
+    "FFFFFFFF FFFFFFFF ADF85458 A2BB4A9A AFDC5620 273D3CF1 D8B9C583 CE2D3695 "
+    "A9E13641 146433FB CC939DCE 249B3EF9 7D2FE363 630C75D8 F681B202 AEC4617A "
+    "D3DF1ED5 D5FD6561 2433F51F 5F066ED0 85636555 3DED1AF3 B557135E 7F57C935 "
+    "984F0C70 E0E68B77 E2A689DA F3EFE872 1DF158A1 36ADE735 30ACCA4F 483A797A "
+    "BC0AB182 B324FB61 D108A94B B2C8E3FB B96ADAB7 60D7F468 1D4F42A3 DE394DF4 "
+    "AE56EDE7 6372BB19 0B07A7C8 EE0A6D70 9E02FCE1 CDF7E2EC C03404CD 28342F61 "
+    "9172FE9C E98583FF 8E4F1232 EEF28183 C3FE3B1B 4C6FAD73 3BB5FCBC 2EC22005 "
+    "C58EF183 7D1683B2 C6F34A26 C1B2EFFA 886B4238 61285C97 FFFFFFFF FFFFFFFF"
+)
+
+# RFC 7919 附录 A.2，ffdhe3072
+_FFDHE3072_HEX = (
+    "FFFFFFFF FFFFFFFF ADF85458 A2BB4A9A AFDC5620 273D3CF1 D8B9C583 CE2D3695 "
+    "A9E13641 146433FB CC939DCE 249B3EF9 7D2FE363 630C75D8 F681B202 AEC4617A "
+    "D3DF1ED5 D5FD6561 2433F51F 5F066ED0 85636555 3DED1AF3 B557135E 7F57C935 "
+    "984F0C70 E0E68B77 E2A689DA F3EFE872 1DF158A1 36ADE735 30ACCA4F 483A797A "
+    "BC0AB182 B324FB61 D108A94B B2C8E3FB B96ADAB7 60D7F468 1D4F42A3 DE394DF4 "
+    "AE56EDE7 6372BB19 0B07A7C8 EE0A6D70 9E02FCE1 CDF7E2EC C03404CD 28342F61 "
+    "9172FE9C E98583FF 8E4F1232 EEF28183 C3FE3B1B 4C6FAD73 3BB5FCBC 2EC22005 "
+    "C58EF183 7D1683B2 C6F34A26 C1B2EFFA 886B4238 611FCFDC DE355B3B 6519035B "
+    "BC34F4DE F99C0238 61B46FC9 D6E6C907 7AD91D26 91F7F7EE 598CB0FA C186D91C "
+    "AEFE1309 85139270 B4130C93 BC437944 F4FD4452 E2D74DD3 64F2E21E 71F54BFF "
+    "5CAE82AB 9C9DF69E E86D2BC5 22363A0D ABC52197 9B0DEADA 1DBF9A42 D5C4484E "
+    "0ABCD06B FA53DDEF 3C1B20EE 3FD59D7C 25E41D2B 66C62E37 FFFFFFFF FFFFFFFF"
+)
+
+
+@dataclass(frozen=True)
+class StandardGroup:
+    name: str
+    p: int
+    g: int
+    bits: int
+
+    @property
+    def q(self) -> int:
+        """子群阶 (p - 1) / 2"""
+        return (self.p - 1) // 2
+
+
+def _group(name: str, hex_digits: str) -> StandardGroup:
+    p = int(hex_digits.replace(" ", ""), 16)
+    return StandardGroup(name=name, p=p, g=2, bits=p.bit_length())
+
+
+GROUPS: Dict[str, StandardGroup] = {
+    group.name: group for group in (
+        _group("modp2048", _MODP2048_HEX),
+        _group("modp3072", _MODP3072_HEX),
+        _group("ffdhe2048", _FFDHE2048_HEX),
+        _group("ffdhe3072", _FFDHE3072_HEX),
+    )
+}
+
+
+def get_group(name: str) -> StandardGroup:
+    """按名称获取标准群"""
+    try:
+        return GROUPS[name]
+    except KeyError:
+        raise ValueError(f"Unknown group: {name} (可选: {', '.join(GROUPS)})") from None
@@ -0,0 +1,83 @@
+"""
+只读从节点：从计票服务器复制投票日志，提供验证和导出接口
+
+从节点使用自己的存储目录，启动：
+    VOTE_STORAGE_DIR=/data/follower REPLICATION_LEADER_URL=http://localhost:5002 python -m backend.follower_server
+"""
+from flask import Flask, request, jsonify
+from backend.verify.controller import VerifyController
+from backend.replication import Follower
+from backend.storage.vote_db import get_votes, get_checkpoint
+from backend.config import FOLLOWER_SERVER_PORT, VERIFY_BATCH_MAX
+from backend import http_cache, metrics
+
+# 导出接口单次返回的最大记录数
+EXPORT_MAX_LIMIT = 1000
+
+app = Flask(__name__)
+metrics.install(app)
+verify_controller = VerifyController()
+follower = Follower()
+response_cache = http_cache.ResponseCache()
+
+@app.route('/verify/<int:vote_index>', methods=['GET'])
+@http_cache.conditional(response_cache)
+def verify_vote(vote_index):
+    """验证投票"""
+    result = verify_controller.verify_vote(vote_index)
+    return jsonify(result)
+
+@app.route('/verify/receipt/<receipt>', methods=['GET'])
+@http_cache.conditional(response_cache)
+def verify_receipt(receipt):
+    """按回执（vote_hash 或短回执码）验证投票"""
+    result = verify_controller.verify_receipt(receipt)
+    if result.get("error") == "Receipt not found":
+        return jsonify(result), 404
+    return jsonify(result)
+
+@app.route('/verify/batch', methods=['POST'])
+def verify_votes():
+    """批量验证投票（共用一份Merkle批量证明）"""
+    data = request.get_json()
+    if not data or 'vote_indices' not in data:
+        return jsonify({"error": "Missing required fields"}), 400
+    vote_indices = data['vote_indices']
+    if not isinstance(vote_indices, list):
+        return jsonify({"error": "vote_indices must be a list"}), 400
+    if len(vote_indices) > VERIFY_BATCH_MAX:
+        return jsonify({"error": f"Too many vote indices (max {VERIFY_BATCH_MAX})"}), 413
+    result = verify_controller.verify_votes(vote_indices)
+    return jsonify(result)
+
+@app.route('/votes', methods=['GET'])
+@http_cache.conditional(response_cache)
+def export_votes():
+    """
+    导出投票记录（公告板），按 start / limit 分页
+    响应中的票数和 Merkle 根是从节点当前复制到的位置
+    """
+    start = request.args.get('start', 0, type=int)
+    limit = min(request.args.get('limit', EXPORT_MAX_LIMIT, type=int), EXPORT_MAX_LIMIT)
+    checkpoint = get_checkpoint()
+    records = get_votes(start, limit)
+    # 只返回检查点之前的记录，与给出的 Merkle 根对应
+    records = [r for r in records if r["index"] < checkpoint["count"]]
+    return jsonify({
+        "start": start,
+        "count": checkpoint["count"],
+        "merkle_root": checkpoint["merkle_root"],
+        "chain_head": checkpoint["chain_head"],
+        "records": records
+    })
+
+@app.route('/replication/status', methods=['GET'])
+def replication_status():
+    """复制状态：本地与主节点的位置、落后程度、最近的错误"""
+    return jsonify(follower.status())
+
+if __name__ == '__main__':
+    from backend.storage.vote_db import init_vote_db
+    init_vote_db()
+    follower.start()
+    app.run(host='0.0.0.0', port=FOLLOWER_SERVER_PORT)
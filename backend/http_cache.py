@@ -0,0 +1,102 @@
+"""
+只读接口的条件请求（ETag / If-None-Match）与响应缓存
+
+计票结果和投票验证的响应只取决于已提交的投票（Merkle 根）和请求路径：
+- ETag 由请求路径和当前 Merkle 根生成；客户端带 If-None-Match 重复轮询时直接返回 304，
+  既不重新计算也不传输响应体
+- 没有带 ETag 的请求命中按同一键缓存的响应体（LRU，超过上限时淘汰最久未使用的条目）
+- 新的投票写入后 Merkle 根改变，ETag 和缓存键随之改变，旧条目不再命中，逐渐被淘汰
+
+计票证明含随机数，同一版本多次计算的响应体不完全相同，因此使用弱 ETag。
+
+用法：
+    response_cache = ResponseCache()
+
+    @app.route('/tally/result', methods=['GET'])
+    @http_cache.conditional(response_cache)
+    def get_tally_result(): ...
+"""
+import hashlib
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from typing import Callable, Optional, Tuple
+
+from backend.config import RESPONSE_CACHE_SIZE
+from backend.metrics import RESPONSE_CACHE_REQUESTS
+
+
+class ResponseCache:
+    """LRU 响应缓存：ETag -> (状态码, 响应体, MIME 类型)"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._entries: "OrderedDict[str, Tuple[int, bytes, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[int, bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: Tuple[int, bytes, str]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def make_etag(*parts) -> str:
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+def current_version() -> str:
+    """已提交投票的版本标识：当前 Merkle 根（读取缓存的只读视图，不持有写入锁）"""
+    from backend.storage.vote_view import current_view
+    return current_view().merkle_root or "empty"
+
+
+def conditional(cache: ResponseCache, version: Callable[[], str] = current_version):
+    """
+    Flask 视图装饰器：为 200 响应加上弱 ETag，处理 If-None-Match，并缓存响应体
+    :param version: 返回当前数据版本标识的函数，默认为 Merkle 根
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import current_app, make_response, request
+
+            # 先取版本再计算：计算期间有新投票时，响应只会比 ETag 新，客户端下次请求会拿到最新结果
+            etag = make_etag(request.full_path, version())
+            if request.if_none_match.contains_weak(etag):
+                RESPONSE_CACHE_REQUESTS.inc(result="not_modified")
+                response = current_app.response_class(status=304)
+            else:
+                cached = cache.get(etag)
+                if cached is not None:
+                    RESPONSE_CACHE_REQUESTS.inc(result="hit")
+                    status, body, mimetype = cached
+                    response = current_app.response_class(body, status=status, mimetype=mimetype)
+                else:
+                    RESPONSE_CACHE_REQUESTS.inc(result="miss")
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    cache.put(etag, (response.status_code, response.get_data(), response.mimetype))
+            response.set_etag(etag, weak=True)
+            # 允许客户端保存响应，但每次使用前都要带 ETag 重新验证
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,252 @@
+"""
+进程内共享的密钥注册表
+
+- 密钥文件在首次使用时读取一次，之后所有控制器共用同一份参数
+- 路径相对项目根目录（可用 VOTING_KEY_DIR 覆盖），与启动时的工作目录无关
+- 导入和加载时不再自动生成密钥：缺少密钥文件时报错，提示先离线生成
+- 离散对数查找表等派生数据同样按需计算一次后缓存
+
+ElGamal 群由 ELGAMAL_GROUP 选择，服务器和生成密钥时须使用相同的设置：
+    1024                   本地搜索安全素数生成的参数（旧部署的默认值，生成需要数分钟）
+    modp2048 / modp3072    RFC 3526 MODP 群
+    ffdhe2048 / ffdhe3072  RFC 7919 FFDHE 群
+使用标准群时只在本地生成密钥对，几乎立即完成
+
+权重签名使用单独的 RSA 密钥（rsa_weight_params_*.json）：凭证密钥会对任意盲化消息签名，
+同一密钥上的其他签名都可以借盲签名接口伪造
+
+生成密钥（已存在时需加 --force 才会覆盖）：
+    python -m backend.keys
+    ELGAMAL_GROUP=ffdhe2048 python -m backend.keys --only elgamal
+    python -m backend.keys --only rsa --force
+    python -m backend.keys --only weight
+"""
+import argparse
+import json
+import os
+import sys
+from threading import Lock
+from typing import Dict, Tuple
+
+from backend.crypto.groups import GROUPS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEY_DIR = os.environ.get("VOTING_KEY_DIR", BASE_DIR)
+
+PARAM_BITS = 1024
+RSA_BITS = 2048
+# 标准群名称，或本地生成参数时的位数
+ELGAMAL_GROUP = os.environ.get("ELGAMAL_GROUP", str(PARAM_BITS))
+
+
+
+def elgamal_key_file(group: str) -> str:
+    return os.path.join(KEY_DIR, f"elgamal_params_{group}.json")
+
+
+ELGAMAL_KEY_FILE = elgamal_key_file(ELGAMAL_GROUP)
+RSA_KEY_FILE = os.path.join(KEY_DIR, f"rsa_params_{RSA_BITS}.json")
+WEIGHT_KEY_FILE = os.path.join(KEY_DIR, f"rsa_weight_params_{RSA_BITS}.json")
+
+_lock = Lock()
+_cache: Dict[str, object] = {}
+
+
+class KeysMissingError(FileNotFoundError):
+    """密钥文件不存在"""
+
+    def __init__(self, path: str):
+        super().__init__(f"密钥文件不存在: {path}，请先运行 python -m backend.keys 生成密钥")
+        self.path = path
+
+
+def _read_json(path: str) -> Dict:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise KeysMissingError(path) from None
+
+
+def _cached(name: str, loader):
+    """按名称缓存加载结果，多个线程同时首次访问时只加载一次"""
+    value = _cache.get(name)
+    if value is None:
+        with _lock:
+            value = _cache.get(name)
+            if value is None:
+                value = _cache[name] = loader()
+    return value
+
+
+def reset():
+    """清空缓存，下次访问时重新读取密钥文件（仅用于测试和重新生成密钥后）"""
+    with _lock:
+        _cache.clear()
+
+
+# ---------- ElGamal ----------
+
+def elgamal_keys() -> Tuple[int, int, int, int]:
+    """ElGamal 参数 (p, g, y, x)"""
+    def load():
+        data = _read_json(ELGAMAL_KEY_FILE)
+        group = data.get("group")
+        if group is not None and (group not in GROUPS or int(data["p"]) != GROUPS[group].p):
+            raise ValueError(f"{ELGAMAL_KEY_FILE} 中的参数与标准群 {group} 不一致")
+        return int(data["p"]), int(data["g"]), int(data["y"]), int(data["x"])
+    return _cached("elgamal", load)
+
+
+def discrete_log_table(limit: int) -> Dict[int, int]:
+    """
+    g^m mod p -> m 的查找表（0 <= m <= limit），计票解密时代替逐个穷举
+    表只会按需增长，同一进程内共享
+    """
+    table = _cache.get("dlog")
+    if table is None or table["limit"] < limit:
+        p, g, _, _ = elgamal_keys()
+        with _lock:
+            table = _cache.get("dlog") or {"limit": -1, "values": {}, "next": 1}
+            if table["limit"] < limit:
+                values = dict(table["values"])
+                accum = table["next"]
+                for m in range(table["limit"] + 1, limit + 1):
+                    values.setdefault(accum, m)
+                    accum = accum * g % p
+                # 整体替换而不是原地修改，其他线程读到的总是完整的表
+                table = _cache["dlog"] = {"limit": limit, "values": values, "next": accum}
+    return table["values"]
+
+
+def generate_elgamal_keys(group: str = None, path: str = None) -> Tuple[int, int, int, int]:
+    """
+    生成 ElGamal 密钥并写入文件
+    :param group: 标准群名称（只生成密钥对），或位数（用 PyCryptodome 搜索安全素数，耗时较长）
+    """
+    group = group or ELGAMAL_GROUP
+    path = path or elgamal_key_file(group)
+    if group in GROUPS:
+        from Crypto.Util import number
+        standard = GROUPS[group]
+        p, g = standard.p, standard.g
+        x = number.getRandomRange(2, standard.q - 1)
+        y = pow(g, x, p)
+        params = {"group": group}
+    elif group.isdigit():
+        from Crypto import Random
+        from Crypto.PublicKey import ElGamal
+        key = ElGamal.generate(int(group), Random.new().read)
+        p, g, y, x = int(key.p), int(key.g), int(key.y), int(key.x)
+        params = {}
+    else:
+        raise ValueError(f"Unknown ElGamal group: {group}")
+    params.update({
+        "p": str(p),
+        "g": str(g),
+        "y": str(y),  # 公钥部分
+        "x": str(x)   # 私钥部分
+    })
+    with open(path, "w") as f:
+        json.dump(params, f)
+    print(f"已生成并缓存 ElGamal 参数到 {path}")
+    reset()
+    return p, g, y, x
+
+
+# ---------- RSA ----------
+
+def rsa_crt_components(p: int, q: int, d: int) -> Dict[str, str]:
+    """计算 CRT 签名所需的分量 (p, q, dp, dq, qinv)"""
+    return {
+        "p": str(p),
+        "q": str(q),
+        "dp": str(d % (p - 1)),
+        "dq": str(d % (q - 1)),
+        "qinv": str(pow(q, -1, p))
+    }
+
+
+def _load_rsa_public(path: str) -> Tuple[int, int]:
+    data = _read_json(path)
+    return int(data["n"]), int(data["e"])
+
+
+def _load_rsa_private(path: str) -> Dict[str, int]:
+    """旧密钥文件没有保存 p、q 时，由 (n, e, d) 恢复分解并写回文件"""
+    data = _read_json(path)
+    if not all(k in data for k in ("p", "q", "dp", "dq", "qinv")):
+        from Crypto.PublicKey import RSA
+        key = RSA.construct((int(data["n"]), int(data["e"]), int(data["d"])))
+        data.update(rsa_crt_components(int(key.p), int(key.q), int(key.d)))
+        with open(path, "w") as f:
+            json.dump(data, f)
+        print(f"已补充 RSA CRT 参数到 {path}")
+    return {k: int(v) for k, v in data.items()}
+
+
+def rsa_public_key() -> Tuple[int, int]:
+    """RSA 公钥 (n, e)，验证签名只需要这一部分"""
+    return _cached("rsa_public", lambda: _load_rsa_public(RSA_KEY_FILE))
+
+
+def rsa_private_key() -> Dict[str, int]:
+    """含 CRT 分量的 RSA 私钥 {"n", "e", "d", "p", "q", "dp", "dq", "qinv"}"""
+    return _cached("rsa_private", lambda: _load_rsa_private(RSA_KEY_FILE))
+
+
+def weight_public_key() -> Tuple[int, int]:
+    """权重签名公钥 (n, e)"""
+    return _cached("weight_public", lambda: _load_rsa_public(WEIGHT_KEY_FILE))
+
+
+def weight_private_key() -> Dict[str, int]:
+    """权重签名私钥，格式同 rsa_private_key()，只有认证服务器签发权重时需要"""
+    return _cached("weight_private", lambda: _load_rsa_private(WEIGHT_KEY_FILE))
+
+
+def generate_rsa_keys(bits: int = None, path: str = None) -> Tuple[int, int, int]:
+    """生成 RSA 密钥（含 CRT 分量）并写入文件"""
+    from Crypto import Random
+    from Crypto.PublicKey import RSA
+    path = path or RSA_KEY_FILE
+    key = RSA.generate(bits or RSA_BITS, Random.new().read)
+    params = {
+        "n": str(key.n),  # modulus
+        "e": str(key.e),  # public exponent
+        "d": str(key.d)   # private exponent
+    }
+    # 保留分解和 CRT 分量，用于加速签名
+    params.update(rsa_crt_components(int(key.p), int(key.q), int(key.d)))
+    with open(path, "w") as f:
+        json.dump(params, f)
+    print(f"已生成并缓存 RSA 参数到 {path}")
+    reset()
+    return int(key.n), int(key.e), int(key.d)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线生成选举密钥")
+    parser.add_argument("--only", choices=("elgamal", "rsa", "weight"), default=None, help="只生成其中一种密钥")
+    parser.add_argument("--force", action="store_true", help="覆盖已有的密钥文件")
+    parser.add_argument("--group", choices=(str(PARAM_BITS),) + tuple(GROUPS), default=ELGAMAL_GROUP,
+                        help="ElGamal 群（默认取 ELGAMAL_GROUP），服务器需设置相同的 ELGAMAL_GROUP")
+    args = parser.parse_args(argv)
+
+    jobs = [
+        ("elgamal", elgamal_key_file(args.group), lambda: generate_elgamal_keys(args.group)),
+        ("rsa", RSA_KEY_FILE, generate_rsa_keys),
+        ("weight", WEIGHT_KEY_FILE, lambda: generate_rsa_keys(path=WEIGHT_KEY_FILE)),
+    ]
+    for name, path, generate in jobs:
+        if args.only and args.only != name:
+            continue
+        if os.path.exists(path) and not args.force:
+            print(f"{path} 已存在，跳过（使用 --force 覆盖）")
+            continue
+        generate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
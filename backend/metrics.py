@@ -0,0 +1,336 @@
+"""
+轻量级指标：计数器与直方图，以 Prometheus 文本格式在 /metrics 暴露
+
+设置环境变量 VOTING_METRICS=0 可关闭采集，此时每个埋点只剩一次全局变量判断
+
+用法：
+    with STAGE_SECONDS.time(operation="store_vote", stage="merkle"):
+        ...
+    SUBMIT_REJECTS.inc(reason="invalid_zkp")
+    metrics.install(app)   # 为 Flask 应用注册 /metrics 和请求耗时统计
+"""
+import os
+import time
+from threading import Lock
+from typing import Dict, List, Tuple
+
+ENABLED = os.environ.get("VOTING_METRICS", "1") != "0"
+
+# 默认延迟分桶（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: Dict[str, "_Metric"] = {}
+_registry_lock = Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def set(self, value: float, **labels):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    """关闭采集时使用的空计时器"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram(_Metric):
+    """累积分桶直方图"""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 标签值 -> [各桶计数（非累积）, 总和, 总数]
+        self._values = {}
+
+    def observe(self, value: float, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """计时上下文管理器"""
+        if not ENABLED:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(e[0]), e[1], e[2])) for key, e in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+def _register(cls, name, documentation, labelnames=(), **kwargs):
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = cls(name, documentation, labelnames, **kwargs)
+        return _registry[name]
+
+
+def counter(name: str, documentation: str, labelnames=()) -> Counter:
+    """获取或创建计数器"""
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames=()) -> Gauge:
+    """获取或创建瞬时值指标"""
+    return _register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    """获取或创建直方图"""
+    return _register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+def render() -> str:
+    """以 Prometheus 文本格式输出全部指标"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """清空所有指标的取值（仅用于测试）"""
+    with _registry_lock:
+        for metric in _registry.values():
+            metric.clear()
+
+
+# ---------- 各服务共用的指标 ----------
+
+STAGE_SECONDS = histogram(
+    "voting_stage_seconds", "各操作分阶段耗时", ("operation", "stage")
+)
+LOCK_WAIT_SECONDS = histogram(
+    "voting_lock_wait_seconds", "等待锁的时间", ("lock",)
+)
+VOTES_STORED = counter(
+    "voting_votes_stored_total", "已存储的投票数"
+)
+SUBMIT_REJECTS = counter(
+    "voting_submit_rejects_total", "被拒绝的投票提交", ("reason",)
+)
+CREDENTIAL_REJECTS = counter(
+    "voting_credential_rejects_total", "验证失败的凭证", ("reason",)
+)
+ADMISSION_IN_FLIGHT = gauge(
+    "voting_admission_in_flight", "正在处理的受准入控制的请求数"
+)
+ADMISSION_QUEUE_DEPTH = gauge(
+    "voting_admission_queue_depth", "排队等待处理的请求数"
+)
+ADMISSION_REJECTS = counter(
+    "voting_admission_rejects_total", "被准入控制拒绝的请求", ("reason",)
+)
+ADMISSION_QUEUE_SECONDS = histogram(
+    "voting_admission_queue_seconds", "请求排队等待的时间"
+)
+REPLICATION_LAG_RECORDS = gauge(
+    "voting_replication_lag_records", "从节点落后主节点的投票数"
+)
+REPLICATION_LAG_BYTES = gauge(
+    "voting_replication_lag_bytes", "从节点落后主节点的日志字节数"
+)
+REPLICATION_LAG_SECONDS = gauge(
+    "voting_replication_lag_seconds", "从节点距上次追平主节点的时间"
+)
+REPLICATION_ERRORS = counter(
+    "voting_replication_errors_total", "日志复制失败次数", ("reason",)
+)
+RESPONSE_CACHE_REQUESTS = counter(
+    "voting_response_cache_requests_total", "只读接口的缓存结果（hit / miss / not_modified）", ("result",)
+)
+AUDIT_WRITE_ERRORS = counter(
+    "voting_audit_write_errors_total", "审计日志写入失败的批次数"
+)
+AUDIT_RECORDS_DROPPED = counter(
+    "voting_audit_records_dropped_total", "写入失败而丢失的审计记录数"
+)
+HTTP_REQUEST_SECONDS = histogram(
+    "voting_http_request_seconds", "HTTP 请求处理耗时", ("method", "endpoint", "status")
+)
+
+
+def install(app):
+    """为 Flask 应用注册 /metrics 接口和请求耗时统计"""
+    from flask import Response, request
+
+    @app.before_request
+    def _start_timer():
+        if ENABLED:
+            request.environ["voting.start_time"] = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = request.environ.get("voting.start_time")
+        if start is not None:
+            # 用路由模板而不是实际路径作为标签，避免标签基数无限增长
+            endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=request.method, endpoint=endpoint, status=response.status_code
+            )
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    return app
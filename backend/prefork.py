@@ -0,0 +1,103 @@
+"""
+多进程运行 Flask 应用（prefork）
+
+父进程绑定监听端口后 fork 出多个工作进程，各工作进程在同一个监听套接字上 accept，
+由内核把连接分配给空闲的进程，计算密集的验证可以用满多核。
+
+各进程共享的状态都在磁盘上：
+- 投票日志、偏移量索引、快照：写入者持有日志文件锁，并先重放其他进程追加的日志尾部（vote_db._writer）
+- 回执索引、已使用序列号：SQLite，唯一约束保证跨进程不重复
+- 审计日志：每个进程写自己的分段（分段以 O_EXCL 创建）
+指标、准入控制名额等仍是每个进程各自一份。
+
+用法：
+    prefork.serve(app, "0.0.0.0", 5002, workers=4, on_start=init_vote_db)
+"""
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Callable, Dict
+
+from werkzeug.serving import get_sockaddr, make_server, select_address_family
+
+logger = logging.getLogger(__name__)
+
+# 工作进程异常退出后重新启动前的等待时间（秒），避免启动即崩溃时空转
+RESPAWN_DELAY = 1.0
+
+
+def _run_worker(app, host: str, port: int, fd: int, on_start: Callable = None):
+    """工作进程：在继承的监听套接字上运行多线程 WSGI 服务器，不返回"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    code = 0
+    try:
+        if on_start is not None:
+            on_start()
+        server = make_server(host, port, app, threaded=True, fd=fd)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        logger.exception(f"工作进程 {os.getpid()} 异常退出")
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def serve(app, host: str, port: int, workers: int, on_start: Callable = None):
+    """
+    绑定端口并启动工作进程，直到收到 SIGINT / SIGTERM
+    :param app: WSGI 应用
+    :param workers: 工作进程数
+    :param on_start: 每个工作进程启动后、开始接受请求前执行（如恢复存储状态）
+    """
+    family = select_address_family(host, port)
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(get_sockaddr(host, port, family))
+    listener.listen(socket.SOMAXCONN)
+    listener.set_inheritable(True)
+
+    children: Dict[int, float] = {}  # pid -> 启动时间
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(app, host, port, listener.fileno(), on_start)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    logger.info(f"在 {host}:{port} 上启动 {workers} 个工作进程: {sorted(children)}")
+
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = children.pop(pid, None)
+            if started is None or stopping:
+                continue
+            logger.error(f"工作进程 {pid} 退出（状态 {status}），重新启动")
+            if time.monotonic() - started < RESPAWN_DELAY:
+                time.sleep(RESPAWN_DELAY)
+            if not stopping:
+                spawn()
+    finally:
+        listener.close()
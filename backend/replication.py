@@ -0,0 +1,192 @@
+"""
+投票日志复制（主从）
+
+主节点（计票服务器）在 GET /replication/log?offset=N 上返回本地日志从偏移 N 开始的原始字节，
+响应头带有这段日志结束处的检查点：
+    X-Log-Offset / X-Log-End   这段日志在主节点日志中的起止偏移
+    X-Vote-Count               结束处的票数
+    X-Chain-Head               结束处的哈希链头
+    X-Merkle-Root              结束处的 Merkle 根
+
+从节点按本地日志长度拉取新增部分，追加到本地日志后重放（重新校验哈希链，补齐偏移量索引、回执索引和快照），
+追平检查点时核对链头和 Merkle 根与主节点一致。从节点只提供验证和导出等只读接口，
+读取流量不再与投票写入争用同一个进程和文件。
+
+落后程度通过 /metrics 暴露：
+    voting_replication_lag_records   落后的票数
+    voting_replication_lag_bytes     落后的日志字节数
+    voting_replication_lag_seconds   距上次追平主节点的时间
+"""
+import logging
+import time
+from threading import Event, Lock, Thread
+from typing import Dict, Optional
+
+import requests
+
+from backend.config import REPLICATION_LEADER_URL, REPLICATION_POLL_INTERVAL
+from backend.metrics import (
+    REPLICATION_LAG_RECORDS, REPLICATION_LAG_BYTES, REPLICATION_LAG_SECONDS, REPLICATION_ERRORS
+)
+from backend.storage import vote_db
+
+logger = logging.getLogger(__name__)
+
+# 读取日志的块大小
+CHUNK_SIZE = 1 << 20
+# (连接超时, 读取超时)，单位秒
+DEFAULT_TIMEOUT = (3.05, 60)
+# 连续失败时重试间隔的上限（秒）
+MAX_BACKOFF = 30.0
+
+
+class ReplicationError(Exception):
+    """从节点的日志与主节点不一致，无法继续复制"""
+
+
+def checkpoint_headers(checkpoint: Dict, start_offset: int) -> Dict[str, str]:
+    """主节点响应头：本次返回的日志范围和结束处的检查点"""
+    return {
+        "X-Log-Offset": str(start_offset),
+        "X-Log-End": str(checkpoint["log_offset"]),
+        "X-Vote-Count": str(checkpoint["count"]),
+        "X-Chain-Head": checkpoint["chain_head"],
+        "X-Merkle-Root": checkpoint["merkle_root"] or "",
+    }
+
+
+def _parse_checkpoint(headers) -> Dict:
+    return {
+        "log_offset": int(headers["X-Log-End"]),
+        "count": int(headers["X-Vote-Count"]),
+        "chain_head": headers["X-Chain-Head"],
+        "merkle_root": headers.get("X-Merkle-Root") or None,
+    }
+
+
+class Follower:
+    """从主节点拉取日志并在本地重放"""
+
+    def __init__(self, leader_url: str = REPLICATION_LEADER_URL,
+                 poll_interval: float = REPLICATION_POLL_INTERVAL,
+                 session: requests.Session = None, timeout=DEFAULT_TIMEOUT):
+        """
+        :param leader_url: 主节点地址
+        :param poll_interval: 追平后再次拉取的间隔（秒）
+        """
+        self.leader_url = leader_url.rstrip("/")
+        self.poll_interval = poll_interval
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._leader: Optional[Dict] = None
+        self._caught_up_at: Optional[float] = None
+        self._error: Optional[str] = None
+
+    def sync_once(self) -> int:
+        """
+        拉取并重放主节点新增的日志
+        :raises ReplicationError: 本地日志与主节点不一致
+        :return: 本次重放的记录数
+        """
+        local = vote_db.get_checkpoint()
+        response = self.session.get(
+            f"{self.leader_url}/replication/log",
+            params={"offset": local["log_offset"]},
+            stream=True, timeout=self.timeout
+        )
+        with response:
+            if response.status_code == 416:
+                raise ReplicationError(f"主节点拒绝本地日志位置 {local['log_offset']}: {response.text}")
+            response.raise_for_status()
+            leader = _parse_checkpoint(response.headers)
+            applied = 0
+            if leader["log_offset"] > local["log_offset"]:
+                try:
+                    applied = vote_db.replicate_log(
+                        response.iter_content(CHUNK_SIZE), local["log_offset"],
+                        leader["log_offset"] - local["log_offset"]
+                    )
+                except RuntimeError as e:
+                    # 重放时哈希链校验失败或索引不连续
+                    raise ReplicationError(str(e)) from e
+                local = vote_db.get_checkpoint()
+
+        if local["count"] == leader["count"] and (
+                local["chain_head"] != leader["chain_head"] or local["merkle_root"] != leader["merkle_root"]):
+            raise ReplicationError(f"第 {local['count']} 票处的链头或 Merkle 根与主节点不一致")
+        self._update_lag(local, leader)
+        return applied
+
+    def _update_lag(self, local: Dict, leader: Dict):
+        now = time.monotonic()
+        with self._lock:
+            # 主节点的多个工作进程可能处于不同位置，只保留见过的最新检查点
+            if self._leader is None or leader["count"] >= self._leader["count"]:
+                self._leader = leader
+            leader = self._leader
+            if local["count"] >= leader["count"]:
+                self._caught_up_at = now
+            self._error = None
+        REPLICATION_LAG_RECORDS.set(max(0, leader["count"] - local["count"]))
+        REPLICATION_LAG_BYTES.set(max(0, leader["log_offset"] - local["log_offset"]))
+        self._update_lag_seconds(now)
+
+    def _update_lag_seconds(self, now: float):
+        if self._caught_up_at is not None:
+            REPLICATION_LAG_SECONDS.set(now - self._caught_up_at)
+
+    def run(self):
+        """循环拉取直到 stop()；网络错误时退避重试，日志不一致时停止"""
+        backoff = self.poll_interval
+        while not self._stop.is_set():
+            try:
+                applied = self.sync_once()
+                backoff = self.poll_interval
+            except ReplicationError as e:
+                logger.error(f"停止日志复制: {e}")
+                REPLICATION_ERRORS.inc(reason="diverged")
+                with self._lock:
+                    self._error = str(e)
+                return
+            except (requests.RequestException, ValueError, OSError) as e:
+                logger.warning(f"拉取主节点日志失败，{backoff:.1f} 秒后重试: {e}")
+                REPLICATION_ERRORS.inc(reason="transport")
+                with self._lock:
+                    self._error = str(e)
+                applied = 0
+                backoff = min(max(backoff, self.poll_interval) * 2, MAX_BACKOFF)
+            self._update_lag_seconds(time.monotonic())
+            # 刚拉到新记录时主节点可能还有更多，立即再拉一次
+            if not applied or backoff > self.poll_interval:
+                self._stop.wait(backoff)
+
+    def start(self) -> "Follower":
+        """在后台线程中开始复制"""
+        if self._thread is None:
+            self._thread = Thread(target=self.run, name="replication-follower", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self) -> Dict:
+        local = vote_db.get_checkpoint()
+        with self._lock:
+            leader = self._leader
+            caught_up_at = self._caught_up_at
+            error = self._error
+        return {
+            "leader_url": self.leader_url,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "local": local,
+            "leader": leader,
+            "lag_records": None if leader is None else max(0, leader["count"] - local["count"]),
+            "lag_seconds": None if caught_up_at is None else time.monotonic() - caught_up_at,
+            "error": error,
+        }
@@ -4,17 +4,24 @@ from typing import List
 def sha256(data: str) -> str:
     return hashlib.sha256(data.encode('utf-8')).hexdigest()
 
+GENESIS_HASH = "0" * 64
+
 class HashChain:
     def __init__(self):
         self.chain: List[str] = []
 
+    @staticmethod
+    def next_hash(prev_hash: str, data: str) -> str:
+        """根据前一区块哈希计算下一区块哈希"""
+        return sha256(prev_hash + data)
+
     def add_block(self, data: str):
         if not self.chain:
-            prev_hash = "0" * 64
+            prev_hash = GENESIS_HASH
         else:
             prev_hash = self.chain[-1]
 
-        block_hash = sha256(prev_hash + data)
+        block_hash = self.next_hash(prev_hash, data)
         self.chain.append(block_hash)
         return block_hash
 
@@ -25,7 +32,7 @@ class HashChain:
         if len(data_list) != len(self.chain):
             return False
 
-        prev_hash = "0" * 64
+        prev_hash = GENESIS_HASH
         for i, data in enumerate(data_list):
             expected_hash = sha256(prev_hash + data)
             if expected_hash != self.chain[i]:
@@ -1,5 +1,5 @@
 import hashlib
-from typing import List
+from typing import Dict, List, Tuple
 
 
 def sha256(data: bytes) -> str:
@@ -58,11 +58,51 @@ class MerkleTree:
             else:
                 sibling_hash = level[sibling_index]
 
-            proof.append((sibling_hash, not is_right_node))
+            # 当前节点在右侧时，兄弟节点在左侧
+            proof.append((sibling_hash, bool(is_right_node)))
             index = index // 2
         return proof
 
+    def get_multi_proof(self, indices: List[int]) -> Dict:
+        """
+        获取多个叶子节点的批量 Merkle 证明
+        自底向上逐层合并路径，只保留无法由已知节点推出的兄弟哈希（去重）
+        :param indices: 叶子索引列表
+        :return: {"leaf_count": 叶子总数, "indices": 排序去重后的索引, "hashes": [兄弟哈希]}
+        """
+        if not self.levels:
+            raise ValueError("Empty Merkle tree")
+
+        known = sorted(set(indices))
+        if not known:
+            raise ValueError("No leaf indices given")
+        if known[0] < 0 or known[-1] >= len(self.leaves):
+            raise IndexError("Leaf index out of range")
+
+        hashes = []
+        result_indices = list(known)
+        for level in self.levels[:-1]:
+            known_set = set(known)
+            parents = []
+            for index in known:
+                parent = index // 2
+                if parents and parents[-1] == parent:
+                    continue  # 左右兄弟均已知，只需计算一次
+                if index % 2 == 0:
+                    sibling_index = index + 1
+                    # 右兄弟已知或不存在（奇数个节点时重复自身）时不需要额外哈希
+                    if sibling_index not in known_set and sibling_index < len(level):
+                        hashes.append(level[sibling_index])
+                else:
+                    hashes.append(level[index - 1])
+                parents.append(parent)
+            known = parents
 
+        return {
+            "leaf_count": len(self.leaves),
+            "indices": result_indices,
+            "hashes": hashes
+        }
 
     @staticmethod
     def verify_proof(leaf: str, proof: List[tuple], root: str) -> bool:
@@ -90,4 +130,242 @@ class MerkleTree:
                 # 如果兄弟节点在右边
                 current_hash = sha256((current_hash + sibling_hash).encode())
     
-        return current_hash == root
\ No newline at end of file
+        return current_hash == root
+
+    @staticmethod
+    def verify_multi_proof(leaves: Dict[int, str], proof: Dict, root: str) -> bool:
+        """
+        一次自底向上遍历验证批量 Merkle 证明
+        :param leaves: {叶子索引: 原始数据（字符串）}
+        :param proof: get_multi_proof 的返回值
+        :param root: Merkle 根
+        """
+        if root is None or not leaves:
+            return False
+
+        try:
+            level_len = int(proof["leaf_count"])
+            if sorted(leaves) != list(proof["indices"]):
+                return False
+            if min(leaves) < 0 or max(leaves) >= level_len:
+                return False
+
+            hashes = iter(proof["hashes"])
+            current = {index: sha256(leaf.encode()) for index, leaf in leaves.items()}
+
+            while level_len > 1:
+                next_level = {}
+                for index in sorted(current):
+                    parent = index // 2
+                    if parent in next_level:
+                        continue
+                    if index % 2 == 0:
+                        left = current[index]
+                        if index + 1 in current:
+                            right = current[index + 1]
+                        elif index + 1 >= level_len:
+                            right = left  # 重复节点
+                        else:
+                            right = next(hashes)
+                    else:
+                        left = next(hashes)
+                        right = current[index]
+                    next_level[parent] = sha256((left + right).encode())
+                current = next_level
+                level_len = (level_len + 1) // 2
+
+            # 证明中不能有多余的哈希
+            if next(hashes, None) is not None:
+                return False
+            return current[0] == root
+        except (KeyError, TypeError, ValueError, StopIteration):
+            return False
+
+
+class MerkleFrontier:
+    """
+    增量 Merkle 树：只保存各完整子树的根（frontier），追加叶子为 O(log n)
+    对相同的叶子序列，根和证明与 MerkleTree 的结果一致
+    """
+
+    def __init__(self, leaf_count: int = 0, nodes: Dict[int, str] = None):
+        self.leaf_count = leaf_count
+        self.nodes: Dict[int, str] = dict(nodes or {})  # 高度 -> 完整子树的根
+
+    def append(self, leaf: str) -> List[tuple]:
+        """
+        追加叶子节点（原始数据）
+        :return: 新叶子在追加后的树中的 Merkle Proof
+        """
+        return self.append_hash(sha256(leaf.encode()))
+
+    def append_hash(self, node: str) -> List[tuple]:
+        """追加已哈希的叶子节点，返回其 Merkle Proof"""
+        proof = []
+        height = 0
+        # 与二进制计数器进位相同：逐层合并相同高度的完整子树
+        while (self.leaf_count >> height) & 1:
+            left = self.nodes.pop(height)
+            proof.append((left, True))
+            node = sha256((left + node).encode())
+            height += 1
+        self.nodes[height] = node
+        self.leaf_count += 1
+
+        _, upper_proof = self._path_to_root(height)
+        return proof + upper_proof
+
+    def batch_proofs(self, leaves: List[str]) -> Tuple[str, List[List[tuple]]]:
+        """
+        计算依次追加 leaves（原始数据）之后的根，以及各新叶子对这个根的 Merkle Proof（不修改 frontier）
+        新叶子左侧的部分只需要 frontier 中的完整子树根
+        """
+        if not leaves:
+            return self.get_root(), []
+        start = self.leaf_count
+        size = start + len(leaves)
+        nodes = [sha256(leaf.encode()) for leaf in leaves]
+        levels = []  # 每层 (第一个已知节点的位置, 该位置到本层末尾的节点)
+        height = 0
+        while size > 1:
+            if start % 2:
+                # 左兄弟是旧叶子构成的完整子树
+                start -= 1
+                nodes = [self.nodes[height]] + nodes
+            levels.append((start, nodes))
+            parents = []
+            for k in range(0, len(nodes), 2):
+                left = nodes[k]
+                right = nodes[k + 1] if k + 1 < len(nodes) else left  # 奇数个节点，重复最后一个
+                parents.append(sha256((left + right).encode()))
+            nodes = parents
+            start //= 2
+            size = (size + 1) // 2
+            height += 1
+
+        proofs = []
+        for leaf_index in range(self.leaf_count, self.leaf_count + len(leaves)):
+            proof = []
+            index = leaf_index
+            for level_start, level in levels:
+                sibling = (index ^ 1) - level_start
+                if sibling >= len(level):
+                    sibling = index - level_start  # 重复节点
+                proof.append((level[sibling], bool(index % 2)))
+                index //= 2
+            proofs.append(proof)
+        return nodes[0], proofs
+
+    def _path_to_root(self, height: int) -> Tuple[str, List[tuple]]:
+        """从高度最低的完整子树向上计算根，返回 (root, proof)"""
+        n = self.leaf_count
+        node = self.nodes[height]
+        proof = []
+        while (n + (1 << height) - 1) >> height > 1:
+            level_len = (n + (1 << height) - 1) >> height
+            if level_len % 2:
+                proof.append((node, False))  # 奇数个节点，重复最后一个
+                node = sha256((node + node).encode())
+            else:
+                left = self.nodes[height]
+                proof.append((left, True))
+                node = sha256((left + node).encode())
+            height += 1
+        return node, proof
+
+    def get_root(self) -> str:
+        """获取 Merkle 根"""
+        if not self.leaf_count:
+            return ""
+        lowest = (self.leaf_count & -self.leaf_count).bit_length() - 1
+        return self._path_to_root(lowest)[0]
+
+    def to_dict(self) -> Dict:
+        return {
+            "leaf_count": self.leaf_count,
+            "nodes": {str(h): node for h, node in self.nodes.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MerkleFrontier":
+        return cls(
+            leaf_count=int(data["leaf_count"]),
+            nodes={int(h): node for h, node in data["nodes"].items()}
+        )
+
+
+class _PrefixLevel:
+    """前缀树的一层：完整节点取自共享的只追加列表，最右侧未满的节点单独保存"""
+
+    __slots__ = ("nodes", "length", "edge")
+
+    def __init__(self, nodes: List[str], length: int, edge: str = None):
+        self.nodes = nodes
+        self.length = length
+        self.edge = edge
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < self.length:
+            raise IndexError("Merkle level index out of range")
+        if self.edge is not None and index == self.length - 1:
+            return self.edge
+        return self.nodes[index]
+
+
+class AppendOnlyMerkleTree:
+    """
+    只追加的 Merkle 树：按高度保存所有完整子树的根，追加叶子均摊 O(1)
+    prefix(n) 返回前 n 个叶子构成的树，根和证明与 MerkleTree 一致；
+    已取得的前缀树只引用完整节点，之后的追加不会改变它
+    """
+
+    def __init__(self):
+        self.levels: List[List[str]] = [[]]  # 高度 -> 完整节点列表
+
+    @property
+    def leaf_count(self) -> int:
+        return len(self.levels[0])
+
+    def append(self, leaf: str):
+        """追加叶子节点（原始数据）"""
+        self.append_hash(sha256(leaf.encode()))
+
+    def append_hash(self, node: str):
+        """追加已哈希的叶子节点"""
+        self.levels[0].append(node)
+        height = 0
+        # 这一层的完整节点数变为偶数时，上一层多出一个完整节点
+        while len(self.levels[height]) % 2 == 0:
+            level = self.levels[height]
+            if height + 1 == len(self.levels):
+                self.levels.append([])
+            self.levels[height + 1].append(sha256((level[-2] + level[-1]).encode()))
+            height += 1
+
+    def prefix(self, leaf_count: int) -> MerkleTree:
+        """前 leaf_count 个叶子构成的树（O(log n)，只计算右侧未满的节点）"""
+        if not 0 <= leaf_count <= self.leaf_count:
+            raise IndexError("Leaf count out of range")
+        tree = MerkleTree([])
+        if not leaf_count:
+            return tree
+        levels = [_PrefixLevel(self.levels[0], leaf_count)]
+        height = 0
+        while len(levels[-1]) > 1:
+            below = levels[-1]
+            height += 1
+            length = (len(below) + 1) // 2
+            last = length - 1
+            edge = None
+            if (last + 1) << height > leaf_count:
+                # 最右侧节点没有完整的子树，按 MerkleTree 的规则（奇数个节点时重复最后一个）计算
+                left = below[2 * last]
+                right = below[2 * last + 1] if 2 * last + 1 < len(below) else left
+                edge = sha256((left + right).encode())
+            levels.append(_PrefixLevel(self.levels[height] if height < len(self.levels) else [], length, edge))
+        tree.leaves = levels[0]
+        tree.levels = levels
+        return tree
@@ -0,0 +1,136 @@
+"投票回执索引：vote_hash -> vote_index，并拒绝重复提交的密文"
+
+import base64
+import hashlib
+import os
+import sqlite3
+from threading import Lock
+from typing import Dict, Optional
+
+RECEIPT_INDEX_PATH = os.path.join(os.path.dirname(__file__), "receipts.db")
+
+# 回执码取 vote_hash 前 10 字节（80 bit），Base32 编码后每4位一组
+RECEIPT_CODE_BYTES = 10
+
+
+class DuplicateBallotError(ValueError):
+    """完全相同的密文被重复提交"""
+
+
+def receipt_code(vote_hash: str) -> str:
+    """由 vote_hash 生成便于抄写的短回执码，如 ABCD-EFGH-IJKL-MNOP"""
+    raw = bytes.fromhex(vote_hash)[:RECEIPT_CODE_BYTES]
+    code = base64.b32encode(raw).decode()
+    return "-".join(code[i:i + 4] for i in range(0, len(code), 4))
+
+
+def parse_receipt_code(code: str) -> str:
+    """把回执码还原为 vote_hash 的十六进制前缀"""
+    raw = base64.b32decode(code.replace("-", "").upper())
+    if len(raw) != RECEIPT_CODE_BYTES:
+        raise ValueError("Invalid receipt code")
+    return raw.hex()
+
+
+def ciphertext_digest(alpha, beta) -> bytes:
+    """密文摘要，用于 O(1) 检测重放"""
+    return hashlib.sha256(f"{int(alpha)}:{int(beta)}".encode()).digest()
+
+
+class ReceiptIndex:
+    """持久化的回执索引（SQLite，追加时维护）"""
+
+    def __init__(self, path: str = RECEIPT_INDEX_PATH):
+        self.path = path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS receipts ("
+            " vote_hash TEXT PRIMARY KEY,"
+            " vote_index INTEGER NOT NULL UNIQUE,"
+            " ciphertext BLOB NOT NULL UNIQUE)"
+        )
+
+    def contains_ciphertext(self, alpha, beta) -> bool:
+        """密文是否已存储过"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM receipts WHERE ciphertext = ?",
+                (ciphertext_digest(alpha, beta),)
+            ).fetchone()
+        return row is not None
+
+    def existing_ciphertexts(self, pairs) -> set:
+        """批量查询已存储过的密文，pairs 为 (alpha, beta)，返回已存在的密文摘要集合"""
+        digests = [ciphertext_digest(a, b) for a, b in pairs]
+        found = set()
+        with self._lock:
+            # SQLite 单条语句的参数个数有上限，分块查询
+            for start in range(0, len(digests), 500):
+                chunk = digests[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT ciphertext FROM receipts WHERE ciphertext IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def add(self, vote_hash: str, vote_index: int, alpha, beta):
+        """登记一张已追加的投票"""
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO receipts (vote_hash, vote_index, ciphertext) VALUES (?, ?, ?)",
+                    (vote_hash, vote_index, ciphertext_digest(alpha, beta))
+                )
+            except sqlite3.IntegrityError:
+                raise DuplicateBallotError("Duplicate ciphertext")
+
+    def add_many(self, entries):
+        """在一个事务中登记多张投票，entries 为 (vote_hash, vote_index, alpha, beta)"""
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO receipts (vote_hash, vote_index, ciphertext) VALUES (?, ?, ?)",
+                    [(h, i, ciphertext_digest(a, b)) for h, i, a, b in entries]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def lookup(self, vote_hash: str) -> Optional[int]:
+        """按完整 vote_hash 查找投票索引"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vote_index FROM receipts WHERE vote_hash = ?",
+                (vote_hash.lower(),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def lookup_prefix(self, prefix: str) -> Optional[Dict]:
+        """按 vote_hash 前缀查找（用于短回执码），前缀不唯一时返回 None"""
+        prefix = prefix.lower()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT vote_hash, vote_index FROM receipts"
+                " WHERE vote_hash >= ? AND vote_hash < ? LIMIT 2",
+                (prefix, prefix + "g")
+            ).fetchall()
+        if len(rows) != 1:
+            return None
+        return {"vote_hash": rows[0][0], "index": rows[0][1]}
+
+    def max_index(self) -> int:
+        """已登记的最大投票索引，空索引返回 -1"""
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(vote_index) FROM receipts").fetchone()
+        return -1 if row[0] is None else row[0]
+
+    def clear(self):
+        """清空索引（仅用于测试）"""
+        with self._lock:
+            self._conn.execute("DELETE FROM receipts")
@@ -1,46 +1,254 @@
 import json
 import os
-from typing import List, Dict
-from .merkle_tree import MerkleTree
-from .hash_chain import HashChain
+import struct
+from contextlib import contextmanager
+from typing import List, Dict, Iterable, Iterator, Optional
+from .merkle_tree import MerkleFrontier
+from .hash_chain import HashChain, GENESIS_HASH
+from .receipt_index import (
+    ReceiptIndex, DuplicateBallotError, receipt_code, parse_receipt_code, ciphertext_digest
+)
 from datetime import datetime
 import fcntl
 import logging
 from ..models.vote import Vote, EncryptedAnswer
 from ..crypto.elgamal import ElGamalCiphertext
+from ..keys import elgamal_keys
+from ..metrics import STAGE_SECONDS, LOCK_WAIT_SECONDS, VOTES_STORED
+import time
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-VOTE_DB_PATH = os.path.join(os.path.dirname(__file__), "votes.json")
-HASH_CHAIN_PATH = os.path.join(os.path.dirname(__file__), "hash_chain.json")
+STORAGE_DIR = os.environ.get("VOTE_STORAGE_DIR", os.path.dirname(__file__))
+# 追加写的投票日志：每行一条记录 {"index", "vote", "vote_hash"}，
+# 批量写入的记录另带 "batch": {"start", "size"}，恢复时丢弃不完整的批次
+VOTE_LOG_PATH = os.path.join(STORAGE_DIR, "votes.log")
+# 偏移量索引：第 i 条记录在日志中的起始偏移（8字节定长）
+VOTE_INDEX_PATH = os.path.join(STORAGE_DIR, "votes.idx")
+# 周期性快照：票数、Merkle frontier、链头、同态累加值、偏移量
+SNAPSHOT_PATH = os.path.join(STORAGE_DIR, "snapshot.json")
+# 回执索引：vote_hash -> vote_index，同时用于检测重复密文
+RECEIPT_INDEX_PATH = os.path.join(STORAGE_DIR, "receipts.db")
+# 旧版整文件存储（仅用于迁移）
+LEGACY_VOTE_DB_PATH = os.path.join(STORAGE_DIR, "votes.json")
+
+# 每追加多少票写一次快照
+SNAPSHOT_INTERVAL = int(os.environ.get("VOTE_SNAPSHOT_INTERVAL", "1000"))
+# 每次追加后是否 fsync
+LOG_FSYNC = os.environ.get("VOTE_LOG_FSYNC", "0") == "1"
+
+_OFFSET = struct.Struct(">Q")
+
+
+class _StorageState:
+    """存储的内存状态，可由快照加日志尾部恢复"""
+
+    def __init__(self):
+        self.loaded = False
+        self.count = 0
+        self.log_offset = 0
+        self.chain_head = GENESIS_HASH
+        self.frontier = MerkleFrontier()
+        self.aggregate_alpha = 1
+        self.aggregate_beta = 1
+        self.last_snapshot_count = 0
+
+    def to_snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "log_offset": self.log_offset,
+            "index_offset": self.count * _OFFSET.size,
+            "chain_head": self.chain_head,
+            "merkle_frontier": self.frontier.to_dict(),
+            "aggregate": {
+                "alpha": str(self.aggregate_alpha),
+                "beta": str(self.aggregate_beta)
+            },
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def load_snapshot(self, snapshot: Dict):
+        self.count = int(snapshot["count"])
+        self.log_offset = int(snapshot["log_offset"])
+        self.chain_head = snapshot["chain_head"]
+        self.frontier = MerkleFrontier.from_dict(snapshot["merkle_frontier"])
+        self.aggregate_alpha = int(snapshot["aggregate"]["alpha"])
+        self.aggregate_beta = int(snapshot["aggregate"]["beta"])
+        self.last_snapshot_count = self.count
+
+
+_state = _StorageState()
+_modulus = None
+_receipts = None
+
+
+def _get_modulus() -> int:
+    """ElGamal 模数 p，用于维护同态累加值"""
+    global _modulus
+    if _modulus is None:
+        _modulus = elgamal_keys()[0]
+    return _modulus
+
+
+def _get_receipts() -> ReceiptIndex:
+    """懒加载回执索引"""
+    global _receipts
+    if _receipts is None:
+        _receipts = ReceiptIndex(RECEIPT_INDEX_PATH)
+    return _receipts
 
-# 哈希链实例
-_hash_chain = HashChain()
 
 def init_vote_db():
-    """初始化投票数据库文件和哈希链"""
-    os.makedirs(os.path.dirname(VOTE_DB_PATH), exist_ok=True)
-    
-    initial_data = {
-        "votes": [],
-        "merkle_root": None,
-        "total_weight": 0
-    }
-    
-    # 初始化投票数据库
-    if not os.path.exists(VOTE_DB_PATH):
-        with open(VOTE_DB_PATH, "w") as f:
-            json.dump(initial_data, f, indent=2)
-    
-    # 初始化哈希链
-    if not os.path.exists(HASH_CHAIN_PATH):
-        with open(HASH_CHAIN_PATH, "w") as f:
-            json.dump([], f)
-    else:
-        with open(HASH_CHAIN_PATH, "r") as f:
-            _hash_chain.chain = json.load(f)
+    """初始化投票日志，并从最近的快照加日志尾部恢复内存状态（首次写入时也会自动执行）"""
+    with _memory_lock:
+        _state.loaded = False
+        with _writer():
+            pass
+
+
+def _recover():
+    """读取快照，再重放快照之后的日志尾部（调用方需持有写入者锁）"""
+    global _state
+    _state = _StorageState()
+
+    if os.path.exists(SNAPSHOT_PATH):
+        try:
+            with open(SNAPSHOT_PATH, "r") as f:
+                _state.load_snapshot(json.load(f))
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            logger.error(f"快照损坏，将从日志头部重放: {str(e)}")
+            _state = _StorageState()
+
+    log_size = os.path.getsize(VOTE_LOG_PATH)
+    if _state.log_offset > log_size:
+        # 快照比日志新（日志被清空或截断），只能完整重放
+        logger.error("快照与投票日志不一致，将从日志头部重放")
+        _state = _StorageState()
+
+    # 索引以日志为准：截断到快照位置后补齐尾部记录的偏移
+    with open(VOTE_INDEX_PATH, "r+b") as index_file:
+        index_file.truncate(_state.count * _OFFSET.size)
+    replayed = _replay_tail()
+
+    _state.loaded = True
+    if replayed:
+        logger.info(f"从快照恢复 {_state.count - replayed} 票，重放日志尾部 {replayed} 票")
+
+
+def _replay_tail() -> int:
+    """
+    把 _state.log_offset 之后的日志记录应用到内存状态（调用方需持有写入者锁）
+    用于启动恢复，以及追上同一份存储上其他工作进程追加的投票；
+    缺少的偏移量索引和回执随之补齐，末尾不完整的记录或批次被截断
+    :return: 重放的记录数
+    """
+    with open(VOTE_LOG_PATH, "r+b") as log_file, open(VOTE_INDEX_PATH, "r+b") as index_file:
+        indexed = index_file.seek(0, os.SEEK_END) // _OFFSET.size
+        log_file.seek(_state.log_offset)
+        tail = log_file.read()
+        log_size = _state.log_offset + len(tail)
+        offset = _state.log_offset
+        replayed = 0
+        pending = []  # 尚未读完的批次中的记录
+        for line in tail.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # 写入中断留下的半条记录
+            record = json.loads(line)
+            batch = record.get("batch")
+            if batch:
+                if pending and pending[0][0]["batch"] != batch:
+                    break  # 上一个批次没有写完
+                pending.append((record, line))
+                if len(pending) < batch["size"]:
+                    continue
+            elif pending:
+                break
+            else:
+                pending.append((record, line))
+            # 批次完整后才应用，保证一个批次要么全部恢复要么全部丢弃
+            for record, line in pending:
+                _apply_record(record)
+                # 其他进程追加时已写入索引，只补齐缺少的部分
+                if record["index"] >= indexed:
+                    index_file.write(_OFFSET.pack(offset))
+                offset += len(line)
+                _state.log_offset = offset
+                replayed += 1
+            pending = []
+
+        if offset < log_size:
+            logger.error(f"丢弃日志末尾不完整的记录（{log_size - offset} 字节）")
+            log_file.truncate(offset)
+
+    if replayed:
+        _sync_receipt_index()
+        if _state.count - _state.last_snapshot_count >= SNAPSHOT_INTERVAL:
+            write_snapshot()
+    return replayed
+
+
+def _sync_receipt_index():
+    """回执索引落后于日志时（如崩溃），从偏移量索引定位并补齐（调用方需持有写入者锁）"""
+    receipts = _get_receipts()
+    next_index = receipts.max_index() + 1
+    if next_index >= _state.count:
+        return
+    with open(VOTE_INDEX_PATH, "rb") as index_file:
+        index_file.seek(next_index * _OFFSET.size)
+        (offset,) = _OFFSET.unpack(index_file.read(_OFFSET.size))
+    receipts.add_many(
+        (r["vote_hash"], r["index"], r["vote"]["ciphertext"]["alpha"], r["vote"]["ciphertext"]["beta"])
+        for r in _read_records(offset)
+    )
+    logger.info(f"回执索引补齐 {_state.count - next_index} 条")
+
+
+def _apply_record(record: Dict) -> List[tuple]:
+    """把一条日志记录应用到内存状态，返回该票的Merkle证明"""
+    if record["index"] != _state.count:
+        raise RuntimeError(f"投票日志索引不连续: {record['index']} != {_state.count}")
+
+    vote_str = json.dumps(record["vote"], sort_keys=True)
+    vote_hash = HashChain.next_hash(_state.chain_head, vote_str)
+    if vote_hash != record["vote_hash"]:
+        raise RuntimeError(f"哈希链校验失败，索引 {record['index']}")
+
+    proof = _state.frontier.append(vote_str)
+    p = _get_modulus()
+    _state.aggregate_alpha = (_state.aggregate_alpha * int(record["vote"]["ciphertext"]["alpha"])) % p
+    _state.aggregate_beta = (_state.aggregate_beta * int(record["vote"]["ciphertext"]["beta"])) % p
+    _state.chain_head = vote_hash
+    _state.count += 1
+    return proof
+
+
+def write_snapshot():
+    """原子地写入当前状态的快照（先写临时文件再替换，调用方需持有写入者锁）"""
+    snapshot = _state.to_snapshot()
+    tmp_path = SNAPSHOT_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, SNAPSHOT_PATH)
+    _state.last_snapshot_count = _state.count
+
+
+def _migrate_legacy_db():
+    """把旧版 votes.json 中的投票导入追加日志"""
+    try:
+        with open(LEGACY_VOTE_DB_PATH, "r") as f:
+            votes = json.load(f).get("votes", [])
+    except (json.JSONDecodeError, AttributeError) as e:
+        logger.error(f"旧版投票数据无法读取，跳过迁移: {str(e)}")
+        return
+
+    for vote_dict in votes:
+        _append_vote(vote_dict)
+    os.replace(LEGACY_VOTE_DB_PATH, LEGACY_VOTE_DB_PATH + ".migrated")
+    logger.info(f"已从 {LEGACY_VOTE_DB_PATH} 迁移 {len(votes)} 票")
 
 
 def _acquire_lock(f):
@@ -52,26 +260,135 @@ def _release_lock(f):
     fcntl.flock(f.fileno(), fcntl.LOCK_UN)
 
 
-from threading import Lock
+from threading import RLock
 
 # 添加内存锁以优化并发性能
-_memory_lock = Lock()
+_memory_lock = RLock()
+# 当前线程持有写入者锁的层数（只在持有 _memory_lock 时读写）
+_writer_depth = 0
 
-def store_vote(ciphertext: Dict, zkp: Dict, weight_signature: str) -> Dict:
+
+@contextmanager
+def _writer():
     """
-    存储投票数据
+    写入者锁：进程内的 _memory_lock 加投票日志上的文件锁（可重入）
+    多个工作进程共享同一份存储时，持锁后先重放其他进程追加的日志尾部，
+    使链头、Merkle frontier 和同态累加值与磁盘上的日志一致，再在此基础上追加
+    """
+    global _writer_depth
+    wait_start = time.perf_counter()
+    with _memory_lock:
+        LOCK_WAIT_SECONDS.observe(time.perf_counter() - wait_start, lock="vote_memory")
+        if _writer_depth:
+            _writer_depth += 1
+            try:
+                yield
+            finally:
+                _writer_depth -= 1
+            return
+
+        os.makedirs(STORAGE_DIR, exist_ok=True)
+        with open(VOTE_LOG_PATH, "ab") as lock_file:
+            wait_start = time.perf_counter()
+            _acquire_lock(lock_file)
+            LOCK_WAIT_SECONDS.observe(time.perf_counter() - wait_start, lock="vote_log")
+            _writer_depth = 1
+            try:
+                if not os.path.exists(VOTE_INDEX_PATH):
+                    open(VOTE_INDEX_PATH, "wb").close()
+                log_size = os.fstat(lock_file.fileno()).st_size
+                if not _state.loaded or log_size < _state.log_offset:
+                    # 首次加载，或日志被其他进程清空
+                    _recover()
+                    if os.path.exists(LEGACY_VOTE_DB_PATH) and _state.count == 0:
+                        _migrate_legacy_db()
+                elif log_size > _state.log_offset:
+                    _replay_tail()
+                yield
+            finally:
+                _writer_depth = 0
+                _release_lock(lock_file)
+
+
+def _append_vote(vote_dict: Dict) -> Dict:
+    """追加一票到日志并更新状态（调用方需持有写入者锁）"""
+    return _append_votes([vote_dict])[0]
+
+
+def _append_votes(vote_dicts: List[Dict]) -> List[Dict]:
+    """
+    一次写入追加多票并更新状态（调用方需持有写入者锁）
+    多于一票时每条记录带批次标记，崩溃后恢复时不完整的批次整体丢弃
+    返回的 Merkle 证明都对应整批写入后的根（merkle_root）
+    """
+    start = _state.count
+    batch = {"start": start, "size": len(vote_dicts)} if len(vote_dicts) > 1 else None
+    records = []
+    chain_head = _state.chain_head
+    for i, vote_dict in enumerate(vote_dicts):
+        chain_head = HashChain.next_hash(chain_head, json.dumps(vote_dict, sort_keys=True))
+        record = {"index": start + i, "vote": vote_dict, "vote_hash": chain_head}
+        if batch:
+            record["batch"] = batch
+        records.append(record)
+    lines = [(json.dumps(record, sort_keys=True) + "\n").encode() for record in records]
+
+    with STAGE_SECONDS.time(operation="store_vote", stage="log_append"):
+        with open(VOTE_LOG_PATH, "ab") as log_file:
+            offset = _state.log_offset
+            # 先写入日志确保持久性，索引和内存状态都可由日志重建
+            log_file.write(b"".join(lines))
+            log_file.flush()
+            if LOG_FSYNC:
+                os.fsync(log_file.fileno())
+
+        offsets = []
+        for line in lines:
+            offsets.append(_OFFSET.pack(offset))
+            offset += len(line)
+        with open(VOTE_INDEX_PATH, "ab") as index_file:
+            index_file.write(b"".join(offsets))
+
+    with STAGE_SECONDS.time(operation="store_vote", stage="merkle"):
+        merkle_root, proofs = _state.frontier.batch_proofs(
+            [json.dumps(record["vote"], sort_keys=True) for record in records]
+        )
+        for record in records:
+            _apply_record(record)
+    _state.log_offset = offset
+    with STAGE_SECONDS.time(operation="store_vote", stage="receipt_index"):
+        _get_receipts().add_many([(
+            record["vote_hash"], record["index"],
+            record["vote"]["ciphertext"]["alpha"], record["vote"]["ciphertext"]["beta"]
+        ) for record in records])
+
+    if _state.count - _state.last_snapshot_count >= SNAPSHOT_INTERVAL:
+        with STAGE_SECONDS.time(operation="store_vote", stage="snapshot"):
+            write_snapshot()
+
+    return [{
+        "index": record["index"],
+        "vote_hash": record["vote_hash"],
+        "receipt_code": receipt_code(record["vote_hash"]),
+        "merkle_proof": proof,
+        "merkle_root": merkle_root
+    } for record, proof in zip(records, proofs)]
+
+
+def _build_vote_dict(ciphertext: Dict, zkp: Dict, weight_signature: str) -> Dict:
+    """
+    校验输入并构造投票记录
     使用Vote和EncryptedAnswer模型结构
     """
-    # 输入验证部分保持不变
     if not all([ciphertext, zkp, weight_signature]):
         raise ValueError("Missing required fields")
-    
+
     if not isinstance(ciphertext, dict) or not isinstance(zkp, dict):
         raise TypeError("ciphertext and zkp must be dictionaries")
-        
+
     if not isinstance(weight_signature, str):
         raise TypeError("weight_signature must be a string")
-    
+
     if not all(k in ciphertext for k in ["alpha", "beta"]):
         raise ValueError("Invalid ciphertext format")
 
@@ -82,104 +399,120 @@ def store_vote(ciphertext: Dict, zkp: Dict, weight_signature: str) -> Dict:
     except (KeyError, ValueError):
         raise ValueError("Invalid ciphertext format or values")
 
+    # 使用模型结构构建投票记录
+    encrypted_answer = EncryptedAnswer(
+        choices=[ElGamalCiphertext(alpha=alpha, beta=beta)],
+        individual_proofs=[zkp]
+    )
 
-    try:
-        # 使用模型结构构建投票记录
-        encrypted_answer = EncryptedAnswer(
-            choices=[ElGamalCiphertext(
-                alpha=int(ciphertext["alpha"]), 
-                beta=int(ciphertext["beta"])
-            )],
-            individual_proofs=[zkp]
-        )
-        
-        vote = Vote(
-            answers=[encrypted_answer],
-            election_hash=weight_signature,
-            election_uuid=datetime.now().isoformat()
-        )
-        
-        # 序列化为JSON格式
-        vote_dict = {
-            "timestamp": vote.election_uuid,
-            "ciphertext": {
-                "alpha": str(vote.answers[0].choices[0].alpha),
-                "beta": str(vote.answers[0].choices[0].beta)
-            },
-            "zkp": zkp,
-            "weight_signature": vote.election_hash
-        }
+    vote = Vote(
+        answers=[encrypted_answer],
+        election_hash=weight_signature,
+        election_uuid=datetime.now().isoformat()
+    )
 
+    # 序列化为JSON格式
+    return {
+        "timestamp": vote.election_uuid,
+        "ciphertext": {
+            "alpha": str(vote.answers[0].choices[0].alpha),
+            "beta": str(vote.answers[0].choices[0].beta)
+        },
+        "zkp": zkp,
+        "weight_signature": vote.election_hash
+    }
+
+
+def store_vote(ciphertext: Dict, zkp: Dict, weight_signature: str) -> Dict:
+    """
+    存储投票数据
+    使用Vote和EncryptedAnswer模型结构
+    """
+    vote_dict = _build_vote_dict(ciphertext, zkp, weight_signature)
+
+    try:
         # 使用内存锁和文件锁的双重保护
-        with _memory_lock:
-            with open(VOTE_DB_PATH, "r+") as f:
-                try:
-                    _acquire_lock(f)
-                    
-                    # 加载现有数据
-                    try:
-                        data = json.load(f)
-                        if not isinstance(data, dict):
-                            data = {"votes": [], "merkle_root": None, "total_weight": 0}
-                    except json.JSONDecodeError:
-                        data = {"votes": [], "merkle_root": None, "total_weight": 0}
-                    
-                    if "votes" not in data:
-                        data["votes"] = []
-                    
-                    # 添加新投票并获取索引
-                    vote_index = len(data["votes"])
-                    data["votes"].append(vote_dict)
-                    
-                    # 更新哈希链
-                    vote_str = json.dumps(vote_dict, sort_keys=True)
-                    vote_hash = _hash_chain.add_block(vote_str)
-
-                    # 构建新的Merkle树（仅用于验证）
-                    merkle_tree = MerkleTree([json.dumps(v, sort_keys=True) for v in data["votes"]])
-                    data["merkle_root"] = merkle_tree.get_root()  # 写入最新的merkle_root
-                    proof = merkle_tree.get_proof(vote_index)
-                    
-                    # 获取当前投票的Merkle证明
-                    proof = merkle_tree.get_proof(vote_index)
-                                      
-                    # 先写入数据确保一致性
-                    f.seek(0)
-                    json.dump(data, f, indent=2)
-                    f.truncate()
-                    
-                    # 更新哈希链文件
-                    with open(HASH_CHAIN_PATH, "w") as chain_file:
-                        json.dump(_hash_chain.chain, chain_file)
-                        
-                    
-                    return {
-                        "index": vote_index,
-                        "vote_hash": vote_hash,
-                        "merkle_proof": proof
-                    }
-                    
-                finally:
-                    _release_lock(f)
-                    
+        with _writer():
+            # 拒绝完全相同的密文重放
+            with STAGE_SECONDS.time(operation="store_vote", stage="duplicate_check"):
+                duplicate = _get_receipts().contains_ciphertext(
+                    vote_dict["ciphertext"]["alpha"], vote_dict["ciphertext"]["beta"]
+                )
+            if duplicate:
+                raise DuplicateBallotError("Duplicate ciphertext")
+            result = _append_vote(vote_dict)
+        VOTES_STORED.inc()
+        return result
+
     except Exception as e:
         logger.error(f"Error storing vote: {str(e)}")
         raise
 
 
+def store_votes_batch(ballots: List[Dict]) -> List[Optional[Dict]]:
+    """
+    在一次写入中存储多张选票（全部写入或全部不写入）
+    :param ballots: [{"ciphertext", "zkp", "weight_signature"}]，任一格式无效时抛出异常，不写入任何选票
+    :return: 与输入一一对应的存储结果（同 store_vote）；
+             与已存储的密文或同批中更早的密文重复的选票不写入，对应位置为 None
+    """
+    vote_dicts = [
+        _build_vote_dict(b.get("ciphertext"), b.get("zkp"), b.get("weight_signature"))
+        for b in ballots
+    ]
+    if not vote_dicts:
+        return []
+
+    try:
+        with _writer():
+            with STAGE_SECONDS.time(operation="store_vote", stage="duplicate_check"):
+                pairs = [(v["ciphertext"]["alpha"], v["ciphertext"]["beta"]) for v in vote_dicts]
+                seen = _get_receipts().existing_ciphertexts(pairs)
+                accepted = []
+                for i, pair in enumerate(pairs):
+                    digest = ciphertext_digest(*pair)
+                    if digest not in seen:
+                        seen.add(digest)
+                        accepted.append(i)
+            stored = _append_votes([vote_dicts[i] for i in accepted]) if accepted else []
+        VOTES_STORED.inc(len(stored))
+
+        results = [None] * len(vote_dicts)
+        for i, result in zip(accepted, stored):
+            results[i] = result
+        return results
+
+    except Exception as e:
+        logger.error(f"Error storing vote batch: {str(e)}")
+        raise
+
+
+def _read_records(start_offset: int = 0) -> List[Dict]:
+    """从指定偏移读取日志中的完整记录"""
+    with open(VOTE_LOG_PATH, "rb") as f:
+        f.seek(start_offset)
+        data = f.read()
+    records = []
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break
+        records.append(json.loads(line))
+    return records
+
 
 def get_all_votes() -> Dict:
-    """获取所有投票记录"""
+    """
+    获取所有投票记录（只读，不触发恢复，可在其他进程中调用）
+    数据来自缓存的只读视图，日志未变化时不会重新解析
+    """
+    from .vote_view import current_view
     try:
-        with open(VOTE_DB_PATH, "r") as f:
-            data = json.load(f)
-            if not isinstance(data, dict):
-                return {
-                    "votes": [],
-                    "merkle_root": None,
-                    "total_weight": 0
-                }
-            return data
+        view = current_view()
+        return {
+            "votes": view.get_votes(),
+            "merkle_root": view.merkle_root,
+            "total_weight": 0
+        }
     except (json.JSONDecodeError, FileNotFoundError) as e:
         logger.error(f"Error reading votes: {str(e)}")
         return {
@@ -188,22 +521,174 @@ def get_all_votes() -> Dict:
             "total_weight": 0
         }
 
+
+def get_vote(vote_index: int) -> Optional[Dict]:
+    """通过偏移量索引直接读取单条投票记录（只读）"""
+    if vote_index < 0:
+        return None
+    try:
+        with open(VOTE_INDEX_PATH, "rb") as index_file:
+            index_file.seek(vote_index * _OFFSET.size)
+            entry = index_file.read(_OFFSET.size)
+    except FileNotFoundError:
+        return None
+    if len(entry) != _OFFSET.size:
+        return None
+    (offset,) = _OFFSET.unpack(entry)
+    with open(VOTE_LOG_PATH, "rb") as log_file:
+        log_file.seek(offset)
+        return json.loads(log_file.readline())
+
+
+def get_votes(start: int = 0, limit: Optional[int] = None) -> List[Dict]:
+    """通过偏移量索引定位，读取从 start 开始的连续投票记录（只读）"""
+    if start < 0 or (limit is not None and limit <= 0):
+        return []
+    try:
+        with open(VOTE_INDEX_PATH, "rb") as index_file:
+            index_file.seek(start * _OFFSET.size)
+            entry = index_file.read(_OFFSET.size)
+    except FileNotFoundError:
+        return []
+    if len(entry) != _OFFSET.size:
+        return []
+    (offset,) = _OFFSET.unpack(entry)
+    records = []
+    with open(VOTE_LOG_PATH, "rb") as log_file:
+        log_file.seek(offset)
+        for line in log_file:
+            if not line.endswith(b"\n") or (limit is not None and len(records) >= limit):
+                break
+            records.append(json.loads(line))
+    return records
+
+
+def find_vote_by_receipt(receipt: str) -> Optional[Dict]:
+    """
+    按回执查找投票
+    :param receipt: 完整的 vote_hash 或短回执码
+    :return: {"index", "vote_hash"}，找不到返回 None
+    """
+    receipt = receipt.strip()
+    receipts = _get_receipts()
+    if len(receipt) == 64:
+        index = receipts.lookup(receipt)
+        return None if index is None else {"index": index, "vote_hash": receipt.lower()}
+    try:
+        prefix = parse_receipt_code(receipt)
+    except ValueError:
+        return None
+    return receipts.lookup_prefix(prefix)
+
+
+def get_storage_state() -> Dict:
+    """当前存储状态概要（票数、链头、Merkle根、同态累加值），包含其他工作进程追加的投票"""
+    with _writer():
+        return {
+            "count": _state.count,
+            "chain_head": _state.chain_head,
+            "merkle_root": _state.frontier.get_root() or None,
+            "aggregate": {
+                "alpha": str(_state.aggregate_alpha),
+                "beta": str(_state.aggregate_beta)
+            }
+        }
+
+
+def get_checkpoint() -> Dict:
+    """
+    本进程已提交到的日志位置，以及该位置对应的票数、链头和 Merkle 根（日志复制用）
+    只持有进程内锁，不追赶其他工作进程追加的记录
+    """
+    with _memory_lock:
+        if not _state.loaded:
+            with _writer():
+                pass
+        return {
+            "count": _state.count,
+            "log_offset": _state.log_offset,
+            "chain_head": _state.chain_head,
+            "merkle_root": _state.frontier.get_root() or None
+        }
+
+
+def read_log(start_offset: int, end_offset: int, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    """
+    按块读取日志 [start_offset, end_offset) 的原始字节（只读，日志复制用）
+    :raises ValueError: start_offset 不在记录边界上
+    """
+    if start_offset < 0:
+        raise ValueError("Invalid log offset")
+    if start_offset > 0:
+        with open(VOTE_LOG_PATH, "rb") as f:
+            f.seek(start_offset - 1)
+            if f.read(1) != b"\n":
+                raise ValueError("Log offset is not at a record boundary")
+
+    def chunks():
+        with open(VOTE_LOG_PATH, "rb") as f:
+            f.seek(start_offset)
+            remaining = end_offset - start_offset
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    return chunks()
+
+
+def replicate_log(chunks: Iterable[bytes], start_offset: int, size: int) -> int:
+    """
+    把主节点日志 [start_offset, start_offset + size) 的字节追加到本地日志并重放（从节点使用）
+    重放时重新校验哈希链，并补齐偏移量索引、回执索引和快照；传输不完整时撤销本次追加
+    :raises ValueError: start_offset 与本地日志长度不一致，或收到的字节数与 size 不符
+    :return: 重放的记录数
+    """
+    with _writer():
+        if start_offset != _state.log_offset:
+            raise ValueError(f"Log offset mismatch: {start_offset} != {_state.log_offset}")
+        try:
+            received = 0
+            with open(VOTE_LOG_PATH, "ab") as log_file:
+                for chunk in chunks:
+                    log_file.write(chunk)
+                    received += len(chunk)
+            if received != size:
+                raise ValueError(f"Incomplete log transfer: {received} of {size} bytes")
+        except BaseException:
+            with open(VOTE_LOG_PATH, "r+b") as log_file:
+                log_file.truncate(start_offset)
+            raise
+        return _replay_tail()
+
+
 def clear_votes():
     """清空投票数据（仅用于测试）"""
+    global _state
     try:
-        initial_data = {
-            "votes": [],
-            "merkle_root": None,
-            "total_weight": 0
-        }
-        
-        with open(VOTE_DB_PATH, "w") as f:
-            json.dump(initial_data, f, indent=2)
-        
-        _hash_chain.chain = []
-        with open(HASH_CHAIN_PATH, "w") as f:
-            json.dump([], f)
-            
+        with _writer():
+            for path in (VOTE_LOG_PATH, VOTE_INDEX_PATH):
+                open(path, "wb").close()
+            if os.path.exists(SNAPSHOT_PATH):
+                os.remove(SNAPSHOT_PATH)
+            _get_receipts().clear()
+
+            _state = _StorageState()
+            _state.loaded = True
+
     except Exception as e:
         logger.error(f"Error clearing votes: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+def _reset_after_fork():
+    """fork 出的工作进程不沿用父进程的 SQLite 连接和内存状态，首次访问时重新加载"""
+    global _state, _receipts, _memory_lock, _writer_depth
+    _state = _StorageState()
+    _receipts = None
+    _memory_lock = RLock()
+    _writer_depth = 0
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
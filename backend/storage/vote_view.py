@@ -0,0 +1,160 @@
+"""
+投票存储的只读视图（读写分离）
+
+- 每个视图对应日志的一个版本（已提交的票数），包含投票记录和 Merkle 树，发布后不再改变
+- 日志增长时只解析新增的尾部，生成新版本的视图：新旧视图共享已发布的记录和完整的 Merkle 节点，
+  这些数据只追加不修改（写时复制）；日志被清空或替换时重新建立，旧视图不受影响
+- 读取方从不获取写入者锁；日志未变化时直接返回当前视图，同一份数据不会解析两次
+
+用法：
+    view = current_view()
+    view.vote(3), view.get_proof(3), view.merkle_root
+"""
+import json
+import os
+from threading import Lock
+from typing import Dict, List, Optional
+
+from . import vote_db
+from .merkle_tree import AppendOnlyMerkleTree, MerkleTree
+
+
+class VoteView:
+    """某一版本的只读投票视图（返回的投票记录由各视图共享，调用方不要修改）"""
+
+    def __init__(self, votes: List[Dict], tree: AppendOnlyMerkleTree, count: int, log_offset: int,
+                 stamp=None):
+        self._votes = votes
+        self.count = count
+        self.log_offset = log_offset
+        self.stamp = stamp  # 建立视图时日志文件的 (inode, 大小, 修改时间)
+        self.tree: MerkleTree = tree.prefix(count)
+        self.merkle_root = self.tree.get_root() or None
+
+    @property
+    def version(self) -> int:
+        return self.count
+
+    def vote(self, index: int) -> Optional[Dict]:
+        if not 0 <= index < self.count:
+            return None
+        return self._votes[index]
+
+    def get_votes(self) -> List[Dict]:
+        return self._votes[:self.count]
+
+    def get_proof(self, index: int) -> List[tuple]:
+        return self.tree.get_proof(index)
+
+    def get_multi_proof(self, indices: List[int]) -> Dict:
+        return self.tree.get_multi_proof(indices)
+
+
+class _ViewBuilder:
+    """由日志增量构建视图，记录和 Merkle 节点只追加"""
+
+    def __init__(self):
+        self.votes: List[Dict] = []
+        self.tree = AppendOnlyMerkleTree()
+        self.log_offset = 0
+        self.last_offset = None  # 最后一条记录的起始偏移
+        self.last_hash = None    # 最后一条记录的 vote_hash
+
+    def still_valid(self, log_file) -> bool:
+        """日志中已读取的部分没有被清空或替换"""
+        size = os.fstat(log_file.fileno()).st_size
+        if size < self.log_offset:
+            return False
+        if self.last_offset is None:
+            return True
+        log_file.seek(self.last_offset)
+        try:
+            return json.loads(log_file.readline()).get("vote_hash") == self.last_hash
+        except ValueError:
+            return False
+
+    def read_tail(self, log_file) -> int:
+        """读取新增的完整记录；写入中的半条记录和不完整的批次留到下次"""
+        log_file.seek(self.log_offset)
+        offset = self.log_offset
+        pending = []
+        added = 0
+        for line in log_file:
+            if not line.endswith(b"\n"):
+                break
+            record = json.loads(line)
+            batch = record.get("batch")
+            if batch and pending and pending[0][0]["batch"] != batch:
+                break
+            pending.append((record, offset, len(line)))
+            offset += len(line)
+            if batch and len(pending) < batch["size"]:
+                continue
+            for record, start, length in pending:
+                if record["index"] != len(self.votes):
+                    raise ValueError(f"Vote log index mismatch: {record['index']} != {len(self.votes)}")
+                self.votes.append(record["vote"])
+                self.tree.append(json.dumps(record["vote"], sort_keys=True))
+                self.last_offset, self.last_hash = start, record["vote_hash"]
+                self.log_offset = start + length
+                added += 1
+            pending = []
+        return added
+
+    def view(self, stamp=None) -> VoteView:
+        return VoteView(self.votes, self.tree, len(self.votes), self.log_offset, stamp)
+
+
+_lock = Lock()
+_builder = _ViewBuilder()
+_view = _builder.view()
+
+
+def _log_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def current_view() -> VoteView:
+    """
+    当前已提交投票的只读视图
+    日志文件未变化时直接返回上次的视图；否则只解析新增的尾部，生成新版本
+    """
+    global _builder, _view
+    path = vote_db.VOTE_LOG_PATH
+    view = _view
+    if view.stamp is not None and _log_stamp(path) == view.stamp:
+        return view
+
+    with _lock:
+        stamp = _log_stamp(path)
+        if stamp is not None and stamp == _view.stamp:
+            return _view
+        builder = _builder
+        if stamp is None:
+            builder = _ViewBuilder()
+        else:
+            with open(path, "rb") as log_file:
+                if not builder.still_valid(log_file):
+                    # 日志被清空或替换：重新建立，已发布的旧视图保持不变
+                    builder = _ViewBuilder()
+                try:
+                    builder.read_tail(log_file)
+                except ValueError:
+                    builder = _ViewBuilder()
+                    builder.read_tail(log_file)
+        # 日志只多了半条记录时也发布新视图，只是为了记下新的文件状态，内容不变
+        _builder = builder
+        _view = builder.view(stamp)
+        return _view
+
+
+def _reset_after_fork():
+    global _lock
+    _lock = Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,213 @@
+"""
+批量提交选票：
+1. 格式检查（prepare）
+2. 权重签名、选票证明与凭证签名验证（check_ballots，分块，可交给进程池并行执行；每块内签名批量验证）
+   证明所用的权重取自绑定本张选票凭证的权重签名，而不是客户端声称的值
+3. 在一个事务中登记全部防重标识，在一次写入中存储全部有效选票（commit）；
+   未能存储的选票撤销登记，凭证可以重新提交
+
+每张选票的结果成功时包含投票索引、回执和 Merkle 证明，失败时包含错误和对应的 HTTP 状态码；
+全部证明对应响应中的 merkle_root（整批写入后的根）
+"""
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+from backend.metrics import STAGE_SECONDS, SUBMIT_REJECTS
+
+# 每个工作进程懒加载自己的公钥和凭证验证器（只加载一次密钥）
+_worker_state = {}
+
+# 单块最少的选票数，块太小时进程间传输的开销超过计算本身
+MIN_CHUNK_SIZE = 64
+
+
+def _public_key():
+    if "public_key" not in _worker_state:
+        from backend.crypto.elgamal import ExponentialElGamal
+        _worker_state["public_key"] = ExponentialElGamal().public_key
+    return _worker_state["public_key"]
+
+
+def _credential_verifier():
+    if "credential" not in _worker_state:
+        from backend.auth.auth import CredentialVerifier
+        _worker_state["credential"] = CredentialVerifier()
+    return _worker_state["credential"]
+
+
+def _weight_verifier():
+    if "weight" not in _worker_state:
+        from backend.tally.controller import CredentialVerifier as WeightVerifier
+        _worker_state["weight"] = WeightVerifier()
+    return _worker_state["weight"]
+
+
+def _reject(results: List, i: int, reason: str, error: str, status: int):
+    SUBMIT_REJECTS.inc(reason=reason)
+    results[i] = {"success": False, "error": error, "status": status}
+
+
+def split_chunks(items: List, workers: int) -> List[List]:
+    """按工作进程数分块，每个进程分到几块，先完成的进程可以接着处理剩余的块"""
+    chunk_size = max(MIN_CHUNK_SIZE, -(-len(items) // (max(workers, 1) * 4)))
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+def check_format(item) -> Optional[str]:
+    """检查单张选票的提交格式，有效返回 None，否则返回错误信息"""
+    if not isinstance(item, dict) or not all(k in item for k in ['encrypted_vote', 'credential', 'voter_id']):
+        return "Missing required fields"
+    encrypted_vote = item['encrypted_vote']
+    if not isinstance(encrypted_vote, dict) or \
+            not all(k in encrypted_vote for k in ['ciphertext', 'zkp', 'weight_signature']):
+        return "Invalid encrypted vote format"
+    return None
+
+
+def check_weights(items: List[Dict]) -> List[Optional[int]]:
+    """
+    批量验证权重签名，返回每张选票经签名确认的权重，无效时为 None
+    权重签名必须绑定本张选票的凭证；签发凭证带有 weight 字段时须与签名的权重一致
+    """
+    credential_verifier = _credential_verifier()
+    weight_verifier = _weight_verifier()
+    signatures = [item['encrypted_vote'].get('weight_signature') for item in items]
+    signed = weight_verifier.verify_weight_signatures(
+        signatures, [credential_verifier.credential_id(item['credential']) for item in items]
+    )
+    weights = []
+    for item, weight_signature, ok in zip(items, signatures, signed):
+        weight = weight_verifier.parse_weight_signature(weight_signature)[0] if ok else None
+        try:
+            if weight is not None and 'weight' in item['credential'] and int(item['credential']['weight']) != weight:
+                weight = None
+        except (TypeError, ValueError):
+            weight = None
+        weights.append(weight)
+    return weights
+
+
+def check_chunk(items: List[Dict]) -> List[Tuple[bool, bool, Optional[str]]]:
+    """
+    验证一块选票（可在工作进程中执行）
+    :return: 每张选票的 (权重签名是否有效, 证明是否有效, 凭证签名有效时的防重标识)
+    """
+    from backend.vote.weighted_encrypt import verify_ballot
+    public_key = _public_key()
+    weights = check_weights(items)
+    zkp_ok = []
+    for item, weight in zip(items, weights):
+        encrypted_vote = item['encrypted_vote']
+        try:
+            ok = weight is not None and \
+                verify_ballot(public_key, encrypted_vote['ciphertext'], encrypted_vote['zkp'], weight)
+        except (AttributeError, TypeError, ValueError):
+            ok = False
+        zkp_ok.append(ok)
+    # 权重或证明无效的选票不必再验证凭证
+    credentials = [item['credential'] for item, ok in zip(items, zkp_ok) if ok]
+    nullifiers = iter(_credential_verifier().check_credential_signatures(credentials))
+    return [(weight is not None, ok, next(nullifiers) if ok else None) for weight, ok in zip(weights, zkp_ok)]
+
+
+def check_ballots(items: List[Dict], executor: Executor = None,
+                  workers: int = 1) -> List[Tuple[bool, bool, Optional[str]]]:
+    """
+    分块验证选票，提供执行器时各块并行执行
+    :param items: 已通过格式检查的选票
+    :param executor: 进程池（None 时在当前进程中执行）
+    :param workers: 执行器的工作进程数，用于决定分块大小
+    """
+    if executor is None or workers <= 1 or len(items) < 2 * MIN_CHUNK_SIZE:
+        return check_chunk(items)
+    results = []
+    for chunk_result in executor.map(check_chunk, split_chunks(items, workers)):
+        results.extend(chunk_result)
+    return results
+
+
+def prepare(ballots: List) -> Tuple[List[Optional[Dict]], List[int]]:
+    """
+    格式检查
+    :return: (结果列表，格式无效的位置已填入错误), 通过检查的选票位置
+    """
+    results = [None] * len(ballots)
+    candidates = []
+    for i, item in enumerate(ballots):
+        error = check_format(item)
+        if error is None:
+            candidates.append(i)
+        else:
+            _reject(results, i, "missing_fields" if error == "Missing required fields" else "invalid_format",
+                    error, 400)
+    return results, candidates
+
+
+def commit(ballots: List[Dict], results: List[Optional[Dict]], candidates: List[int],
+           checks: List[Tuple[bool, bool, Optional[str]]], nullifier_store, audit_logger=None) -> Dict:
+    """
+    登记防重标识并存储通过验证的选票
+    可以并发调用：防重标识的检查和登记由唯一约束保证原子性，存储由 store_votes_batch 内的写入者锁串行化
+    :param checks: check_ballots 对 candidates 中各选票的验证结果
+    :return: 响应内容 {"accepted", "rejected", "merkle_root", "results"}
+    """
+    from backend.storage.vote_db import store_votes_batch
+
+    verified = []
+    for i, (weight_ok, zkp_ok, nullifier) in zip(candidates, checks):
+        if not weight_ok:
+            _reject(results, i, "invalid_weight", "Invalid weight signature", 403)
+        elif not zkp_ok:
+            _reject(results, i, "invalid_zkp", "Invalid ZKP", 400)
+        elif nullifier is None:
+            _reject(results, i, "invalid_credential", "Invalid credential", 403)
+        else:
+            verified.append((i, nullifier))
+
+    # 一个事务中登记全部防重标识
+    with STAGE_SECONDS.time(operation="submit_batch", stage="nullifier"):
+        first_use = nullifier_store.check_and_insert_many([nullifier for _, nullifier in verified])
+    nullifiers = dict(verified)
+    accepted = []
+    for (i, _), ok in zip(verified, first_use):
+        if ok:
+            accepted.append(i)
+        else:
+            _reject(results, i, "invalid_credential", "Invalid credential", 403)
+
+    # 一次写入存储全部有效选票；存储失败时撤销本批登记，凭证不会因此作废
+    try:
+        with STAGE_SECONDS.time(operation="submit_batch", stage="store"):
+            stored = store_votes_batch([ballots[i]['encrypted_vote'] for i in accepted])
+    except Exception:
+        nullifier_store.remove_many([nullifiers[i] for i in accepted])
+        raise
+    # 被拒绝为重复密文的选票同样撤销登记
+    nullifier_store.remove_many([nullifiers[i] for i, result in zip(accepted, stored) if result is None])
+
+    merkle_root = None
+    for i, result in zip(accepted, stored):
+        if result is None:
+            _reject(results, i, "duplicate_ciphertext", "Duplicate ciphertext", 409)
+            continue
+        merkle_root = result['merkle_root']
+        results[i] = {
+            "success": True,
+            "vote_index": result['index'],
+            "vote_hash": result['vote_hash'],
+            "receipt_code": result['receipt_code'],
+            "merkle_proof": result['merkle_proof']
+        }
+        if audit_logger is not None:
+            audit_logger.log_vote_operation("submit", {
+                "voter_id": ballots[i]['voter_id'],
+                "vote_index": result['index']
+            })
+
+    accepted_count = sum(1 for r in results if r["success"])
+    return {
+        "accepted": accepted_count,
+        "rejected": len(results) - accepted_count,
+        "merkle_root": merkle_root,
+        "results": results
+    }
@@ -7,14 +7,24 @@ import json
 import random
 import hashlib
 from ..utils.crypto_utils import mod_exp
+from ..keys import weight_public_key, weight_private_key
+from ..auth.blind_signature import BlindSigner, full_domain_hash
+from ..auth.batch_verify import BatchRSAVerifier
+from ..metrics import STAGE_SECONDS
 
 class TallyController:
-    def __init__(self):
-        """初始化计票控制器"""
+    def __init__(self, audit_logger=None):
+        """
+        初始化计票控制器
+        :param audit_logger: 审计日志（可选），设置后每次计票结果都会写入审计日志
+        """
+        self.audit_logger = audit_logger
         # 启用解密功能的ElGamal实例
         self.elgamal = ExponentialElGamal(decrypt_enabled=True)
         # 同态运算工具
         self.homomorphic = HomomorphicOperations(self.elgamal.public_key)
+        # 权重签名验证（计票时重新验证，不信任提交时的检查）
+        self.weight_verifier = CredentialVerifier()
         
     def tally_votes(self) -> Dict:
         """
@@ -22,7 +32,8 @@ class TallyController:
         返回计票结果和证明
         """
         # 获取所有投票记录
-        vote_data = get_all_votes()
+        with STAGE_SECONDS.time(operation="tally_votes", stage="load"):
+            vote_data = get_all_votes()
         votes = vote_data["votes"]
         
         if not votes:
@@ -31,41 +42,51 @@ class TallyController:
         # 收集所有有效密文
         valid_ciphertexts = []
         total_weight = 0
+        rejected_votes = 0
         
-        for vote in votes:
-            # 验证ZKP
-            if not self._verify_vote_zkp(vote):
-                continue
+        with STAGE_SECONDS.time(operation="tally_votes", stage="verify"):
+            weight_ok = self.weight_verifier.verify_weight_signatures(
+                [vote.get("weight_signature") for vote in votes]
+            )
+            for vote, signed in zip(votes, weight_ok):
+                # 权重签名无效的选票不计入
+                if not signed:
+                    rejected_votes += 1
+                    continue
+                # 验证ZKP
+                if not self._verify_vote_zkp(vote):
+                    continue
+                    
+                try:
+                # 从字符串正确转换为整数
+                    ciphertext = ElGamalCiphertext(
+                        alpha=int(vote["ciphertext"]["alpha"]),
+                        beta=int(vote["ciphertext"]["beta"])
+                    )
                 
-            try:
-            # 从字符串正确转换为整数
-                ciphertext = ElGamalCiphertext(
-                    alpha=int(vote["ciphertext"]["alpha"]),
-                    beta=int(vote["ciphertext"]["beta"])
-                )
-            
-                weight = self._verify_weight_signature(vote["weight_signature"])
-                if weight > 0:
+                    weight, _, _ = CredentialVerifier.parse_weight_signature(vote["weight_signature"])
                     total_weight += weight
                     valid_ciphertexts.append(ciphertext)
 
-            except (ValueError, KeyError) as e:
-                continue
+                except (ValueError, KeyError) as e:
+                    continue
         
         # 同态累加所有有效票
         if not valid_ciphertexts:
             return {"error": "No valid votes to tally"}
         
-        final_tally = self.homomorphic.homomorphic_add(valid_ciphertexts)
-        result = self.elgamal.decrypt_to_value(final_tally)
-    
-        tally_proof = self._generate_tally_proof(final_tally, result)
+        with STAGE_SECONDS.time(operation="tally_votes", stage="aggregate"):
+            final_tally = self.homomorphic.homomorphic_add(valid_ciphertexts)
+        with STAGE_SECONDS.time(operation="tally_votes", stage="decrypt"):
+            result = self.elgamal.decrypt_to_value(final_tally)
     
-        self._audit_tally_result(result, total_weight, tally_proof)
+        with STAGE_SECONDS.time(operation="tally_votes", stage="proof"):
+            tally_proof = self._generate_tally_proof(final_tally, result)
     
-        return {
+        tally = {
                 "total_votes": len(valid_ciphertexts),
                 "total_weight": total_weight,
+                "rejected_votes": rejected_votes,
                 "result": result,
                 "proof": tally_proof,
                 "final_cipher": {
@@ -73,6 +94,8 @@ class TallyController:
                     "beta": str(final_tally.beta)
                 }
             }
+        self._audit_tally_result(tally)
+        return tally
         
 
     def _verify_vote_zkp(self, vote: Dict) -> bool:
@@ -87,17 +110,10 @@ class TallyController:
             print(f"ZKP verification failed: {e}")
             return False
 
-    def _verify_weight_signature(self, weight_signature: str) -> int:
-        """验证权重签名并返回权重值"""
-        try:
-            # 从签名中提取权重值
-            if weight_signature.startswith('weight_'):
-                weight = int(weight_signature.split('_')[1])
-                return weight
-            return 1  # 默认权重为1
-        except Exception as e:
-            print(f"Weight signature verification failed: {e}")
-            return 0
+    def _audit_tally_result(self, tally: Dict):
+        """把计票结果写入审计日志（未配置审计日志时跳过）"""
+        if self.audit_logger is not None:
+            self.audit_logger.log_tally_result(tally)
 
     def _generate_tally_proof(self, final_tally: ElGamalCiphertext, result: int) -> Dict:
         """
@@ -140,26 +156,68 @@ class TallyController:
 
 
 class CredentialVerifier:
-    def sign_weight(self, voter_id: str, weight: int) -> str:
-        """生成权重签名"""
-        message = f"{voter_id}:{weight}"
-        signature = self.signer.sign(int.from_bytes(message.encode(), 'big'))
-        return f"weight_{weight}_{signature}"
-    
-    def verify_weight_signature(self, weight_signature: str, voter_id: str) -> bool:
-        """验证权重签名"""
-        try:
-            parts = weight_signature.split('_')
-            if len(parts) != 3 or parts[0] != 'weight':
-                return False
-                
-            weight = int(parts[1])
-            signature = int(parts[2])
-            
-            message = f"{voter_id}:{weight}"
-            expected = pow(signature, self.e, self.n)
-            actual = int.from_bytes(message.encode(), 'big')
-            
-            return expected == actual
-        except:
-            return False
\ No newline at end of file
+    """
+    权重签名 weight_<w>_<凭证标识>_<签名> 的签发与验证
+    - 签名针对 "weight:<凭证标识>:<w>" 的全域哈希，使用单独的权重密钥（见 backend.keys）
+    - 凭证标识见 nullifier_store.credential_id，权重签名只能随对应的凭证使用
+    """
+    def __init__(self):
+        """加载权重签名公钥，签名者仅在签发权重时才需要"""
+        self.n, self.e = weight_public_key()
+        self.signer = None
+        self.batch_verifier = BatchRSAVerifier(self.n, self.e)
+
+    def _message(self, credential_id: str, weight: int) -> int:
+        """被签名的消息：权重与凭证标识的全域哈希"""
+        data = f"weight:{credential_id}:{weight}".encode()
+        return full_domain_hash(int.from_bytes(data, 'big'), self.n)
+
+    @staticmethod
+    def parse_weight_signature(weight_signature: str) -> Tuple[int, str, int]:
+        """拆分权重签名，返回 (权重, 凭证标识, 签名)，格式无效时抛出 ValueError"""
+        parts = weight_signature.split('_') if isinstance(weight_signature, str) else []
+        if len(parts) != 4 or parts[0] != 'weight' or not parts[2]:
+            raise ValueError("Invalid weight signature")
+        weight = int(parts[1])
+        if weight < 1:
+            raise ValueError("Weight must be positive")
+        return weight, parts[2], int(parts[3])
+
+    def sign_weight(self, credential_id: str, weight: int) -> str:
+        """为凭证签发权重签名（认证服务器调用）"""
+        if self.signer is None:
+            self.signer = BlindSigner(weight_private_key())
+        signature = self.signer.sign(self._message(credential_id, weight))
+        return f"weight_{weight}_{credential_id}_{signature}"
+
+    def verify_weight_signature(self, weight_signature: str, credential_id: str = None) -> bool:
+        """
+        验证权重签名
+        :param credential_id: 给出时还要求签名绑定的正是该凭证
+        """
+        credential_ids = None if credential_id is None else [credential_id]
+        return self.verify_weight_signatures([weight_signature], credential_ids)[0]
+
+    def verify_weight_signatures(self, weight_signatures: List[str],
+                                 credential_ids: List[str] = None) -> List[bool]:
+        """
+        批量验证权重签名
+        :param credential_ids: 可选，与 weight_signatures 一一对应的凭证标识
+        :return: 与输入顺序一致的验证结果
+        """
+        results = [False] * len(weight_signatures)
+        pairs = []
+        positions = []
+        for i, weight_signature in enumerate(weight_signatures):
+            try:
+                weight, credential_id, signature = self.parse_weight_signature(weight_signature)
+            except ValueError:
+                continue
+            if credential_ids is not None and credential_ids[i] != credential_id:
+                continue
+            pairs.append((self._message(credential_id, weight), signature))
+            positions.append(i)
+
+        for i, ok in zip(positions, self.batch_verifier.verify_batch(pairs)):
+            results[i] = ok
+        return results
@@ -38,7 +38,6 @@ class HomomorphicOperations:
         密文重随机化（不改变明文）
         (alpha * g^r, beta * y^r)
         """
-        alpha, beta = ciphertext
         if r is None:
             r = number.getRandomRange(1, self.params.q-1)
         
@@ -0,0 +1,343 @@
+"""
+计票服务器的 ASGI（asyncio）版本，路由与 tally_server.py 相同：
+    GET /public_key, POST /encrypt, POST /submit, POST /submit_batch, GET /tally/result, GET /verify/<i>
+
+- 加密、签名验证、ZKP验证、计票等 CPU 密集操作交给进程池，不受 GIL 限制
+- 防重登记与存储写入交给单线程的写入执行器，保证追加顺序
+- 事件循环只负责收发请求
+
+运行（需要安装 uvicorn）：
+    python -m backend.tally_asgi --port 5002 --crypto-workers 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from backend.storage.vote_db import store_vote, init_vote_db
+from backend.storage.receipt_index import DuplicateBallotError
+from backend.auth.nullifier_store import NullifierStore
+from backend.audit.logger import AuditLogger
+from backend.config import TALLY_SERVER_PORT, SUBMIT_BATCH_MAX
+from backend.tally import batch
+from backend.vote.weighted_encrypt import public_key_to_dict
+
+logger = logging.getLogger(__name__)
+
+# ---------- 在工作进程中执行的函数 ----------
+
+# 每个工作进程懒加载自己的控制器（只加载一次密钥）
+_worker_controllers = {}
+
+
+def _controller(name: str):
+    if name not in _worker_controllers:
+        if name == "vote":
+            from backend.vote.controller import VoteController
+            _worker_controllers[name] = VoteController()
+        elif name == "verify":
+            from backend.verify.controller import VerifyController
+            _worker_controllers[name] = VerifyController()
+        elif name == "tally":
+            from backend.tally.controller import TallyController
+            _worker_controllers[name] = TallyController()
+    return _worker_controllers[name]
+
+
+def _create_vote(plaintext: int, weight: int) -> Dict:
+    return _controller("vote").create_vote(plaintext=plaintext, weight=weight)
+
+
+def _check_ballot(encrypted_vote: Dict, credential: Dict) -> Tuple[bool, bool, Optional[str]]:
+    """验证权重签名、选票证明和凭证签名，返回 (权重签名是否有效, 证明是否有效, 防重标识)"""
+    return batch.check_chunk([{"encrypted_vote": encrypted_vote, "credential": credential}])[0]
+
+
+def _public_key() -> Dict:
+    return public_key_to_dict(_controller("vote").elgamal.public_key)
+
+
+def _verify_vote(vote_index: int) -> Dict:
+    return _controller("verify").verify_vote(vote_index)
+
+
+def _tally_votes() -> Dict:
+    return _controller("tally").tally_votes()
+
+
+# ---------- ASGI 应用 ----------
+
+class TallyASGIApp:
+    """计票服务器 ASGI 应用"""
+
+    def __init__(self, crypto_workers: int = None, crypto_executor: Executor = None,
+                 nullifier_store: NullifierStore = None):
+        """
+        :param crypto_workers: 密码运算进程数，默认 CPU 核数
+        :param crypto_executor: 自定义执行器（测试时可传入线程池）
+        :param nullifier_store: 已使用序列号存储，默认使用 NullifierStore()
+        """
+        self.crypto_workers = crypto_workers or os.cpu_count() or 1
+        self._crypto = crypto_executor
+        self._writer = None
+        self._nullifiers = nullifier_store
+        self._audit_logger = None
+        self._public_key = None
+        self._started = False
+        self._startup_lock = Lock()
+        self._routes = [
+            ("GET", re.compile(r"^/public_key$"), self.get_public_key),
+            ("POST", re.compile(r"^/encrypt$"), self.encrypt_vote),
+            ("POST", re.compile(r"^/submit$"), self.submit_vote),
+            ("POST", re.compile(r"^/submit_batch$"), self.submit_batch),
+            ("GET", re.compile(r"^/tally/result$"), self.get_tally_result),
+            ("GET", re.compile(r"^/verify/(\d+)$"), self.verify_vote),
+        ]
+
+    def startup(self):
+        """创建执行器并恢复存储状态（阻塞，只执行一次）"""
+        with self._startup_lock:
+            if not self._started:
+                self._startup()
+                self._started = True
+
+    def _startup(self):
+        if self._crypto is None:
+            self._crypto = ProcessPoolExecutor(
+                max_workers=self.crypto_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vote-writer")
+            self._writer.submit(init_vote_db).result()
+        if self._nullifiers is None:
+            self._nullifiers = NullifierStore()
+        if self._audit_logger is None:
+            self._audit_logger = AuditLogger()
+
+    def shutdown(self):
+        if self._crypto is not None:
+            self._crypto.shutdown(cancel_futures=True)
+        if self._writer is not None:
+            self._writer.shutdown()
+
+    async def _ensure_started(self):
+        """
+        未经 lifespan 启动时（服务器不支持 lifespan），在第一个请求中启动
+        存储恢复可能耗时较长，放到默认线程池执行，不阻塞事件循环
+        """
+        if not self._started:
+            await asyncio.get_running_loop().run_in_executor(None, self.startup)
+
+    async def _run_crypto(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._crypto, fn, *args)
+
+    async def _run_writer(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._writer, fn, *args)
+
+    # ---------- 路由处理 ----------
+
+    async def get_public_key(self, data: Dict) -> Tuple[int, Dict]:
+        """发布选举公钥"""
+        if self._public_key is None:
+            self._public_key = await self._run_crypto(_public_key)
+        return 200, self._public_key
+
+    async def encrypt_vote(self, data: Dict) -> Tuple[int, Dict]:
+        """加密投票（仅为兼容旧客户端保留）"""
+        try:
+            if not all(k in data for k in ['vote', 'weight']):
+                return 400, {"error": "Missing required fields"}
+            vote_data = await self._run_crypto(_create_vote, int(data['vote']), int(data['weight']))
+            return 200, vote_data
+        except Exception as e:
+            return 400, {"error": str(e)}
+
+    async def submit_vote(self, data: Dict) -> Tuple[int, Dict]:
+        """提交投票"""
+        try:
+            if not all(k in data for k in ['encrypted_vote', 'credential', 'voter_id']):
+                return 400, {"error": "Missing required fields"}
+
+            encrypted_vote = data['encrypted_vote']
+            if not all(k in encrypted_vote for k in ['ciphertext', 'zkp', 'weight_signature']):
+                return 400, {"error": "Invalid encrypted vote format"}
+
+            # 1. 在工作进程中验证权重签名、选票证明和凭证签名（证明使用签名的权重）
+            weight_valid, zkp_valid, nullifier = await self._run_crypto(
+                _check_ballot, encrypted_vote, data['credential']
+            )
+            if not weight_valid:
+                return 403, {"error": "Invalid weight signature"}
+            if not zkp_valid:
+                return 400, {"error": "Invalid ZKP"}
+            if nullifier is None:
+                return 403, {"error": "Invalid credential"}
+
+            # 2. 在写入线程中登记防重标识并存储；未能存储时（含重复密文）撤销登记
+            def commit():
+                if not self._nullifiers.check_and_insert(nullifier):
+                    return None
+                try:
+                    result = store_vote(
+                        ciphertext=encrypted_vote['ciphertext'],
+                        zkp=encrypted_vote['zkp'],
+                        weight_signature=encrypted_vote['weight_signature']
+                    )
+                except Exception:
+                    self._nullifiers.remove_many([nullifier])
+                    raise
+                self._audit_logger.log_vote_operation("submit", {
+                    "voter_id": data['voter_id'],
+                    "vote_index": result['index']
+                })
+                return result
+
+            result = await self._run_writer(commit)
+            if result is None:
+                return 403, {"error": "Invalid credential"}
+
+            return 200, {
+                "success": True,
+                "vote_index": result['index'],
+                "vote_hash": result['vote_hash'],
+                "receipt_code": result['receipt_code'],
+                "merkle_proof": result['merkle_proof']
+            }
+
+        except DuplicateBallotError as e:
+            return 409, {"error": str(e)}
+        except Exception as e:
+            logger.error(f"处理投票请求失败: {str(e)}", exc_info=True)
+            return 500, {"error": str(e)}
+
+    async def submit_batch(self, data: Dict) -> Tuple[int, Dict]:
+        """批量提交投票，各块选票在工作进程中并行验证，再由写入线程一次性存储"""
+        try:
+            ballots = data.get('ballots')
+            if not isinstance(ballots, list) or not ballots:
+                return 400, {"error": "Missing required fields"}
+            if len(ballots) > SUBMIT_BATCH_MAX:
+                return 413, {"error": f"Too many ballots (max {SUBMIT_BATCH_MAX})"}
+
+            results, candidates = batch.prepare(ballots)
+            chunks = batch.split_chunks([ballots[i] for i in candidates], self.crypto_workers)
+            checks = []
+            for chunk_result in await asyncio.gather(*(self._run_crypto(batch.check_chunk, c) for c in chunks)):
+                checks.extend(chunk_result)
+
+            return 200, await self._run_writer(
+                batch.commit, ballots, results, candidates, checks, self._nullifiers, self._audit_logger
+            )
+        except Exception as e:
+            logger.error(f"处理批量投票请求失败: {str(e)}", exc_info=True)
+            return 500, {"error": str(e)}
+
+    async def get_tally_result(self, data: Dict) -> Tuple[int, Dict]:
+        """获取计票结果"""
+        try:
+            result = await self._run_crypto(_tally_votes)
+            if "error" not in result:
+                await self._run_writer(self._audit_logger.log_tally_result, result)
+            return 200, result
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    async def verify_vote(self, data: Dict, vote_index: str) -> Tuple[int, Dict]:
+        """验证投票"""
+        return 200, await self._run_crypto(_verify_vote, int(vote_index))
+
+    # ---------- ASGI 协议 ----------
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        await self._ensure_started()
+        status, payload = await self._dispatch(scope, receive)
+        body = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self._ensure_started()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _dispatch(self, scope, receive) -> Tuple[int, Dict]:
+        path_matched = False
+        for method, pattern, handler in self._routes:
+            match = pattern.match(scope["path"])
+            if not match:
+                continue
+            path_matched = True
+            if scope["method"] != method:
+                continue
+
+            data = {}
+            if method == "POST":
+                body = await self._read_body(receive)
+                try:
+                    data = json.loads(body or b"null")
+                except json.JSONDecodeError:
+                    return 400, {"error": "Invalid JSON"}
+                if not isinstance(data, dict):
+                    return 400, {"error": "Invalid JSON"}
+            return await handler(data, *match.groups())
+
+        if path_matched:
+            return 405, {"error": "Method not allowed"}
+        return 404, {"error": "Not found"}
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+
+app = TallyASGIApp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASGI 计票服务器")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=TALLY_SERVER_PORT)
+    parser.add_argument("--crypto-workers", type=int, default=None, help="密码运算进程数")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("需要安装 uvicorn: pip install uvicorn")
+
+    uvicorn.run(TallyASGIApp(crypto_workers=args.crypto_workers), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,41 @@
-from flask import Flask, request, jsonify
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from flask import Flask, Response, request, jsonify
 from backend.tally.controller import TallyController 
-from backend.storage.vote_db import store_vote, get_all_votes
+from backend.tally import batch
+from backend.storage.vote_db import store_vote, store_votes_batch, get_all_votes, get_checkpoint, read_log
+from backend.storage.receipt_index import DuplicateBallotError
 from backend.verify.controller import VerifyController
 from backend.auth.auth import CredentialVerifier
 from backend.audit.logger import AuditLogger
 from backend.vote.controller import VoteController
+from backend.config import TALLY_SERVER_PORT, TALLY_WORKERS, SUBMIT_BATCH_MAX, SUBMIT_BATCH_WORKERS, VERIFY_BATCH_MAX
+from backend import admission, http_cache, metrics, prefork
+from backend.replication import checkpoint_headers
+from backend.metrics import STAGE_SECONDS, SUBMIT_REJECTS
+from backend.vote.weighted_encrypt import public_key_to_dict, verify_ballot
 
 app = Flask(__name__)
-tally_controller = TallyController()
+metrics.install(app)
+audit_logger = AuditLogger()
+tally_controller = TallyController(audit_logger=audit_logger)
 verify_controller = VerifyController()
 credential_verifier = CredentialVerifier()
 vote_controller = VoteController()
-audit_logger = AuditLogger()
+# 投票提交的准入控制：过载时快速返回 503 + Retry-After，而不是在存储锁上无限排队
+admission_controller = admission.AdmissionController()
+admission.install(app, admission_controller, endpoints=("submit_vote", "submit_batch"))
+# 计票结果和验证结果的响应缓存，新投票写入（Merkle 根改变）后自然失效
+response_cache = http_cache.ResponseCache()
+
+@app.route('/public_key', methods=['GET'])
+def get_public_key():
+    """发布选举公钥，客户端据此在本地加密选票并生成证明"""
+    return jsonify(public_key_to_dict(vote_controller.elgamal.public_key))
 
 @app.route('/encrypt', methods=['POST'])
 def encrypt_vote():
-    """加密投票"""
+    """加密投票（仅为兼容旧客户端保留，新客户端在本地加密）"""
     try:
         data = request.get_json()
         if not all(k in data for k in ['vote', 'weight']):
@@ -38,6 +58,11 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+def _verify_encrypted_vote(encrypted_vote, weight: int) -> bool:
+    """验证密文的明文属于 {0, 权重}"""
+    return verify_ballot(vote_controller.elgamal.public_key,
+                         encrypted_vote['ciphertext'], encrypted_vote['zkp'], weight)
+
 @app.route('/submit', methods=['POST'])
 def submit_vote():
     """提交投票"""
@@ -47,72 +72,187 @@ def submit_vote():
         
         if not all(k in data for k in ['encrypted_vote', 'credential', 'voter_id']):
             logger.error(f"缺少必要字段，收到的字段: {list(data.keys())}")
+            SUBMIT_REJECTS.inc(reason="missing_fields")
             return jsonify({"error": "Missing required fields"}), 400
             
-        # 1. 验证凭证
-        logger.debug(f"开始验证凭证: {data['credential']}")
-        if not credential_verifier.verify_credential(data['credential']):
-            logger.error("凭证验证失败")
-            return jsonify({"error": "Invalid credential"}), 403
-            
         encrypted_vote = data['encrypted_vote']
         logger.debug(f"加密投票数据: {encrypted_vote}")
         
         if not all(k in encrypted_vote for k in ['ciphertext', 'zkp', 'weight_signature']):
             logger.error(f"无效的加密投票格式，缺少必要字段")
+            SUBMIT_REJECTS.inc(reason="invalid_format")
             return jsonify({"error": "Invalid encrypted vote format"}), 400
             
-        # 2. 存储投票
+        # 1. 验证权重签名：权重取自绑定本凭证的签名，而不是客户端声称的值
+        with STAGE_SECONDS.time(operation="submit", stage="verify_weight"):
+            weight = batch.check_weights([data])[0]
+        if weight is None:
+            logger.error("权重签名验证失败")
+            SUBMIT_REJECTS.inc(reason="invalid_weight")
+            return jsonify({"error": "Invalid weight signature"}), 403
+
+        # 2. 按签名的权重验证选票证明（在登记凭证之前，无效选票不消耗凭证）
+        with STAGE_SECONDS.time(operation="submit", stage="verify_zkp"):
+            zkp_valid = _verify_encrypted_vote(encrypted_vote, weight)
+        if not zkp_valid:
+            logger.error("选票零知识证明验证失败")
+            SUBMIT_REJECTS.inc(reason="invalid_zkp")
+            return jsonify({"error": "Invalid ZKP"}), 400
+            
+        # 3. 验证凭证
+        logger.debug(f"开始验证凭证: {data['credential']}")
+        with STAGE_SECONDS.time(operation="submit", stage="verify_credential"):
+            credential_valid = credential_verifier.verify_credential(data['credential'])
+        if not credential_valid:
+            logger.error("凭证验证失败")
+            SUBMIT_REJECTS.inc(reason="invalid_credential")
+            return jsonify({"error": "Invalid credential"}), 403
+            
+        # 4. 存储投票；未能存储时（含重复密文）撤销防重登记，凭证不会因此作废
         try:
             logger.debug("开始存储投票...")
-            result = store_vote(
-                ciphertext=encrypted_vote['ciphertext'],
-                zkp=encrypted_vote['zkp'],
-                weight_signature=encrypted_vote['weight_signature']
-            )
+            with STAGE_SECONDS.time(operation="submit", stage="store"):
+                result = store_vote(
+                    ciphertext=encrypted_vote['ciphertext'],
+                    zkp=encrypted_vote['zkp'],
+                    weight_signature=encrypted_vote['weight_signature']
+                )
             logger.debug(f"投票存储成功，结果: {result}")
-            
-            # 3. 记录审计日志
+        except DuplicateBallotError as e:
+            credential_verifier.release_credential(data['credential'])
+            logger.error(f"拒绝重复提交的密文: {str(e)}")
+            SUBMIT_REJECTS.inc(reason="duplicate_ciphertext")
+            return jsonify({"error": str(e)}), 409
+        except Exception as e:
+            credential_verifier.release_credential(data['credential'])
+            logger.error(f"存储投票失败: {str(e)}", exc_info=True)
+            return jsonify({"error": f"Failed to store vote: {str(e)}"}), 500
+
+        # 5. 记录审计日志（选票已存储，之后出错也不再撤销登记）
+        with STAGE_SECONDS.time(operation="submit", stage="audit_log"):
             audit_logger.log_vote_operation("submit", {
                 "voter_id": data['voter_id'],
                 "vote_index": result['index']
             })
-            
-            return jsonify({
-                "success": True,
-                "vote_index": result['index'],
-                "merkle_proof": result['merkle_proof']
-            })
-            
-        except Exception as e:
-            logger.error(f"存储投票失败: {str(e)}", exc_info=True)
-            return jsonify({"error": f"Failed to store vote: {str(e)}"}), 500
+        
+        return jsonify({
+            "success": True,
+            "vote_index": result['index'],
+            "vote_hash": result['vote_hash'],
+            "receipt_code": result['receipt_code'],
+            "merkle_proof": result['merkle_proof']
+        })
             
     except Exception as e:
         logger.error(f"处理投票请求失败: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+_batch_pool = None
+
+def _get_batch_pool():
+    """懒创建批量验证用的进程池（工作进程数不超过1时不使用进程池）"""
+    global _batch_pool
+    if _batch_pool is None and SUBMIT_BATCH_WORKERS > 1:
+        _batch_pool = ProcessPoolExecutor(
+            max_workers=SUBMIT_BATCH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _batch_pool
+
+@app.route('/submit_batch', methods=['POST'])
+def submit_batch():
+    """
+    批量提交投票（如托管代理代多名股东提交）
+    请求: {"ballots": [{"encrypted_vote", "credential", "voter_id"}, ...]}
+    响应: 每张选票的结果，成功时包含投票索引、回执和 Merkle 证明，失败时包含错误和对应的状态码；
+          merkle_root 为整批写入后的根，全部证明都对应这个根
+    """
+    try:
+        data = request.get_json()
+        ballots = data.get('ballots') if isinstance(data, dict) else None
+        if not isinstance(ballots, list) or not ballots:
+            return jsonify({"error": "Missing required fields"}), 400
+        if len(ballots) > SUBMIT_BATCH_MAX:
+            return jsonify({"error": f"Too many ballots (max {SUBMIT_BATCH_MAX})"}), 413
+
+        results, candidates = batch.prepare(ballots)
+        # 并行验证选票证明和凭证签名
+        with STAGE_SECONDS.time(operation="submit_batch", stage="verify"):
+            checks = batch.check_ballots(
+                [ballots[i] for i in candidates], _get_batch_pool(), SUBMIT_BATCH_WORKERS
+            )
+        return jsonify(batch.commit(
+            ballots, results, candidates, checks, credential_verifier.used_serials, audit_logger
+        ))
+
+    except Exception as e:
+        logger.error(f"处理批量投票请求失败: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/tally/result', methods=['GET'])
+@http_cache.conditional(response_cache)
 def get_tally_result():
     """获取计票结果"""
     try:
+        # 计票控制器会把结果写入审计日志
         result = tally_controller.tally_votes()
-        
-        # 记录审计日志
-        audit_logger.log_tally_result(result)
-        
         return jsonify(result)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/verify/<int:vote_index>', methods=['GET'])
+@http_cache.conditional(response_cache)
 def verify_vote(vote_index):
     """验证投票"""
     result = verify_controller.verify_vote(vote_index)
     return jsonify(result)
 
+@app.route('/verify/receipt/<receipt>', methods=['GET'])
+@http_cache.conditional(response_cache)
+def verify_receipt(receipt):
+    """按回执（vote_hash 或短回执码）验证投票"""
+    result = verify_controller.verify_receipt(receipt)
+    if result.get("error") == "Receipt not found":
+        return jsonify(result), 404
+    return jsonify(result)
+
+@app.route('/verify/batch', methods=['POST'])
+def verify_votes():
+    """批量验证投票（共用一份Merkle批量证明）"""
+    data = request.get_json()
+    if not data or 'vote_indices' not in data:
+        return jsonify({"error": "Missing required fields"}), 400
+    vote_indices = data['vote_indices']
+    if not isinstance(vote_indices, list):
+        return jsonify({"error": "vote_indices must be a list"}), 400
+    if len(vote_indices) > VERIFY_BATCH_MAX:
+        return jsonify({"error": f"Too many vote indices (max {VERIFY_BATCH_MAX})"}), 413
+    result = verify_controller.verify_votes(vote_indices)
+    return jsonify(result)
+
+@app.route('/replication/log', methods=['GET'])
+def replication_log():
+    """
+    日志复制：返回本地日志从 offset 开始的原始字节，供只读从节点追加重放
+    响应头给出这段日志结束处的检查点（票数、链头、Merkle根）
+    """
+    offset = request.args.get('offset', 0, type=int)
+    checkpoint = get_checkpoint()
+    end = max(offset, checkpoint["log_offset"])
+    try:
+        chunks = read_log(offset, end)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 416
+    headers = checkpoint_headers(checkpoint, offset)
+    headers["Content-Length"] = str(end - offset)
+    return Response(chunks, mimetype="application/x-ndjson", headers=headers)
+
 if __name__ == '__main__':
     from backend.storage.vote_db import init_vote_db
-    init_vote_db()  # 初始化投票数据库
-    app.run(host='0.0.0.0', port=5002)
\ No newline at end of file
+    if TALLY_WORKERS > 1:
+        # 多个工作进程共享同一份存储，各进程启动后自行恢复存储状态
+        prefork.serve(app, '0.0.0.0', TALLY_SERVER_PORT, TALLY_WORKERS, on_start=init_vote_db)
+    else:
+        init_vote_db()  # 初始化投票数据库
+        app.run(host='0.0.0.0', port=TALLY_SERVER_PORT)
\ No newline at end of file
@@ -1,10 +1,13 @@
-from typing import Dict
-from ..storage.vote_db import get_all_votes
+from typing import Dict, List
+from ..storage.vote_db import find_vote_by_receipt
+from ..storage.vote_view import current_view
+from ..storage.receipt_index import receipt_code
 from ..storage.merkle_tree import MerkleTree
-from ..crypto.OR_Proof import ORProof
+from ..vote.weighted_encrypt import verify_ballot, weight_from_signature
 import json
 from ..crypto.elgamal import ExponentialElGamal, PublicKey
 from ..auth.auth import CredentialVerifier 
+from ..tally.controller import CredentialVerifier as WeightVerifier
 
 class VerifyController:
     def __init__(self):
@@ -13,16 +16,16 @@ class VerifyController:
         self.elgamal = ExponentialElGamal(decrypt_enabled=False)
         self.pk = self.elgamal.public_key  # 获取公钥对象
         self.credential_verifier = CredentialVerifier() 
+        self.weight_verifier = WeightVerifier()
     def verify_vote(self, vote_index: int) -> Dict:
         """验证投票的存在性和完整性"""
         try:
-            # 1. 获取投票数据
-            votes = get_all_votes()
-            if vote_index >= len(votes["votes"]):
+            # 1. 获取投票数据（缓存的只读视图，不持有写入锁）
+            view = current_view()
+            vote = view.vote(vote_index)
+            if vote is None:
                 return {"verified": False, "error": "Vote index out of range"}
-                
-            vote = votes["votes"][vote_index]
-            merkle_root = votes["merkle_root"]
+            merkle_root = view.merkle_root
             
             # 2. 验证ZKP
             if not self._verify_zkp(vote):
@@ -33,12 +36,7 @@ class VerifyController:
                 return {"verified": False, "error": "Invalid weight"}
             
             # 4. 验证Merkle证明
-            merkle_tree = MerkleTree([
-                json.dumps(v, sort_keys=True) 
-                for v in votes["votes"]
-            ])
-            
-            proof = merkle_tree.get_proof(vote_index)
+            proof = view.get_proof(vote_index)
             vote_str = json.dumps(vote, sort_keys=True)
             
             if not MerkleTree.verify_proof(vote_str, proof, merkle_root):
@@ -52,6 +50,64 @@ class VerifyController:
             
         except Exception as e:
             return {"verified": False, "error": str(e)}
+
+    def verify_receipt(self, receipt: str) -> Dict:
+        """
+        按投票回执（vote_hash 或短回执码）查找并验证投票
+        """
+        found = find_vote_by_receipt(receipt)
+        if found is None:
+            return {"verified": False, "error": "Receipt not found"}
+
+        result = self.verify_vote(found["index"])
+        result.update({
+            "vote_index": found["index"],
+            "vote_hash": found["vote_hash"],
+            "receipt_code": receipt_code(found["vote_hash"])
+        })
+        return result
+
+    def verify_votes(self, vote_indices: List[int]) -> Dict:
+        """
+        批量验证多张投票（如托管机构为大量实益股东代投）
+        所有投票共用一份去重的 Merkle 批量证明
+        """
+        try:
+            view = current_view()
+            indices = sorted(set(int(i) for i in vote_indices))
+            if not indices:
+                return {"verified": False, "error": "No vote indices given"}
+            if indices[0] < 0 or indices[-1] >= view.count:
+                return {"verified": False, "error": "Vote index out of range"}
+
+            # 1. 逐票验证ZKP和权重
+            failed = {}
+            for index in indices:
+                vote = view.vote(index)
+                if not self._verify_zkp(vote):
+                    failed[index] = "Invalid ZKP"
+                elif not self._verify_weight(vote):
+                    failed[index] = "Invalid weight"
+
+            # 2. 一次性验证批量Merkle证明
+            proof = view.get_multi_proof(indices)
+            leaves = {
+                index: json.dumps(view.vote(index), sort_keys=True)
+                for index in indices
+            }
+            if not MerkleTree.verify_multi_proof(leaves, proof, view.merkle_root):
+                return {"verified": False, "error": "Invalid Merkle proof"}
+
+            return {
+                "verified": not failed,
+                "failed": failed,
+                "votes": {index: view.vote(index) for index in indices},
+                "merkle_root": view.merkle_root,
+                "merkle_multi_proof": proof
+            }
+
+        except Exception as e:
+            return {"verified": False, "error": str(e)}
             
     def _verify_zkp(self, vote: Dict) -> bool:
         """验证投票的零知识证明"""
@@ -59,32 +115,8 @@ class VerifyController:
             ciphertext = vote["ciphertext"]
             zkp = vote["zkp"]
             
-            # 从密文中提取 alpha, beta
-            alpha = int(ciphertext["alpha"])
-            beta = int(ciphertext["beta"])
-            
-            # 从ZKP中提取证明参数
-            com1 = zkp["com1"]
-            com2 = zkp["com2"]
-            cha1 = int(zkp["cha1"])
-            cha2 = int(zkp["cha2"])
-            resp1 = int(zkp["resp1"])
-            resp2 = int(zkp["resp2"])
-            
-            # 调用OR_Proof验证
-            result = ORProof.verify_proof(
-                c=(alpha, beta),
-                com1=com1,
-                com2=com2,
-                cha=cha1 + cha2,
-                cha1=cha1,
-                cha2=cha2,
-                resp1=resp1,
-                resp2=resp2,
-                pk_v=(self.pk.p, self.pk.q, self.pk.g, self.pk.y)
-            )
-            
-            return result.verified
+            weight = weight_from_signature(vote["weight_signature"])
+            return verify_ballot(self.pk, ciphertext, zkp, weight)
             
         except Exception as e:
             print(f"ZKP verification failed: {e}")
@@ -93,9 +125,7 @@ class VerifyController:
     def _verify_weight(self, vote: Dict) -> bool:
         """验证投票权重"""
         try:
-            weight_signature = vote["weight_signature"]
-            # 实际应该验证权重签名
-            return weight_signature.startswith("weight_")
+            return self.weight_verifier.verify_weight_signature(vote["weight_signature"])
         except Exception as e:
             print(f"Weight verification failed: {e}")
             return False
\ No newline at end of file
@@ -8,4 +8,21 @@ verify_controller = VerifyController()
 def verify_vote(vote_index):
     """验证投票API"""
     result = verify_controller.verify_vote(vote_index)
+    return jsonify(result)
+
+@verify_bp.route('/verify/batch', methods=['POST'])
+def verify_votes():
+    """批量验证投票API"""
+    data = request.get_json()
+    if not data or 'vote_indices' not in data:
+        return jsonify({"error": "Missing required fields"}), 400
+    result = verify_controller.verify_votes(data['vote_indices'])
+    return jsonify(result)
+
+@verify_bp.route('/verify/receipt/<receipt>', methods=['GET'])
+def verify_receipt(receipt):
+    """按回执验证投票API"""
+    result = verify_controller.verify_receipt(receipt)
+    if result.get("error") == "Receipt not found":
+        return jsonify(result), 404
     return jsonify(result)
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+带权重的选票加密与证明（客户端本地执行，也供服务器验证使用）
+- 加密：(alpha, beta) = (g^r, g^{m*w} * y^r)，m ∈ {0, 1}，w 为权重
+- 证明：OR 证明密文的明文属于 {0, w}（分支 1 证明明文为 0，分支 2 证明明文为 w）
+- 挑战由 Fiat-Shamir 启发式从公钥、密文和承诺计算，证明可离线生成、任何人可验证
+"""
+import hashlib
+from typing import Dict, Tuple
+from Crypto.Util import number
+from ..crypto.elgamal import PublicKey, ElGamalCiphertext
+from ..crypto.OR_Proof import ORProof
+from ..metrics import STAGE_SECONDS
+
+
+def public_key_to_dict(pk: PublicKey) -> Dict:
+    """公钥序列化（/public_key 接口的响应格式）"""
+    return {"p": str(pk.p), "g": str(pk.g), "q": str(pk.q), "y": str(pk.y)}
+
+
+def public_key_from_dict(data: Dict) -> PublicKey:
+    return PublicKey(p=int(data["p"]), g=int(data["g"]), q=int(data["q"]), y=int(data["y"]))
+
+
+def ballot_challenge(pk: PublicKey, ciphertext: Tuple[int, int], com1, com2, weight: int) -> int:
+    """Fiat-Shamir 挑战：H(p, g, y, w, alpha, beta, A1, B1, A2, B2) mod q"""
+    values = [pk.p, pk.g, pk.y, weight, *ciphertext, *com1, *com2]
+    digest = hashlib.sha256(":".join(str(int(v)) for v in values).encode()).digest()
+    return int.from_bytes(digest, "big") % pk.q
+
+
+def weight_from_signature(weight_signature: str) -> int:
+    """从权重签名 weight_<w>[_<签名>] 中取出权重"""
+    parts = weight_signature.split("_")
+    if len(parts) < 2 or parts[0] != "weight":
+        raise ValueError("Invalid weight signature")
+    weight = int(parts[1])
+    if weight < 1:
+        raise ValueError("Weight must be positive")
+    return weight
+
+
+def prove_ballot(pk: PublicKey, plaintext: int, weight: int, r: int,
+                 ciphertext: ElGamalCiphertext) -> Dict:
+    """为已加密的选票生成非交互 OR 证明"""
+    prover = ORProof(pk)
+    c = (ciphertext.alpha, ciphertext.beta)
+    com1, com2 = prover.generate_proof_step1(plaintext, c, weight)
+    challenge = ballot_challenge(pk, c, com1, com2, weight)
+    cha1, resp1, cha2, resp2 = prover.generate_proof_step2(challenge, r)
+    return {
+        "com1": com1,
+        "com2": com2,
+        "cha1": str(cha1),
+        "cha2": str(cha2),
+        "resp1": str(resp1),
+        "resp2": str(resp2)
+    }
+
+
+def encrypt_ballot(pk: PublicKey, plaintext: int, weight: int, weight_signature: str = None) -> Dict:
+    """
+    用公钥加密选票并生成证明
+    :param plaintext: 投票值 (0或1)
+    :param weight: 投票权重
+    :param weight_signature: 认证服务器随凭证签发的权重签名，缺省时为未签名的 weight_<w>（计票时不计入）
+    :return: 与 /submit 的 encrypted_vote 字段格式一致
+    """
+    if plaintext not in (0, 1):
+        raise ValueError("Vote must be 0 or 1")
+    if weight < 1:
+        raise ValueError("Weight must be positive")
+
+    with STAGE_SECONDS.time(operation="create_vote", stage="encrypt"):
+        r = number.getRandomRange(1, pk.q - 1)
+        alpha = pow(pk.g, r, pk.p)
+        beta = pow(pk.g, plaintext * weight, pk.p) * pow(pk.y, r, pk.p) % pk.p
+        ciphertext = ElGamalCiphertext(alpha, beta)
+
+    with STAGE_SECONDS.time(operation="create_vote", stage="prove"):
+        zkp = prove_ballot(pk, plaintext, weight, r, ciphertext)
+
+    return {
+        "ciphertext": {
+            "alpha": str(alpha),
+            "beta": str(beta)
+        },
+        "zkp": zkp,
+        "weight_signature": weight_signature or f"weight_{weight}"
+    }
+
+
+def verify_ballot(pk: PublicKey, ciphertext: Dict, zkp: Dict, weight: int) -> bool:
+    """验证选票证明：密文的明文属于 {0, weight}，且挑战与 Fiat-Shamir 哈希一致"""
+    try:
+        c = (int(ciphertext["alpha"]), int(ciphertext["beta"]))
+        if not all(1 < v < pk.p for v in c):
+            return False
+        com1 = tuple(int(v) for v in zkp["com1"])
+        com2 = tuple(int(v) for v in zkp["com2"])
+        cha1, cha2 = int(zkp["cha1"]), int(zkp["cha2"])
+        resp1, resp2 = int(zkp["resp1"]), int(zkp["resp2"])
+
+        challenge = ballot_challenge(pk, c, com1, com2, weight)
+        result = ORProof.verify_proof(
+            c=c,
+            com1=com1,
+            com2=com2,
+            cha=challenge,
+            cha1=cha1,
+            cha2=cha2,
+            resp1=resp1,
+            resp2=resp2,
+            pk_v=(pk.p, pk.q, pk.g, pk.y),
+            weight=weight
+        )
+        # 挑战不一致时 verify_proof 直接返回 False
+        return bool(result) and result.verified
+    except (KeyError, TypeError, ValueError):
+        return False
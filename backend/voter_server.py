@@ -2,6 +2,7 @@ from flask import Flask, request, jsonify
 from backend.vote.controller import VoteController
 from backend.crypto.OR_Proof import ORProof
 from backend.auth.auth import CredentialVerifier
+from backend.config import VOTER_SERVER_PORT
 import requests
 
 app = Flask(__name__)
@@ -50,4 +51,4 @@ def verify_vote(vote_index):
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(port=5000)
\ No newline at end of file
+    app.run(port=VOTER_SERVER_PORT)
\ No newline at end of file
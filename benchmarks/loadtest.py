@@ -0,0 +1,391 @@
+"""
+端到端压测：在本机启动认证服务器和计票服务器的独立实例，
+登记 N 个合成股东，并发执行 领取凭证 → 本地加密 → 提交 → 验证 的完整流程，
+报告吞吐量、各接口 p50/p95/p99 延迟以及服务器 CPU 占用（含工作进程和密码运算进程）
+
+完全离线运行，数据写入临时目录，不影响开发数据：
+    python -m benchmarks.loadtest --voters 500 --concurrency 32
+    python -m benchmarks.loadtest --voters 2000 --json result.json
+
+比较计票服务器的实现和进程数（--cpus 把服务器进程限制在前 N 个 CPU 上）：
+    python -m benchmarks.loadtest --server flask --workers 4 --cpus 4
+    python -m benchmarks.loadtest --server asgi --workers 4 --cpus 4   # 需要 uvicorn
+"""
+import argparse
+import json
+import math
+import os
+import random
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, List, Optional
+
+from backend.app import create_session
+from backend.vote.weighted_encrypt import encrypt_ballot, public_key_from_dict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "auth": ("backend.auth_server", "AUTH_SERVER_PORT"),
+    "tally": ("backend.tally_server", "TALLY_SERVER_PORT"),
+}
+
+# 计票服务器的实现：flask 为 prefork 多进程（TALLY_WORKERS），asgi 为单进程事件循环 + 密码运算进程池
+TALLY_SERVERS = {
+    "flask": "backend.tally_server",
+    "asgi": "backend.tally_asgi",
+}
+
+
+# ---------- 服务器进程 ----------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务器进程已退出，返回码 {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"等待端口 {port} 超时")
+
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    """
+    从 /proc/<pid>/stat 读取进程累计 CPU 时间（用户态 + 内核态），
+    包括已退出并被回收的子进程（cutime + cstime）
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # 第2个字段（进程名）可能含空格，从右括号之后开始切分
+    fields = stat[stat.rindex(")") + 2:].split()
+    utime, stime, cutime, cstime = (int(x) for x in fields[11:15])
+    return (utime + stime + cutime + cstime) / os.sysconf("SC_CLK_TCK")
+
+
+def _child_pids(pid: int) -> List[int]:
+    """进程的直接子进程（/proc/<pid>/task/<tid>/children）"""
+    children = []
+    try:
+        tids = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return children
+    for tid in tids:
+        try:
+            with open(f"/proc/{pid}/task/{tid}/children", "r") as f:
+                children += [int(child) for child in f.read().split()]
+        except OSError:
+            continue
+    return children
+
+
+def _tree_cpu_seconds(pid: int) -> Optional[float]:
+    """进程及其所有后代进程（prefork 工作进程、密码运算进程池）的 CPU 时间之和"""
+    total = _cpu_seconds(pid)
+    if total is None:
+        return None
+    pending = _child_pids(pid)
+    while pending:
+        child = pending.pop()
+        total += _cpu_seconds(child) or 0.0
+        pending += _child_pids(child)
+    return total
+
+
+class ServerCluster:
+    """在临时数据目录中启动的一组服务器实例"""
+
+    def __init__(self, data_dir: str, server: str = "flask", workers: int = 1, cpus: int = None):
+        """
+        :param server: 计票服务器实现，见 TALLY_SERVERS
+        :param workers: flask 为工作进程数，asgi 为密码运算进程数
+        :param cpus: 把服务器进程限制在前 N 个 CPU 上（None 表示不限制）
+        """
+        self.data_dir = data_dir
+        self.server = server
+        self.workers = workers
+        self.cpus = cpus
+        self.admin_token = secrets.token_hex(16)
+        self.ports = {name: _free_port() for name in SERVERS}
+        self.processes = {}
+        self._logs = {}
+
+    def env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env.update({port_var: str(self.ports[name]) for name, (_, port_var) in SERVERS.items()})
+        env.update({
+            "SHAREHOLDER_REGISTRY_DB": os.path.join(self.data_dir, "shareholders.db"),
+            "SHAREHOLDERS_FILE": os.path.join(self.data_dir, "shareholders.json"),
+            "VOTE_STORAGE_DIR": os.path.join(self.data_dir, "storage"),
+            "NULLIFIER_DB_PATH": os.path.join(self.data_dir, "used_serials.db"),
+            "AUDIT_LOG_DIR": os.path.join(self.data_dir, "audit"),
+            "REGISTRY_ADMIN_TOKEN": self.admin_token,
+            "TALLY_WORKERS": str(self.workers if self.server == "flask" else 1),
+            "PYTHONPATH": ROOT_DIR,
+        })
+        return env
+
+    def command(self, name: str) -> List[str]:
+        if name != "tally":
+            return [sys.executable, "-m", SERVERS[name][0]]
+        command = [sys.executable, "-m", TALLY_SERVERS[self.server]]
+        if self.server == "asgi":
+            command += ["--port", str(self.ports[name]), "--crypto-workers", str(self.workers)]
+        return command
+
+    def _limit_cpus(self):
+        os.sched_setaffinity(0, range(self.cpus))
+
+    def start(self):
+        os.makedirs(os.path.join(self.data_dir, "storage"), exist_ok=True)
+        env = self.env()
+        for name in SERVERS:
+            log = self._logs[name] = open(os.path.join(self.data_dir, f"{name}.log"), "w")
+            self.processes[name] = subprocess.Popen(
+                self.command(name),
+                cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+                preexec_fn=self._limit_cpus if self.cpus else None
+            )
+        for name, process in self.processes.items():
+            try:
+                _wait_for_port(self.ports[name], process)
+            except RuntimeError as e:
+                raise RuntimeError(f"{name} 服务器启动失败（日志: {self._logs[name].name}）: {e}") from e
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self.ports[name]}"
+
+    def cpu_seconds(self) -> Dict[str, Optional[float]]:
+        return {name: _tree_cpu_seconds(process.pid) for name, process in self.processes.items()}
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for log in self._logs.values():
+            log.close()
+
+
+# ---------- 负载 ----------
+
+class LatencyRecorder:
+    """按接口记录延迟（秒）和错误数"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = Lock()
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def timed(self, endpoint: str, fn, *args, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = getattr(result, "status_code", 200) == 200
+            return result
+        finally:
+            self.record(endpoint, time.perf_counter() - start, ok)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+def register_shareholders(session, auth_url: str, count: int, max_weight: int,
+                          admin_token: str) -> List[Dict]:
+    """通过批量导入接口登记合成股东"""
+    voters = [
+        {"voter_id": f"load_{i:07d}", "name": f"股东{i}", "weight": random.randint(1, max_weight)}
+        for i in range(count)
+    ]
+    body = "\n".join(json.dumps(v, ensure_ascii=False) for v in voters).encode()
+    response = session.post(
+        f"{auth_url}/auth/shareholders/import",
+        data=body,
+        headers={"Content-Type": "application/x-ndjson", "Authorization": f"Bearer {admin_token}"},
+        timeout=300
+    )
+    response.raise_for_status()
+    if response.json()["imported"] != count:
+        raise RuntimeError(f"股东登记失败: {response.json()}")
+    return voters
+
+
+def run_session(session, cluster: ServerCluster, public_key, voter: Dict,
+                recorder: LatencyRecorder) -> bool:
+    """单个股东的完整投票流程"""
+    auth_url, tally_url = cluster.url("auth"), cluster.url("tally")
+
+    blinded_serial = int.from_bytes(os.urandom(32), "big")
+    response = recorder.timed("credential", session.post, f"{auth_url}/auth/request_credential", json={
+        "voter_id": voter["voter_id"],
+        "blinded_serial": str(blinded_serial),
+        "voter_info": {"name": voter["name"], "uuid": "", "voter_type": "shareholder",
+                       "weight": voter["weight"]}
+    }, timeout=30)
+    if response.status_code != 200:
+        return False
+    credential = response.json()
+
+    encrypted_vote = recorder.timed("encrypt (client)", encrypt_ballot,
+                                    public_key, random.randint(0, 1), int(credential["weight"]),
+                                    credential["weight_signature"])
+
+    response = recorder.timed("submit", session.post, f"{tally_url}/submit", json={
+        "encrypted_vote": encrypted_vote,
+        "credential": credential,
+        "voter_id": voter["voter_id"]
+    }, timeout=60)
+    if response.status_code != 200:
+        return False
+    vote_index = response.json()["vote_index"]
+
+    response = recorder.timed("verify", session.get, f"{tally_url}/verify/{vote_index}", timeout=60)
+    return response.status_code == 200 and response.json().get("verified", False)
+
+
+def run_load_test(voters: int, concurrency: int, max_weight: int = 10,
+                  data_dir: str = None, server: str = "flask", workers: int = 1,
+                  cpus: int = None) -> Dict:
+    """
+    启动服务器并执行压测
+    :param server: 计票服务器实现（flask / asgi）
+    :param workers: 计票服务器的工作进程数（asgi 为密码运算进程数）
+    :param cpus: 服务器进程可使用的 CPU 数
+    :return: 结果字典（吞吐量、各接口延迟分位数、服务器 CPU）
+    """
+    own_dir = data_dir is None
+    data_dir = data_dir or tempfile.mkdtemp(prefix="voting-loadtest-")
+    cluster = ServerCluster(data_dir, server, workers, cpus)
+    session = create_session(pool_size=concurrency)
+    recorder = LatencyRecorder()
+    try:
+        cluster.start()
+        shareholders = register_shareholders(session, cluster.url("auth"), voters, max_weight,
+                                             cluster.admin_token)
+        public_key = public_key_from_dict(session.get(f"{cluster.url('tally')}/public_key", timeout=30).json())
+
+        cpu_before = cluster.cpu_seconds()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(
+                lambda v: run_session(session, cluster, public_key, v, recorder), shareholders
+            ))
+        elapsed = time.perf_counter() - start
+        cpu_after = cluster.cpu_seconds()
+    finally:
+        session.close()
+        cluster.stop()
+        if own_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    endpoints = {}
+    for endpoint, samples in recorder.samples.items():
+        samples.sort()
+        endpoints[endpoint] = {
+            "count": len(samples),
+            "errors": recorder.errors.get(endpoint, 0),
+            "throughput": len(samples) / elapsed,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+        }
+
+    cpu = {}
+    for name in SERVERS:
+        if cpu_before[name] is None or cpu_after[name] is None:
+            cpu[name] = None
+            continue
+        used = cpu_after[name] - cpu_before[name]
+        cpu[name] = {"cpu_seconds": used, "utilization": used / elapsed}
+
+    return {
+        "voters": voters,
+        "concurrency": concurrency,
+        "server": server,
+        "workers": workers,
+        "cpus": cpus,
+        "elapsed_seconds": elapsed,
+        "completed": sum(outcomes),
+        "failed": len(outcomes) - sum(outcomes),
+        "sessions_per_second": sum(outcomes) / elapsed,
+        "endpoints": endpoints,
+        "server_cpu": cpu,
+    }
+
+
+def print_report(result: Dict):
+    print(f"股东数 {result['voters']}，并发 {result['concurrency']}，"
+          f"计票服务器 {result['server']} × {result['workers']}，"
+          f"CPU {result['cpus'] or '不限'}，耗时 {result['elapsed_seconds']:.2f}s")
+    print(f"完成 {result['completed']}，失败 {result['failed']}，"
+          f"吞吐量 {result['sessions_per_second']:.1f} 次投票/秒")
+    print()
+    print(f"{'接口':<18}{'请求数':>8}{'错误':>6}{'req/s':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"{endpoint:<18}{stats['count']:>8}{stats['errors']:>6}{stats['throughput']:>9.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    print()
+    for name, cpu in result["server_cpu"].items():
+        if cpu is None:
+            print(f"{name} 服务器 CPU: 不可用（需要 /proc）")
+        else:
+            print(f"{name} 服务器 CPU: {cpu['cpu_seconds']:.2f}s（平均 {cpu['utilization'] * 100:.0f}% 单核，含子进程）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="投票系统端到端压测")
+    parser.add_argument("--voters", type=int, default=200, help="合成股东数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发会话数")
+    parser.add_argument("--max-weight", type=int, default=10, help="合成股东的最大权重")
+    parser.add_argument("--server", choices=sorted(TALLY_SERVERS), default="flask", help="计票服务器实现")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="计票服务器进程数（flask 为 TALLY_WORKERS，asgi 为密码运算进程数）")
+    parser.add_argument("--cpus", type=int, default=None, help="把服务器进程限制在前 N 个 CPU 上")
+    parser.add_argument("--data-dir", default=None, help="保留服务器数据和日志的目录（默认使用临时目录并在结束后删除）")
+    parser.add_argument("--json", default=None, help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    result = run_load_test(args.voters, args.concurrency, args.max_weight, args.data_dir,
+                           args.server, args.workers, args.cpus)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    return 0 if result["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+密码运算与存储微基准，输出 JSON 结果并与基线比较
+
+    python -m benchmarks.microbench                      # 运行并与 benchmarks/baseline.json 比较
+    python -m benchmarks.microbench --json out.json      # 同时保存本次结果
+    python -m benchmarks.microbench --update-baseline    # 用本次结果覆盖基线
+    python -m benchmarks.microbench --filter merkle      # 只运行名称包含 merkle 的基准
+
+任一基准的单次耗时超过 基线 × 阈值（默认 1.5）时返回码为 1
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = float(os.environ.get("MICROBENCH_THRESHOLD", "1.5"))
+DEFAULT_STORE_SIZES = (0, 1000, 5000)
+
+# 基准注册表：名称 -> 准备函数（返回被测的无参函数）
+BENCHMARKS: List[Tuple[str, Callable[[], Callable[[], None]]]] = []
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+
+# ---------- 密码运算 ----------
+
+@benchmark("elgamal.encrypt")
+def _elgamal_encrypt():
+    from backend.crypto.elgamal import ExponentialElGamal
+    elgamal = ExponentialElGamal()
+    return lambda: elgamal.encrypt(1)
+
+
+@benchmark("elgamal.decrypt")
+def _elgamal_decrypt():
+    from backend.crypto.elgamal import ExponentialElGamal
+    elgamal = ExponentialElGamal(decrypt_enabled=True)
+    _, ciphertext = elgamal.encrypt(1)
+    return lambda: elgamal.decrypt(ciphertext)
+
+
+@benchmark("elgamal.solve_discrete_log_500")
+def _solve_discrete_log():
+    from backend.crypto.elgamal import ExponentialElGamal
+    elgamal = ExponentialElGamal()
+    g_m = pow(elgamal.g, 500, elgamal.p)
+    return lambda: elgamal.solve_discrete_log(g_m, 1000)
+
+
+@benchmark("or_proof.generate")
+def _or_proof_generate():
+    from backend.crypto.elgamal import ExponentialElGamal
+    from backend.vote.weighted_encrypt import prove_ballot
+    elgamal = ExponentialElGamal()
+    r, ciphertext = elgamal.encrypt(3)
+    return lambda: prove_ballot(elgamal.public_key, 1, 3, r, ciphertext)
+
+
+@benchmark("or_proof.verify")
+def _or_proof_verify():
+    from backend.crypto.elgamal import ExponentialElGamal
+    from backend.vote.weighted_encrypt import encrypt_ballot, verify_ballot
+    elgamal = ExponentialElGamal()
+    ballot = encrypt_ballot(elgamal.public_key, 1, 3)
+    return lambda: verify_ballot(elgamal.public_key, ballot["ciphertext"], ballot["zkp"], 3)
+
+
+@benchmark("homomorphic.add_1000")
+def _homomorphic_add():
+    from backend.crypto.elgamal import ExponentialElGamal
+    from backend.tally.homomorphic import HomomorphicOperations
+    elgamal = ExponentialElGamal()
+    ciphertexts = [elgamal.encrypt(i % 2)[1] for i in range(1000)]
+    homomorphic = HomomorphicOperations(elgamal.public_key)
+    return lambda: homomorphic.homomorphic_add(ciphertexts)
+
+
+@benchmark("homomorphic.rerandomize")
+def _homomorphic_rerandomize():
+    from backend.crypto.elgamal import ExponentialElGamal
+    from backend.tally.homomorphic import HomomorphicOperations
+    elgamal = ExponentialElGamal()
+    _, ciphertext = elgamal.encrypt(1)
+    homomorphic = HomomorphicOperations(elgamal.public_key)
+    return lambda: homomorphic.rerandomize(ciphertext)
+
+
+@benchmark("blind_signer.sign")
+def _blind_sign():
+    from backend.auth.blind_signature import BlindSigner
+    signer = BlindSigner()
+    message = random.randrange(2, signer.n)
+    return lambda: signer.sign(message)
+
+
+# ---------- Merkle 树与哈希链 ----------
+
+def _leaves(count: int) -> List[str]:
+    return [json.dumps({"index": i, "alpha": str(random.getrandbits(1024))}) for i in range(count)]
+
+
+@benchmark("merkle.build_1000")
+def _merkle_build():
+    from backend.storage.merkle_tree import MerkleTree
+    leaves = _leaves(1000)
+    return lambda: MerkleTree(leaves)
+
+
+@benchmark("merkle.proof_1000")
+def _merkle_proof():
+    from backend.storage.merkle_tree import MerkleTree
+    tree = MerkleTree(_leaves(1000))
+    return lambda: tree.get_proof(random.randrange(1000))
+
+
+@benchmark("merkle.verify_proof_1000")
+def _merkle_verify():
+    from backend.storage.merkle_tree import MerkleTree
+    leaves = _leaves(1000)
+    tree = MerkleTree(leaves)
+    proof = tree.get_proof(617)
+    root = tree.get_root()
+    return lambda: MerkleTree.verify_proof(leaves[617], proof, root)
+
+
+@benchmark("hash_chain.verify_1000")
+def _hash_chain_verify():
+    from backend.storage.hash_chain import HashChain
+    data = _leaves(1000)
+    chain = HashChain()
+    for item in data:
+        chain.add_block(item)
+    return lambda: chain.verify_chain(data)
+
+
+# ---------- 存储 ----------
+
+def _store_vote_benchmark(size: int):
+    def setup():
+        from backend.keys import elgamal_keys
+        from backend.storage.vote_db import clear_votes, store_vote
+        p = elgamal_keys()[0]
+
+        def append():
+            store_vote(
+                ciphertext={"alpha": str(random.randrange(2, p)), "beta": str(random.randrange(2, p))},
+                zkp={"cha1": "1"},
+                weight_signature="weight_1"
+            )
+
+        clear_votes()
+        for _ in range(size):
+            append()
+        return append
+    return setup
+
+
+def register_store_benchmarks(sizes):
+    for size in sizes:
+        BENCHMARKS.append((f"store_vote.size_{size}", _store_vote_benchmark(size)))
+
+
+# ---------- 运行与比较 ----------
+
+def measure(fn: Callable[[], None], repeats: int, min_time: float) -> Dict:
+    """
+    先校准迭代次数使每轮至少运行 min_time 秒，再运行 repeats 轮
+    以各轮单次耗时的最小值作为结果（受其他进程干扰最小），同时给出中位数
+    """
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        iterations = max(iterations * 2, int(iterations * min_time / max(elapsed, 1e-9)))
+
+    per_op = [elapsed / iterations]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_op.append((time.perf_counter() - start) / iterations)
+
+    best = min(per_op)
+    return {
+        "per_op_us": best * 1e6,
+        "median_us": statistics.median(per_op) * 1e6,
+        "ops_per_sec": 1 / best if best else None,
+        "iterations": iterations,
+        "repeats": repeats,
+    }
+
+
+def run(name_filter: str = None, repeats: int = 5, min_time: float = 0.2) -> Dict:
+    results = {}
+    for name, setup in BENCHMARKS:
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(setup(), repeats, min_time)
+        print(f"{name:<36}{results[name]['per_op_us']:>14.1f} us/op", flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "timestamp": datetime.now().isoformat(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """返回超过阈值的回归项"""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = result["per_op_us"] / base["per_op_us"]
+        if ratio > threshold:
+            regressions.append({
+                "name": name,
+                "baseline_us": base["per_op_us"],
+                "current_us": result["per_op_us"],
+                "ratio": ratio,
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="密码运算与存储微基准")
+    parser.add_argument("--filter", default=None, help="只运行名称包含该字符串的基准")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮最少运行秒数")
+    parser.add_argument("--store-sizes", default=",".join(map(str, DEFAULT_STORE_SIZES)),
+                        help="store_vote 基准的预置票数，逗号分隔")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="单次耗时超过 基线×阈值 视为回归")
+    parser.add_argument("--json", default=None, help="把本次结果写入 JSON 文件")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    args = parser.parse_args(argv)
+
+    # store_vote 基准写入临时目录，不影响开发数据（必须在导入存储模块前设置）
+    storage_dir = tempfile.mkdtemp(prefix="voting-microbench-")
+    os.environ["VOTE_STORAGE_DIR"] = storage_dir
+    register_store_benchmarks(int(s) for s in args.store_sizes.split(",") if s)
+    try:
+        current = run(args.filter, args.repeats, args.min_time)
+    finally:
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"未找到基线 {args.baseline}，跳过比较")
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold)
+    for item in regressions:
+        print(f"回归: {item['name']} {item['baseline_us']:.1f} -> {item['current_us']:.1f} us/op "
+              f"({item['ratio']:.2f}x > {args.threshold}x)")
+    if not regressions:
+        print(f"未发现超过 {args.threshold}x 的回归")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
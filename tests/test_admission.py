@@ -0,0 +1,103 @@
+import pytest
+import threading
+import time
+from flask import Flask
+from backend import admission
+from backend.admission import AdmissionController, AdmissionRejected
+"python3 -m pytest tests/test_admission.py -v"
+
+def test_queue_full_rejected():
+    """测试名额和队列都满时立即返回 503"""
+    controller = AdmissionController(max_in_flight=1, queue_size=1, queue_timeout=5)
+    controller.acquire("a")
+
+    waiter = threading.Thread(target=controller.acquire, args=("b",))
+    waiter.start()
+    while controller.status()["queued"] == 0:
+        time.sleep(0.01)
+
+    start = time.perf_counter()
+    with pytest.raises(AdmissionRejected) as exc:
+        controller.acquire("c")
+    assert time.perf_counter() - start < 1
+    assert exc.value.status == 503
+    assert exc.value.reason == "queue_full"
+    assert exc.value.retry_after >= 1
+
+    # 释放后名额直接交给排队的请求
+    controller.release("a")
+    waiter.join(timeout=5)
+    assert controller.status() == {"in_flight": 1, "queued": 0, "max_in_flight": 1, "queue_size": 1}
+    controller.release("b")
+    assert controller.status()["in_flight"] == 0
+
+def test_queue_timeout():
+    """测试排队超时返回 503"""
+    controller = AdmissionController(max_in_flight=1, queue_size=4, queue_timeout=0.05)
+    controller.acquire()
+    with pytest.raises(AdmissionRejected) as exc:
+        controller.acquire()
+    assert exc.value.reason == "queue_timeout"
+    assert controller.status()["queued"] == 0
+
+def test_per_client_limit():
+    """测试单个客户端的并发上限"""
+    controller = AdmissionController(max_in_flight=4, queue_size=4, per_client=2)
+    controller.acquire("proxy")
+    controller.acquire("proxy")
+    with pytest.raises(AdmissionRejected) as exc:
+        controller.acquire("proxy")
+    assert exc.value.status == 429
+    # 其他客户端不受影响
+    controller.acquire("voter")
+    controller.release("proxy")
+    controller.acquire("proxy")
+
+def test_fifo_order():
+    """测试排队的请求按先后顺序获得名额"""
+    controller = AdmissionController(max_in_flight=1, queue_size=8, queue_timeout=5)
+    controller.acquire()
+    order = []
+
+    def worker(i):
+        with controller.admit():
+            order.append(i)
+
+    threads = []
+    for i in range(5):
+        thread = threading.Thread(target=worker, args=(i,))
+        thread.start()
+        threads.append(thread)
+        while controller.status()["queued"] < i + 1:
+            time.sleep(0.01)
+    controller.release()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert order == list(range(5))
+
+def test_flask_integration():
+    """测试 Flask 接口返回 503 + Retry-After，未受控的接口不受影响"""
+    app = Flask(__name__)
+    controller = AdmissionController(max_in_flight=1, queue_size=0)
+    admission.install(app, controller, endpoints=("submit",))
+
+    @app.route("/submit", methods=["POST"])
+    def submit():
+        return {"in_flight": controller.status()["in_flight"]}
+
+    @app.route("/status")
+    def status():
+        return {"ok": True}
+
+    client = app.test_client()
+    assert client.post("/submit").get_json() == {"in_flight": 1}
+    assert controller.status()["in_flight"] == 0
+
+    controller.acquire()
+    response = client.post("/submit")
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/status").status_code == 200
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
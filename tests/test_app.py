@@ -0,0 +1,200 @@
+import pytest
+import asyncio
+import threading
+from urllib.parse import urlparse
+from backend import auth_server, tally_server
+from backend.app import VoterClient, AsyncVoterClient, create_session
+from backend.auth.registry import ShareholderRegistry
+from backend.auth.nullifier_store import NullifierStore
+from backend.storage.vote_db import clear_votes, store_vote
+from backend.vote.weighted_encrypt import encrypt_ballot
+"python3 -m pytest tests/test_app.py -v"
+
+class _Response:
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.text = response.get_data(as_text=True)
+        self._json = response.get_json()
+
+    def json(self):
+        return self._json
+
+    def raise_for_status(self):
+        assert self.status_code < 400
+
+class _LocalSession:
+    """按端口把请求转发给 Flask 测试客户端，代替真实的 HTTP 会话"""
+
+    def __init__(self):
+        self.clients = {
+            5001: auth_server.app.test_client(),
+            5002: tally_server.app.test_client(),
+        }
+        self.timeouts = []
+
+    def _client(self, url):
+        parsed = urlparse(url)
+        return self.clients[parsed.port], parsed.path
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        self.timeouts.append(timeout)
+        client, path = self._client(url)
+        return _Response(client.post(path, json=json))
+
+    def get(self, url, timeout=None):
+        self.timeouts.append(timeout)
+        client, path = self._client(url)
+        return _Response(client.get(path))
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    clear_votes()
+    # 独立的名册：凭证签发次数记录在名册中
+    registry = ShareholderRegistry(str(tmp_path / "shareholders.db"))
+    registry.bulk_import([{"voter_id": "shareholder_001", "name": "张三", "weight": 5}])
+    monkeypatch.setattr(auth_server, "registry", registry)
+    monkeypatch.setattr(
+        tally_server.credential_verifier, "used_serials",
+        NullifierStore(str(tmp_path / "used_serials.db"))
+    )
+    yield _LocalSession()
+    clear_votes()
+
+def test_create_session():
+    """测试连接池与重试配置"""
+    session = create_session(pool_size=8, retries=2)
+    adapter = session.get_adapter("http://localhost:5002")
+    assert adapter._pool_maxsize == 8
+    assert adapter.max_retries.connect == 2
+    assert adapter.max_retries.read == 0
+    assert 503 in adapter.max_retries.status_forcelist
+
+def test_post_not_retried_after_gateway_error():
+    """网关错误时投票可能已提交，POST 不重试；准入控制拒绝时可以重试"""
+    retry = create_session().get_adapter("http://localhost:5002").max_retries
+    assert retry.is_retry("GET", 502) and retry.is_retry("GET", 504)
+    assert not retry.is_retry("POST", 502) and not retry.is_retry("POST", 504)
+    assert retry.is_retry("POST", 503) and retry.is_retry("POST", 429)
+    assert type(retry.increment("POST", "/submit")) is type(retry)
+
+def test_voter_client_flow(session):
+    """测试登录、领取凭证、投票与验证"""
+    voter_id = auth_server.registry.list(limit=1)[0].voter_id
+    client = VoterClient(session=session, registry=auth_server.registry, verbose=False)
+
+    assert client.login(voter_id)
+    assert client.request_credential()
+    assert client.cast_vote(1)
+    assert client.last_receipt["vote_index"] == 0
+
+    # 选票在客户端加密，服务器只验证证明并存储
+    result = client.verify_vote(0)
+    assert result["verified"]
+    assert all(timeout == client.timeout for timeout in session.timeouts)
+
+def test_submit_rejects_invalid_proof(session):
+    """测试计票服务器拒绝证明无效的选票"""
+    voter_id = auth_server.registry.list(limit=1)[0].voter_id
+    client = VoterClient(session=session, registry=auth_server.registry, verbose=False)
+    assert client.login(voter_id)
+    assert client.request_credential()
+
+    # 附带权重 5 的签名，证明却针对权重 2
+    encrypted_vote = encrypt_ballot(client.get_public_key(), 1, 2, client.credential["weight_signature"])
+    response = session.post("http://localhost:5002/submit", json={
+        "encrypted_vote": encrypted_vote,
+        "credential": client.credential,
+        "voter_id": voter_id
+    })
+    assert response.status_code == 400
+
+    # 凭证未被消耗，仍可提交有效选票
+    assert client.cast_vote(1)
+
+def test_submit_rejects_unsigned_weight(session):
+    """测试权重取自绑定凭证的权重签名：自报或篡改的权重被拒绝"""
+    voter_id = auth_server.registry.list(limit=1)[0].voter_id
+    client = VoterClient(session=session, registry=auth_server.registry, verbose=False)
+    assert client.login(voter_id)
+    assert client.request_credential()
+    weight_signature = client.credential["weight_signature"]
+    _, weight, cid, signature = weight_signature.split("_")
+    assert weight == "5"
+
+    public_key = client.get_public_key()
+    forged = [
+        encrypt_ballot(public_key, 1, 1000),                                         # 未签名
+        encrypt_ballot(public_key, 1, 1000, f"weight_1000_{cid}_{signature}"),       # 篡改权重
+    ]
+    for encrypted_vote in forged:
+        response = session.post("http://localhost:5002/submit", json={
+            "encrypted_vote": encrypted_vote,
+            "credential": client.credential,
+            "voter_id": voter_id
+        })
+        assert response.status_code == 403
+        assert response.json()["error"] == "Invalid weight signature"
+
+    # 凭证自带的权重与签名不符
+    response = session.post("http://localhost:5002/submit", json={
+        "encrypted_vote": encrypt_ballot(public_key, 1, 5, weight_signature),
+        "credential": dict(client.credential, weight=1000),
+        "voter_id": voter_id
+    })
+    assert response.status_code == 403
+
+    assert client.cast_vote(1)
+    result = session.get("http://localhost:5002/tally/result").json()
+    assert (result["total_weight"], result["result"]) == (5, 5)
+
+def test_credential_kept_after_rejected_store(session, monkeypatch):
+    """测试选票被拒绝为重复密文（409）或存储失败时撤销防重登记，凭证仍可使用"""
+    voter_id = auth_server.registry.list(limit=1)[0].voter_id
+    client = VoterClient(session=session, registry=auth_server.registry, verbose=False)
+    assert client.login(voter_id)
+    assert client.request_credential()
+
+    # 相同的密文已经存储
+    encrypted_vote = encrypt_ballot(client.get_public_key(), 1, 5, client.credential["weight_signature"])
+    store_vote(**encrypted_vote)
+    request = {"encrypted_vote": encrypted_vote, "credential": client.credential, "voter_id": voter_id}
+    assert session.post("http://localhost:5002/submit", json=request).status_code == 409
+
+    def fail(**kwargs):
+        raise OSError("disk full")
+    with monkeypatch.context() as m:
+        m.setattr(tally_server, "store_vote", fail)
+        assert not client.cast_vote(1)
+
+    assert client.cast_vote(1)
+    assert client.last_receipt["vote_index"] == 1
+
+def test_async_voter_client(session):
+    """测试并发代理投票"""
+    voters = [voter.voter_id for voter in auth_server.registry.list(limit=3)]
+    ballots = {voter_id: i % 2 for i, voter_id in enumerate(voters)}
+    ballots["nobody"] = 1
+
+    # 每个工作线程使用自己的会话
+    created = []
+    def session_factory():
+        created.append(threading.get_ident())
+        return _LocalSession()
+
+    proxy = AsyncVoterClient(concurrency=2, session_factory=session_factory, registry=auth_server.registry)
+    results = asyncio.run(proxy.cast_votes(ballots))
+    assert created and len(created) == len(set(created))
+    assert threading.get_ident() not in created
+    proxy.close()
+    assert not proxy._sessions
+
+    assert not results["nobody"]["success"]
+    indices = sorted(results[voter_id]["vote_index"] for voter_id in voters)
+    assert indices == list(range(len(voters)))
+    assert all(results[voter_id]["receipt_code"] for voter_id in voters)
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,115 @@
+import errno
+import json
+import os
+import pytest
+from backend.audit.logger import AuditLogError, AuditLogger, list_segments, segment_name
+"python3 -m pytest tests/test_audit_logger.py -v"
+
+def _read_records(log_dir):
+    records = []
+    for _, path in list_segments(log_dir):
+        with open(path, "r", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+def test_records_written_to_single_segment(tmp_path):
+    """测试投票操作和计票结果追加到同一分段文件"""
+    logger = AuditLogger(log_dir=str(tmp_path))
+    for i in range(100):
+        logger.log_vote_operation("submit", {"voter_id": f"v{i}", "vote_index": i})
+    path = logger.log_tally_result({
+        "total_votes": 100, "total_weight": 120, "result": 60, "proof": {"c": "1"}
+    })
+    logger.close()
+
+    assert os.path.basename(path) == segment_name(1)
+    assert len(os.listdir(tmp_path)) == 1
+    records = _read_records(str(tmp_path))
+    assert len(records) == 101
+    assert records[0]["type"] == "vote_operation"
+    assert records[0]["voter_id"] == "v0"
+    assert records[99]["vote_index"] == 99
+    assert records[-1]["type"] == "tally_result"
+    assert records[-1]["result"] == 60
+    assert records[-1]["merkle_root"] is None
+
+def test_flush_makes_records_visible(tmp_path):
+    """测试 flush 返回时此前的记录已写入文件"""
+    logger = AuditLogger(log_dir=str(tmp_path), fsync_policy="never")
+    logger.log_vote_operation("verify", {"voter_id": "v1", "vote_index": 7})
+    assert logger.flush(timeout=5)
+    records = _read_records(str(tmp_path))
+    assert records == [{
+        "timestamp": records[0]["timestamp"], "type": "vote_operation", "operation": "verify",
+        "voter_id": "v1", "vote_index": 7, "status": "success"
+    }]
+    logger.close()
+
+def test_rotation_by_size(tmp_path):
+    """测试分段超过大小上限后轮转"""
+    logger = AuditLogger(log_dir=str(tmp_path), segment_max_bytes=200)
+    for i in range(20):
+        logger.log_vote_operation("submit", {"voter_id": f"v{i}", "vote_index": i})
+        logger.flush()
+    logger.close()
+
+    segments = list_segments(str(tmp_path))
+    assert len(segments) > 1
+    assert [seq for seq, _ in segments] == list(range(1, len(segments) + 1))
+    # 轮转不丢记录、不乱序
+    assert [r["vote_index"] for r in _read_records(str(tmp_path))] == list(range(20))
+
+def test_segments_not_shared_between_loggers(tmp_path):
+    """测试多个写入者（如多个工作进程）各自独占分段文件"""
+    first = AuditLogger(log_dir=str(tmp_path))
+    second = AuditLogger(log_dir=str(tmp_path))
+    first.log_vote_operation("submit", {"voter_id": "a"})
+    first.flush()
+    second.log_vote_operation("submit", {"voter_id": "b"})
+    second.flush()
+
+    assert first.segment_path != second.segment_path
+    first.close()
+    second.close()
+    assert sorted(r["voter_id"] for r in _read_records(str(tmp_path))) == ["a", "b"]
+
+def test_closed_logger_rejects_records(tmp_path):
+    """测试关闭后不再接受记录"""
+    logger = AuditLogger(log_dir=str(tmp_path))
+    logger.close()
+    with pytest.raises(RuntimeError):
+        logger.log_vote_operation("submit", {})
+
+def test_write_error_keeps_writer_alive(tmp_path, monkeypatch):
+    """测试写入失败（磁盘满）时写入线程继续运行，flush 和计票结果报告失败"""
+    logger = AuditLogger(log_dir=str(tmp_path), fsync_policy="never", queue_size=4)
+    disk_full = [True]
+    original = logger._rotate_if_needed
+
+    def rotate():
+        if disk_full[0]:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        original()
+
+    monkeypatch.setattr(logger, "_rotate_if_needed", rotate)
+    # 远超队列上限的记录也不会让调用方永久阻塞
+    for i in range(20):
+        logger.log_vote_operation("submit", {"voter_id": f"v{i}", "vote_index": i})
+    assert not logger.flush(timeout=5)
+    with pytest.raises(AuditLogError):
+        logger.log_tally_result({"total_votes": 1, "total_weight": 1, "result": 1, "proof": {}})
+    assert logger._thread.is_alive()
+
+    disk_full[0] = False
+    logger.log_vote_operation("submit", {"voter_id": "after", "vote_index": 20})
+    assert logger.flush(timeout=5)
+    logger.close()
+    assert [r["voter_id"] for r in _read_records(str(tmp_path))] == ["after"]
+
+def test_unknown_fsync_policy(tmp_path):
+    """测试未知刷盘策略"""
+    with pytest.raises(ValueError):
+        AuditLogger(log_dir=str(tmp_path), fsync_policy="sometimes")
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,103 @@
+import json
+import os
+import pytest
+from backend.audit.logger import segment_name
+from backend.audit.query import AuditQuery, SegmentIndex, index_path, main
+"python3 -m pytest tests/test_audit_query.py -v"
+
+def _write_segment(log_dir, seq, records):
+    path = os.path.join(log_dir, segment_name(seq))
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return path
+
+def _submit(i, minute):
+    return {
+        "timestamp": f"2026-10-19T10:{minute:02d}:00.000001", "type": "vote_operation",
+        "operation": "submit", "voter_id": f"v{i % 10}", "vote_index": i, "status": "success"
+    }
+
+@pytest.fixture
+def log_dir(tmp_path):
+    _write_segment(str(tmp_path), 1, [_submit(i, i // 10) for i in range(300)])
+    _write_segment(str(tmp_path), 2, [
+        {"timestamp": "2026-10-19T11:00:00.000001", "type": "tally_result", "result": 5},
+        {"timestamp": "2026-10-19T11:05:00.000001", "type": "vote_operation",
+         "operation": "verify", "voter_id": "v3", "vote_index": 3, "status": "success"},
+    ])
+    return str(tmp_path)
+
+def test_find_by_fields(log_dir):
+    """测试按投票人、操作和投票索引查询"""
+    query = AuditQuery(log_dir)
+    records = query.find(voter_id="v3", operation="submit")
+    assert [r["vote_index"] for r in records] == list(range(3, 300, 10))
+
+    assert [r["operation"] for r in query.find(voter_id="v3")][-1] == "verify"
+    assert query.find(vote_index=42)[0]["voter_id"] == "v2"
+    assert query.find(record_type="tally_result")[0]["result"] == 5
+    assert query.find(voter_id="nobody") == []
+
+def test_find_by_time_range(log_dir):
+    """测试按时间范围查询（跨分段）"""
+    query = AuditQuery(log_dir)
+    records = query.find(since="2026-10-19T10:28:00", until="2026-10-19T11:00:00.5")
+    assert [r.get("vote_index") for r in records] == list(range(280, 300)) + [None]
+
+    records = query.find(voter_id="v3", since="2026-10-19T10:05")
+    assert records[0]["vote_index"] == 53
+    assert query.find(limit=5)[-1]["vote_index"] == 4
+
+def test_index_updated_incrementally(log_dir):
+    """测试分段追加后只为新增部分建索引"""
+    path = os.path.join(log_dir, segment_name(2))
+    assert len(AuditQuery(log_dir).find(operation="verify")) == 1
+    assert os.path.exists(index_path(path))
+
+    # 把已建索引的第一行改成等长的无效内容：若重新全量建索引，记录数会变少
+    with open(path, "r+b") as f:
+        first = f.readline()
+        f.seek(0)
+        f.write(b" " * (len(first) - 1))
+    _write_segment(log_dir, 2, [{
+        "timestamp": "2026-10-19T11:06:00.000001", "type": "vote_operation",
+        "operation": "verify", "voter_id": "v4", "vote_index": 4, "status": "success"
+    }])
+    query = AuditQuery(log_dir)
+    assert [r["voter_id"] for r in query.find(operation="verify")] == ["v3", "v4"]
+    index = SegmentIndex(path)
+    assert index.records == 3
+    index.close()
+
+def test_index_rebuilt_after_truncation(log_dir):
+    """测试分段被替换为更短的内容时重新建立索引"""
+    query = AuditQuery(log_dir)
+    assert len(query.find(voter_id="v3")) == 31
+    path = os.path.join(log_dir, segment_name(1))
+    os.remove(path)
+    _write_segment(log_dir, 1, [_submit(3, 0)])
+    assert [r["vote_index"] for r in AuditQuery(log_dir).find(voter_id="v3", operation="submit")] == [3]
+    assert [r["vote_index"] for r in query.find(voter_id="v3", operation="submit")] == [3]
+
+def test_incomplete_line_skipped(log_dir):
+    """测试写入中的半行记录暂不建索引"""
+    path = os.path.join(log_dir, segment_name(2))
+    with open(path, "a") as f:
+        f.write('{"timestamp": "2026-10-19T11:07:00", "type": "tally')
+    query = AuditQuery(log_dir)
+    assert len(query.find(record_type="tally_result")) == 1
+
+    with open(path, "a") as f:
+        f.write('_result", "result": 6}\n')
+    assert [r["result"] for r in query.find(record_type="tally_result")] == [5, 6]
+
+def test_cli(log_dir, capsys):
+    """测试命令行查询"""
+    assert main(["--log-dir", log_dir, "--voter-id", "v3", "--operation", "verify"]) == 0
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["vote_index"] == 3
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -1,5 +1,7 @@
 import pytest
+import random
 from backend.auth.auth import CredentialVerifier
+from backend.auth.blind_signature import BlindSigner, BlindClient, BlindingPool
 
 @pytest.fixture
 def verifier():
@@ -75,5 +77,68 @@ def test_invalid_credential_format(verifier):
     }
     assert not verifier.verify_credential(invalid_cred)
 
+def test_unhashed_serial_forgery_rejected(verifier):
+    """不对序列号签名时任取 s 即可伪造 (s^e mod n, s)，全域哈希后必须拒绝"""
+    for _ in range(5):
+        s = random.randrange(2, verifier.n)
+        forged = {"serial_number": pow(s, verifier.e, verifier.n), "signature": s}
+        assert not verifier.verify_credential(forged)
+
+def _issued_credential(verifier, voter_id, serial):
+    return {
+        "voter_id": voter_id,
+        "blinded_serial": str(serial),
+        "signed_blinded": str(verifier.sign_serial(serial)),
+        "weight": 1
+    }
+
+def test_issued_credential_replay_rejected(verifier):
+    """签名不覆盖股东ID：同一签发凭证换股东ID重放时防重标识相同，必须拒绝"""
+    credential = _issued_credential(verifier, "shareholder_001", random.getrandbits(256))
+    assert verifier.verify_credential(credential)
+    for voter_id in ("shareholder_002", "someone_else"):
+        assert not verifier.verify_credential(dict(credential, voter_id=voter_id))
+    assert verifier.check_credential_signatures([dict(credential, voter_id="x")]) == [credential["blinded_serial"]]
+
+    # 签发凭证同样针对全域哈希，(s^e mod n, s) 无效
+    s = random.randrange(2, verifier.n)
+    forged = dict(credential, blinded_serial=str(pow(s, verifier.e, verifier.n)), signed_blinded=str(s))
+    assert not verifier.verify_credential(forged)
+
+def test_crt_signature_matches_plain_rsa():
+    """CRT签名结果应与直接模幂一致"""
+    signer = BlindSigner()
+    assert signer.p * signer.q == signer.n
+    for _ in range(5):
+        m = random.randrange(2, signer.n)
+        assert signer.sign(m) == pow(m, signer.d, signer.n)
+
+def test_crt_fault_check():
+    """CRT分量出错时不能返回错误签名"""
+    signer = BlindSigner()
+    signer.dp += 1  # 模拟计算故障
+    m = random.randrange(2, signer.n)
+    assert signer.sign(m) == pow(m, signer.d, signer.n)
+
+def test_blinding_pool(verifier):
+    """使用预计算盲化因子池完成盲签名"""
+    pool = BlindingPool(verifier.n, verifier.e, size=4)
+    pool.fill()
+    assert len(pool) == 4
+
+    client = BlindClient(verifier.n, verifier.e, pool=pool)
+    message = random.getrandbits(256)
+    blinded, r = client.blind(message)
+    assert len(pool) == 3
+    assert r.bit_length() > 128  # 满长度盲化因子
+
+    signature = client.unblind(verifier.sign_blinded_message(blinded), r)
+    assert pow(signature, verifier.e, verifier.n) == message
+
+    # 池耗尽后退回即时生成
+    for _ in range(5):
+        blinded, r = client.blind(message)
+        assert client.unblind(verifier.sign_blinded_message(blinded), r) == signature
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
\ No newline at end of file
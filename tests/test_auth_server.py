@@ -0,0 +1,146 @@
+import pytest
+import json
+from backend import auth_server
+from backend.auth.registry import ShareholderRegistry
+from backend.auth.signing_pool import SigningPool
+"python3 -m pytest tests/test_auth_server.py -v"
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """每个测试使用独立的名册（凭证签发次数记录在名册中）"""
+    registry = ShareholderRegistry(str(tmp_path / "shareholders.db"))
+    registry.bulk_import([
+        {"voter_id": f"shareholder_00{i}", "name": f"股东{i}", "weight": i + 1} for i in range(1, 4)
+    ])
+    monkeypatch.setattr(auth_server, "registry", registry)
+    return registry
+
+@pytest.fixture
+def client(registry):
+    auth_server.app.config["TESTING"] = True
+    return auth_server.app.test_client()
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    """使用小分块的进程池，确保测试覆盖并行路径"""
+    pool = SigningPool(workers=2, chunk_size=2)
+    monkeypatch.setattr(auth_server, "signing_pool", pool)
+    yield pool
+    pool.shutdown()
+
+def _read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_batch_credentials(client, small_pool):
+    """测试批量签发凭证"""
+    signer = auth_server.verifier.signer
+    voter_ids = [voter.voter_id for voter in auth_server.registry.list(limit=3)]
+    requests = [
+        {"voter_id": voter_id, "blinded_serial": str(1000 + i)}
+        for i, voter_id in enumerate(voter_ids)
+    ]
+    requests.append({"voter_id": "nobody", "blinded_serial": "7"})
+    requests.append({"voter_id": voter_ids[0], "blinded_serial": "8"})
+    requests.append({"blinded_serial": "9"})
+
+    response = client.post("/auth/request_credentials_batch", json={"requests": requests})
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+
+    results = {r["position"]: r for r in _read_ndjson(response)}
+    assert len(results) == len(requests)
+
+    for i, voter_id in enumerate(voter_ids):
+        result = results[i]
+        assert result["voter_id"] == voter_id
+        assert pow(int(result["signed_blinded"]), signer.e, signer.n) == 1000 + i
+        assert result["weight"] == auth_server.registry.get(voter_id).weight
+
+    n = len(voter_ids)
+    assert results[n]["error"] == "Invalid voter ID"
+    assert results[n + 1]["error"] == "Duplicate voter ID in batch"
+    assert results[n + 2]["error"] == "Missing required fields"
+
+def test_batch_credentials_invalid_request(client):
+    """测试无效的批量请求"""
+    response = client.post("/auth/request_credentials_batch", json={"voter_id": "x"})
+    assert response.status_code == 400
+
+def test_import_requires_admin(client, registry, monkeypatch):
+    """名册导入需要管理员令牌，默认不覆盖已登记的股东"""
+    body = json.dumps({"voter_id": "shareholder_001", "weight": 100000})
+    headers = {"Content-Type": "application/x-ndjson"}
+
+    monkeypatch.setattr(auth_server, "REGISTRY_ADMIN_TOKEN", "")
+    assert client.post("/auth/shareholders/import", data=body, headers=headers).status_code == 403
+
+    monkeypatch.setattr(auth_server, "REGISTRY_ADMIN_TOKEN", "secret")
+    assert client.post("/auth/shareholders/import", data=body, headers=headers).status_code == 401
+    headers["Authorization"] = "Bearer wrong"
+    assert client.post("/auth/shareholders/import", data=body, headers=headers).status_code == 401
+
+    headers["Authorization"] = "Bearer secret"
+    response = client.post("/auth/shareholders/import", data=body, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["rejected"] == 1
+    assert registry.get("shareholder_001").weight == 2
+
+    response = client.post("/auth/shareholders/import?mode=upsert", data=body, headers=headers)
+    assert response.get_json()["imported"] == 1
+    voter = registry.get("shareholder_001")
+    assert voter.weight == 100000 and voter.name == "股东1"
+    assert client.post("/auth/shareholders/import?mode=replace", data=body,
+                       headers=headers).status_code == 400
+
+def test_shareholders_page_limit(client):
+    """页大小限制在 1 到 MAX_PAGE_SIZE 之间，非整数返回 400"""
+    for limit in ("0", "-1"):
+        response = client.get(f"/auth/shareholders?limit={limit}")
+        assert response.status_code == 200
+        assert len(response.get_json()["shareholders"]) == 1
+    assert client.get("/auth/shareholders?limit=abc").status_code == 400
+
+def test_credential_weight_and_limit(client, registry):
+    """凭证中的权重取自名册而不是请求；每名股东只能领取 CREDENTIALS_PER_VOTER 张"""
+    request = {"voter_id": "shareholder_002", "blinded_serial": "12345",
+               "voter_info": {"weight": 1000000}}
+    response = client.post("/auth/request_credential", json=request)
+    assert response.status_code == 200
+    credential = response.get_json()
+    assert credential["weight"] == 3
+
+    # 权重签名绑定该凭证和名册中的权重
+    weight_signature = credential["weight_signature"]
+    assert weight_signature.startswith("weight_3_")
+    credential_id = auth_server.verifier.credential_id(credential)
+    assert auth_server.weight_signer.verify_weight_signature(weight_signature, credential_id)
+
+    response = client.post("/auth/request_credential", json=dict(request, blinded_serial="54321"))
+    assert response.status_code == 403
+    assert response.get_json()["error"] == "Credential limit reached"
+    assert registry.credentials_issued("shareholder_002") == 1
+
+    requests = [{"voter_id": "shareholder_002", "blinded_serial": "7"},
+                {"voter_id": "shareholder_003", "blinded_serial": "8"}]
+    results = {r["position"]: r for r in _read_ndjson(
+        client.post("/auth/request_credentials_batch", json={"requests": requests})
+    )}
+    assert results[0]["error"] == "Credential limit reached"
+    assert results[1]["weight"] == 4
+    assert client.post("/auth/request_credential", json={
+        "voter_id": ["shareholder_001"], "blinded_serial": "9"
+    }).status_code == 403
+
+def test_batch_credentials_unhashable_voter_id(client):
+    """测试 voter_id 不是字符串时逐项拒绝，而不是整个请求出错"""
+    requests = [
+        {"voter_id": ["shareholder_001"], "blinded_serial": "7"},
+        {"voter_id": {"id": 1}, "blinded_serial": "8"},
+    ]
+    response = client.post("/auth/request_credentials_batch", json={"requests": requests})
+    assert response.status_code == 200
+    results = _read_ndjson(response)
+    assert [r["error"] for r in results] == ["Invalid voter ID format"] * 2
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,101 @@
+import pytest
+import random
+from backend.auth import batch_verify
+from backend.auth.batch_verify import BatchRSAVerifier
+from backend.auth.blind_signature import BlindSigner
+from backend.auth.nullifier_store import credential_id
+from backend.tally.controller import CredentialVerifier as WeightVerifier
+"python3 -m pytest tests/test_batch_verify.py -v"
+
+@pytest.fixture(scope="module")
+def signer():
+    return BlindSigner()
+
+@pytest.fixture
+def screening(monkeypatch):
+    """小批量也走乘积筛选，覆盖筛选和二分定位"""
+    monkeypatch.setattr(batch_verify, "MIN_SCREEN_SIZE", 2)
+
+def _signed_pairs(signer, count):
+    rng = random.Random(count)
+    messages = [rng.randrange(2, signer.n) for _ in range(count)]
+    return [(m, signer.sign(m)) for m in messages]
+
+def test_batch_all_valid(signer, screening, monkeypatch):
+    """测试全部有效的批量验证只做一次筛选"""
+    verifier = BatchRSAVerifier(signer.n, signer.e)
+    pairs = _signed_pairs(signer, 20)
+    calls = []
+    multi_pow = verifier._multi_pow
+    monkeypatch.setattr(verifier, "_multi_pow", lambda *args: calls.append(1) or multi_pow(*args))
+    assert verifier.verify_batch(pairs) == [True] * 20
+    assert len(calls) == 2
+
+def test_multi_pow(signer):
+    """分窗口桶方法与逐个模幂的乘积一致"""
+    verifier = BatchRSAVerifier(signer.n, signer.e)
+    rng = random.Random(5)
+    bases = [rng.randrange(2, signer.n) for _ in range(30)]
+    exponents = [rng.getrandbits(batch_verify.SCREEN_EXPONENT_BITS) for _ in bases]
+    expected = 1
+    for base, exponent in zip(bases, exponents):
+        expected = expected * pow(base, exponent, signer.n) % signer.n
+    assert verifier._multi_pow(bases, exponents) == expected
+
+@pytest.mark.parametrize("min_screen_size", [2, 64])
+def test_batch_locates_invalid(signer, monkeypatch, min_screen_size):
+    """批量筛选失败时二分定位无效签名（少量时逐个验证）"""
+    monkeypatch.setattr(batch_verify, "MIN_SCREEN_SIZE", min_screen_size)
+    verifier = BatchRSAVerifier(signer.n, signer.e)
+    pairs = _signed_pairs(signer, 17)
+    bad = {3, 11}
+    for i in bad:
+        m, s = pairs[i]
+        pairs[i] = (m, s + 1)
+    results = verifier.verify_batch(pairs)
+    assert results == [i not in bad for i in range(17)]
+
+def test_cancelling_errors_rejected(signer, screening):
+    """误差互相抵消的两个无效签名（不带随机指数的乘积仍然成立）不能通过"""
+    verifier = BatchRSAVerifier(signer.n, signer.e)
+    (m1, s1), (m2, s2) = _signed_pairs(signer, 2)
+    s1_bad = (s1 * 2) % signer.n
+    s2_bad = (s2 * pow(2, -1, signer.n)) % signer.n
+    assert pow(s1_bad * s2_bad, signer.e, signer.n) == (m1 * m2) % signer.n
+    assert verifier.verify_batch([(m1, s1_bad), (m2, s2_bad)]) == [False, False]
+
+def test_degenerate_values_rejected(signer):
+    """0、1 等退化值不能通过验证"""
+    verifier = BatchRSAVerifier(signer.n, signer.e)
+    assert verifier.verify_batch([(1, 1), (0, 0), (signer.n + 1, 1)]) == [False] * 3
+
+def test_lru_cache(signer):
+    """已验证的签名进入LRU缓存"""
+    verifier = BatchRSAVerifier(signer.n, signer.e, cache_size=2)
+    pairs = _signed_pairs(signer, 3)
+    verifier.verify_batch(pairs)
+    assert len(verifier._cache) == 2
+    assert verifier.verify(*pairs[2])
+    assert not verifier.verify(pairs[2][0], pairs[2][1] + 1)
+
+def test_weight_signatures_batch():
+    """测试批量验证权重签名：签名绑定凭证标识和权重"""
+    verifier = WeightVerifier()
+    ids = [credential_id(f"serial_{i}") for i in range(4)]
+    signatures = [verifier.sign_weight(cid, i + 1) for i, cid in enumerate(ids)]
+    _, weight, cid, signature = signatures[0].split("_")
+    items = signatures + [
+        f"weight_9_{cid}_{signature}",          # 篡改权重
+        f"weight_{weight}_{ids[1]}_{signature}",  # 换绑其他凭证
+        "weight_3",                             # 未签名的旧格式
+    ]
+    assert verifier.verify_weight_signatures(items) == [True] * 4 + [False] * 3
+    assert verifier.verify_weight_signatures(signatures, ids[::-1]) == [False] * 4
+    assert verifier.verify_weight_signature(signatures[1], ids[1])
+    assert not verifier.verify_weight_signature(signatures[1], ids[2])
+
+    # 使用单独的密钥，凭证密钥的签名无法冒充权重签名
+    assert verifier.n != BlindSigner().n
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
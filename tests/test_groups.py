@@ -0,0 +1,96 @@
+import json
+import pytest
+from Crypto.Util.number import isPrime
+from backend import keys
+from backend.crypto.elgamal import ExponentialElGamal
+from backend.crypto.groups import GROUPS, get_group
+from backend.vote.weighted_encrypt import encrypt_ballot, verify_ballot
+"python3 -m pytest tests/test_groups.py -v"
+
+def _arctan_inv(x, one):
+    total = term = one // x
+    n, sign = 1, -1
+    while term:
+        term //= x * x
+        total += sign * (term // (2 * n + 1))
+        sign, n = -sign, n + 1
+    return total
+
+def _pi_fixed(bits):
+    """floor(2^bits * pi)（Machin 公式）"""
+    one = 1 << (bits + 64)
+    return 4 * (4 * _arctan_inv(5, one) - _arctan_inv(239, one)) >> 64
+
+def _e_fixed(bits):
+    """floor(2^bits * e)"""
+    one = 1 << (bits + 64)
+    total, term, n = 0, one, 0
+    while term:
+        total += term
+        n += 1
+        term //= n
+    return total >> 64
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    keys.reset()
+    yield
+    keys.reset()
+
+@pytest.mark.parametrize("name, constant, c", [
+    ("modp2048", _pi_fixed, 124476), ("modp3072", _pi_fixed, 1690314),
+    ("ffdhe2048", _e_fixed, 560316), ("ffdhe3072", _e_fixed, 2625351),
+])
+def test_group_matches_rfc_formula(name, constant, c):
+    """测试内置群与 RFC 给出的生成公式一致，且 p、q 均为素数"""
+    group = get_group(name)
+    n = group.bits
+    assert group.p == 2 ** n - 2 ** (n - 64) - 1 + 2 ** 64 * (constant(n - 130) + c)
+    assert group.p.bit_length() == n
+    assert isPrime(group.p) and isPrime(group.q)
+    # g 生成 q 阶子群
+    assert pow(group.g, group.q, group.p) == 1
+
+def test_unknown_group():
+    with pytest.raises(ValueError):
+        get_group("modp1024")
+    with pytest.raises(ValueError):
+        keys.generate_elgamal_keys("nope", path="unused.json")
+
+def test_standard_group_keypair(tmp_path, monkeypatch):
+    """测试使用标准群只生成密钥对，加解密与选票证明正常"""
+    path = tmp_path / "elgamal_params_ffdhe2048.json"
+    monkeypatch.setattr(keys, "ELGAMAL_KEY_FILE", str(path))
+    keys.generate_elgamal_keys("ffdhe2048", path=str(path))
+    data = json.loads(path.read_text())
+    assert data["group"] == "ffdhe2048"
+    assert int(data["p"]) == GROUPS["ffdhe2048"].p
+
+    elgamal = ExponentialElGamal(decrypt_enabled=True)
+    assert elgamal.p == GROUPS["ffdhe2048"].p
+    _, ciphertext = elgamal.encrypt(7)
+    assert elgamal.decrypt_to_value(ciphertext, 10) == 7
+
+    ballot = encrypt_ballot(elgamal.public_key, 1, 3)
+    assert verify_ballot(elgamal.public_key, ballot["ciphertext"], ballot["zkp"], 3)
+
+def test_group_mismatch_rejected(tmp_path, monkeypatch):
+    """测试标记为标准群但参数被改动的密钥文件无法加载"""
+    path = tmp_path / "elgamal.json"
+    monkeypatch.setattr(keys, "ELGAMAL_KEY_FILE", str(path))
+    keys.generate_elgamal_keys("modp2048", path=str(path))
+    data = json.loads(path.read_text())
+    data["p"] = str(GROUPS["ffdhe2048"].p)
+    path.write_text(json.dumps(data))
+    with pytest.raises(ValueError):
+        keys.elgamal_keys()
+
+def test_keygen_command_group(tmp_path, monkeypatch):
+    """测试命令行按 --group 生成到对应的密钥文件"""
+    monkeypatch.setattr(keys, "KEY_DIR", str(tmp_path))
+    assert keys.main(["--only", "elgamal", "--group", "ffdhe3072"]) == 0
+    data = json.loads((tmp_path / "elgamal_params_ffdhe3072.json").read_text())
+    assert data["group"] == "ffdhe3072"
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
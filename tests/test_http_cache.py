@@ -0,0 +1,80 @@
+import pytest
+from backend import tally_server
+from backend.crypto.elgamal import ExponentialElGamal
+from backend.http_cache import ResponseCache
+from backend.storage.vote_db import clear_votes, store_vote
+from backend.tally.controller import CredentialVerifier as WeightSigner
+from backend.auth.nullifier_store import credential_id
+from backend.vote.weighted_encrypt import encrypt_ballot
+"python3 -m pytest tests/test_http_cache.py -v"
+
+@pytest.fixture
+def client():
+    clear_votes()
+    tally_server.response_cache.clear()
+    yield tally_server.app.test_client()
+    clear_votes()
+
+def _store_ballots(count):
+    public_key = ExponentialElGamal().public_key
+    signer = WeightSigner()
+    return [store_vote(**encrypt_ballot(public_key, 1, 3, signer.sign_weight(credential_id(f"cache_{i}"), 3)))
+            for i in range(count)]
+
+def test_tally_result_conditional_get(client, monkeypatch):
+    """测试计票结果的 ETag、304 和响应缓存"""
+    _store_ballots(2)
+    calls = []
+    original = tally_server.tally_controller.tally_votes
+    monkeypatch.setattr(tally_server.tally_controller, "tally_votes", lambda: calls.append(1) or original())
+
+    first = client.get("/tally/result")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    # 不带 If-None-Match 时命中缓存，带上时返回空的 304
+    assert client.get("/tally/result").get_json() == first.get_json()
+    not_modified = client.get("/tally/result", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+    assert not_modified.headers["ETag"] == etag
+    assert len(calls) == 1
+
+    # 新投票写入后 ETag 改变，旧 ETag 不再匹配
+    _store_ballots(1)
+    updated = client.get("/tally/result", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] != etag
+    assert updated.get_json()["total_votes"] == 3
+    assert len(calls) == 2
+
+def test_verify_etag_per_index(client):
+    """测试投票验证按投票索引区分 ETag，错误响应不缓存"""
+    results = _store_ballots(2)
+    first = client.get("/verify/0")
+    second = client.get("/verify/1")
+    assert first.get_json()["verified"] is True
+    assert first.headers["ETag"] != second.headers["ETag"]
+    assert client.get("/verify/1", headers={"If-None-Match": second.headers["ETag"]}).status_code == 304
+
+    receipt = client.get(f"/verify/receipt/{results[0]['receipt_code']}")
+    assert receipt.status_code == 200 and "ETag" in receipt.headers
+    missing = client.get("/verify/receipt/AAAA-AAAA-AAAA-AAAA")
+    assert missing.status_code == 404
+    assert "ETag" not in missing.headers
+
+def test_response_cache_eviction():
+    """测试超过上限时淘汰最久未使用的条目"""
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", (200, b"a", "application/json"))
+    cache.put("b", (200, b"b", "application/json"))
+    assert cache.get("a") is not None
+    cache.put("c", (200, b"c", "application/json"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert len(cache) == 2
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
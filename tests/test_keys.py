@@ -0,0 +1,67 @@
+import pytest
+import json
+from backend import keys
+from backend.crypto.elgamal import ExponentialElGamal
+"python3 -m pytest tests/test_keys.py -v"
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    keys.reset()
+    yield
+    keys.reset()
+
+def test_keys_loaded_once(monkeypatch):
+    """测试密钥文件只读取一次，各实例共用同一份参数"""
+    reads = []
+    original = keys._read_json
+    monkeypatch.setattr(keys, "_read_json", lambda path: reads.append(path) or original(path))
+
+    first = ExponentialElGamal()
+    second = ExponentialElGamal(decrypt_enabled=True)
+    assert (first.p, first.y) == (second.p, second.y)
+    assert keys.rsa_public_key() == keys.rsa_public_key()
+    assert reads == [keys.ELGAMAL_KEY_FILE, keys.RSA_KEY_FILE]
+
+def test_missing_keys_not_generated(tmp_path, monkeypatch):
+    """测试缺少密钥文件时报错，而不是在导入路径上生成新密钥"""
+    missing = tmp_path / "elgamal.json"
+    monkeypatch.setattr(keys, "ELGAMAL_KEY_FILE", str(missing))
+    with pytest.raises(keys.KeysMissingError) as exc:
+        keys.elgamal_keys()
+    assert "python -m backend.keys" in str(exc.value)
+    assert not missing.exists()
+
+def test_discrete_log_table():
+    """测试离散对数查找表按需增长"""
+    elgamal = ExponentialElGamal(decrypt_enabled=True)
+    _, ciphertext = elgamal.encrypt(37)
+    assert elgamal.decrypt_to_value(ciphertext, 50) == 37
+    with pytest.raises(ValueError):
+        elgamal.decrypt_to_value(ciphertext, 20)
+
+    table = keys.discrete_log_table(500)
+    assert len(table) == 501
+    assert table[pow(elgamal.g, 499, elgamal.p)] == 499
+    assert elgamal.solve_discrete_log(pow(elgamal.g, 400, elgamal.p), 500) == 400
+
+def test_keygen_command(tmp_path, monkeypatch, capsys):
+    """测试离线生成密钥：已有密钥时跳过，--force 时覆盖"""
+    rsa_path = tmp_path / "rsa.json"
+    monkeypatch.setattr(keys, "RSA_KEY_FILE", str(rsa_path))
+    monkeypatch.setattr(keys, "RSA_BITS", 1024)
+
+    assert keys.main(["--only", "rsa"]) == 0
+    n, e = keys.rsa_public_key()
+    assert json.loads(rsa_path.read_text())["n"] == str(n)
+    private = keys.rsa_private_key()
+    assert private["p"] * private["q"] == n
+
+    assert keys.main(["--only", "rsa"]) == 0
+    assert "已存在" in capsys.readouterr().out
+    assert keys.rsa_public_key() == (n, e)
+
+    keys.main(["--only", "rsa", "--force"])
+    assert keys.rsa_public_key()[0] != n
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
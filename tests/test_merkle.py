@@ -0,0 +1,122 @@
+import pytest
+import math
+import random
+from backend.storage.merkle_tree import MerkleTree, MerkleFrontier, AppendOnlyMerkleTree
+"python3 -m pytest tests/test_merkle.py -v"
+
+def _leaves(n):
+    return [f"vote_{i}" for i in range(n)]
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 8, 13])
+def test_single_proof_all_leaves(n):
+    """测试单个叶子的Merkle证明"""
+    leaves = _leaves(n)
+    tree = MerkleTree(leaves)
+    for i, leaf in enumerate(leaves):
+        assert MerkleTree.verify_proof(leaf, tree.get_proof(i), tree.get_root())
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 16, 33, 100])
+def test_multi_proof_verification(n):
+    """测试批量Merkle证明"""
+    leaves = _leaves(n)
+    tree = MerkleTree(leaves)
+    rng = random.Random(n)
+
+    for k in {1, min(2, n), max(1, n // 3), n}:
+        indices = rng.sample(range(n), k)
+        proof = tree.get_multi_proof(indices)
+        selected = {i: leaves[i] for i in indices}
+        assert MerkleTree.verify_multi_proof(selected, proof, tree.get_root())
+
+def test_multi_proof_is_compact():
+    """批量证明的哈希数应远小于 k·log n"""
+    n, k = 1024, 256
+    tree = MerkleTree(_leaves(n))
+    proof = tree.get_multi_proof(range(k))
+    assert len(proof["hashes"]) < k * math.log2(n) / 4
+
+def test_multi_proof_tampered():
+    """测试篡改的批量证明"""
+    leaves = _leaves(10)
+    tree = MerkleTree(leaves)
+    indices = [1, 4, 9]
+    proof = tree.get_multi_proof(indices)
+    selected = {i: leaves[i] for i in indices}
+
+    # 篡改叶子
+    tampered = dict(selected)
+    tampered[4] = "forged"
+    assert not MerkleTree.verify_multi_proof(tampered, proof, tree.get_root())
+
+    # 篡改证明中的哈希
+    bad_proof = dict(proof, hashes=list(reversed(proof["hashes"])))
+    assert not MerkleTree.verify_multi_proof(selected, bad_proof, tree.get_root())
+
+    # 叶子集合与证明不一致
+    assert not MerkleTree.verify_multi_proof({1: leaves[1]}, proof, tree.get_root())
+
+def test_multi_proof_invalid_index():
+    """测试越界索引"""
+    tree = MerkleTree(_leaves(4))
+    with pytest.raises(IndexError):
+        tree.get_multi_proof([4])
+    with pytest.raises(ValueError):
+        tree.get_multi_proof([])
+
+def test_frontier_matches_full_tree():
+    """增量frontier的根和证明应与完整Merkle树一致"""
+    frontier = MerkleFrontier()
+    leaves = _leaves(40)
+    for n, leaf in enumerate(leaves, start=1):
+        proof = frontier.append(leaf)
+        tree = MerkleTree(leaves[:n])
+        assert frontier.get_root() == tree.get_root()
+        assert [tuple(p) for p in proof] == tree.get_proof(n - 1)
+        assert MerkleTree.verify_proof(leaf, proof, tree.get_root())
+
+@pytest.mark.parametrize("existing", [0, 1, 5, 8, 11])
+def test_frontier_batch_proofs(existing):
+    """批量追加的证明都对应追加完成后的根"""
+    leaves = _leaves(existing + 23)
+    for count in (1, 2, 7, 23):
+        frontier = MerkleFrontier()
+        for leaf in leaves[:existing]:
+            frontier.append(leaf)
+        root, proofs = frontier.batch_proofs(leaves[existing:existing + count])
+        tree = MerkleTree(leaves[:existing + count])
+        assert root == tree.get_root()
+        assert proofs == [tree.get_proof(i) for i in range(existing, existing + count)]
+        assert frontier.leaf_count == existing
+
+def test_frontier_serialization():
+    """测试frontier的序列化与恢复"""
+    frontier = MerkleFrontier()
+    for leaf in _leaves(11):
+        frontier.append(leaf)
+    restored = MerkleFrontier.from_dict(frontier.to_dict())
+    assert restored.get_root() == frontier.get_root()
+    restored.append("next")
+    frontier.append("next")
+    assert restored.get_root() == frontier.get_root()
+
+def test_append_only_prefix_matches_full_tree():
+    """只追加树的各个前缀应与对应的完整Merkle树一致，且不受之后追加的影响"""
+    tree = AppendOnlyMerkleTree()
+    leaves = _leaves(40)
+    prefixes = []
+    for leaf in leaves:
+        tree.append(leaf)
+        prefixes.append(tree.prefix(tree.leaf_count))
+    rng = random.Random(7)
+    for n, prefix in enumerate(prefixes, start=1):
+        full = MerkleTree(leaves[:n])
+        assert prefix.get_root() == full.get_root()
+        assert [prefix.get_proof(i) for i in range(n)] == [full.get_proof(i) for i in range(n)]
+        indices = rng.sample(range(n), max(1, n // 3))
+        assert prefix.get_multi_proof(indices) == full.get_multi_proof(indices)
+    assert tree.prefix(0).get_root() == ""
+    with pytest.raises(IndexError):
+        tree.prefix(41)
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,67 @@
+import pytest
+from backend import metrics
+from backend.metrics import Counter, Histogram
+"python3 -m pytest tests/test_metrics.py -v"
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+
+def test_histogram_exposition():
+    """测试直方图的 Prometheus 文本格式"""
+    hist = Histogram("test_seconds", "测试", ("stage",), buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="a")
+    hist.observe(0.5, stage="a")
+    hist.observe(5, stage="a")
+
+    lines = hist.collect()
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="a"} 3' in lines
+    assert 'test_seconds_sum{stage="a"} 5.55' in lines
+
+def test_counter_and_timer():
+    """测试计数器和计时器"""
+    counter = Counter("test_total", "测试", ("reason",))
+    counter.inc(reason="x")
+    counter.inc(2, reason="x")
+    assert counter.value(reason="x") == 3
+    assert 'test_total{reason="x"} 3' in counter.collect()
+
+    hist = Histogram("test_timer_seconds", "测试")
+    with hist.time():
+        pass
+    assert hist.count() == 1
+
+def test_disabled(monkeypatch):
+    """测试关闭采集时不记录任何数据"""
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    counter = Counter("test_disabled_total", "测试")
+    hist = Histogram("test_disabled_seconds", "测试")
+    counter.inc()
+    with hist.time():
+        pass
+    assert counter.value() == 0
+    assert hist.count() == 0
+
+def test_metrics_endpoint(tmp_path, monkeypatch):
+    """测试 /metrics 接口暴露投票存储和拒绝原因"""
+    from backend import tally_server
+    from backend.storage.vote_db import clear_votes
+    clear_votes()
+    metrics.reset()
+    client = tally_server.app.test_client()
+
+    client.post("/submit", json={"voter_id": "x"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'voting_submit_rejects_total{reason="missing_fields"} 1' in body
+    assert 'voting_http_request_seconds_count{method="POST",endpoint="/submit",status="400"} 1' in body
+    assert "# TYPE voting_stage_seconds histogram" in body
+    clear_votes()
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
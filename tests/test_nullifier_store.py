@@ -0,0 +1,59 @@
+import pytest
+from backend.auth.nullifier_store import NullifierStore, BloomFilter, nullifier_digest
+"python3 -m pytest tests/test_nullifier_store.py -v"
+
+@pytest.fixture
+def store(tmp_path):
+    return NullifierStore(str(tmp_path / "used_serials.db"), capacity=1000)
+
+def test_check_and_insert(store):
+    """测试首次使用与重复使用"""
+    assert not store.contains("shareholder_001")
+    assert store.check_and_insert("shareholder_001")
+    assert store.contains("shareholder_001")
+    assert not store.check_and_insert("shareholder_001")
+    assert len(store) == 1
+
+def test_shared_between_instances(tmp_path):
+    """测试多个实例（模拟多个工作进程）共享状态"""
+    path = str(tmp_path / "used_serials.db")
+    worker1 = NullifierStore(path, capacity=1000)
+    worker2 = NullifierStore(path, capacity=1000)
+
+    assert worker1.check_and_insert(12345)
+    # worker2 的Bloom过滤器尚未包含该记录，仍需拒绝
+    assert not worker2.check_and_insert(12345)
+    assert worker2.contains(12345)
+
+    # 重启后从磁盘加载
+    restarted = NullifierStore(path, capacity=1000)
+    assert restarted.contains(12345)
+    assert not restarted.contains(54321)
+
+def test_clear(store):
+    """测试清空"""
+    for i in range(10):
+        assert store.check_and_insert(i)
+    store.clear()
+    assert len(store) == 0
+    assert store.check_and_insert(3)
+
+def test_remove_many(store):
+    """测试撤销登记后序列号可以再次使用（Bloom 命中由数据库确认）"""
+    assert store.check_and_insert_many([1, 2, 3]) == [True, True, True]
+    store.remove_many([1, 3])
+    assert len(store) == 1
+    assert not store.contains(1)
+    assert store.check_and_insert_many([1, 2, 3]) == [True, False, True]
+
+def test_bloom_filter():
+    """Bloom过滤器无漏报，误报率接近设定值"""
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    for i in range(2000):
+        bloom.add(nullifier_digest(i))
+    assert all(nullifier_digest(i) in bloom for i in range(2000))
+    false_positives = sum(nullifier_digest(f"x{i}") in bloom for i in range(2000))
+    assert false_positives < 2000 * 0.03
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,89 @@
+import pytest
+import io
+import json
+from backend.auth.registry import ShareholderRegistry
+from backend.models.vote import Voter
+"python3 -m pytest tests/test_registry.py -v"
+
+@pytest.fixture
+def registry(tmp_path):
+    return ShareholderRegistry(str(tmp_path / "shareholders.db"))
+
+def test_add_and_get(registry):
+    """测试登记与查询"""
+    voter = Voter(name="张三", uuid="u-1", voter_id="shareholder_001", voter_type="shareholder", weight=5)
+    assert registry.add(voter)
+    assert not registry.add(voter)  # 重复ID
+    assert registry.get("shareholder_001") == voter
+    assert "shareholder_001" in registry
+    assert registry.get("nobody") is None
+    assert len(registry) == 1
+
+def test_bulk_import_csv(registry):
+    """测试CSV流式批量导入"""
+    rows = ["voter_id,name,weight"]
+    rows += [f"sh_{i:05d},股东{i},{i % 7 + 1}" for i in range(2500)]
+    rows.append("sh_bad,坏数据,not_a_number")
+    stream = io.StringIO("\n".join(rows) + "\n")
+
+    result = registry.import_stream(stream, "csv")
+    assert result["imported"] == 2500
+    assert result["rejected"] == 1
+    assert registry.get("sh_00042").weight == 42 % 7 + 1
+
+def test_bulk_import_rejects_existing(registry):
+    """默认模式下已登记的股东ID作为错误行拒绝，不修改原记录"""
+    registry.bulk_import([{"voter_id": "a", "name": "A", "weight": 1}])
+    result = registry.bulk_import([{"voter_id": "a", "name": "X", "weight": 100000},
+                                   {"voter_id": "b", "name": "B", "weight": 2},
+                                   {"voter_id": "c", "weight": 3}])
+    assert result["imported"] == 1 and result["rejected"] == 2
+    assert [e["line"] for e in result["errors"]] == [1, 3]
+    voter = registry.get("a")
+    assert voter.weight == 1 and voter.name == "A"
+    assert "c" not in registry
+
+def test_bulk_import_updates_existing(registry):
+    """upsert 模式更新权重并保留uuid；缺少姓名时保留原姓名"""
+    registry.bulk_import([{"voter_id": "a", "name": "A", "weight": 1, "uuid": "keep"}])
+    registry.bulk_import([{"voter_id": "a", "name": "A2", "weight": 9}], mode="upsert")
+    voter = registry.get("a")
+    assert voter.weight == 9 and voter.name == "A2" and voter.uuid == "keep"
+
+    result = registry.bulk_import([{"voter_id": "a", "weight": 4}, {"voter_id": "new", "weight": 1}],
+                                  mode="upsert")
+    assert result["imported"] == 1 and result["errors"][0]["error"] == "Missing name"
+    voter = registry.get("a")
+    assert voter.weight == 4 and voter.name == "A2"
+
+def test_pagination(registry):
+    """测试键集分页"""
+    registry.bulk_import({"voter_id": f"v{i:03d}", "name": "x", "weight": 1} for i in range(25))
+    seen = []
+    after = None
+    while True:
+        page = registry.list(limit=10, after=after)
+        seen += [v.voter_id for v in page]
+        if len(page) < 10:
+            break
+        after = page[-1].voter_id
+    assert seen == [f"v{i:03d}" for i in range(25)]
+
+def test_seed_from_legacy_json(tmp_path):
+    """名册为空时从旧版JSON导入"""
+    seed = tmp_path / "shareholders.json"
+    seed.write_text(json.dumps({"shareholders": {
+        "s1": {"name": "张三", "uuid": "u1", "voter_id": "s1", "voter_type": "shareholder", "weight": 5}
+    }}))
+    registry = ShareholderRegistry(str(tmp_path / "r.db"), seed_file=str(seed))
+    assert registry.get("s1").uuid == "u1"
+
+def test_reserve_credentials(registry):
+    """凭证签发次数达到上限后不再登记，同一批内也逐次计数"""
+    assert registry.reserve_credentials(["s1", "s2", "s1", "s1"], 2) == [True, True, True, False]
+    assert registry.reserve_credentials(["s1", "s2"], 2) == [False, True]
+    assert registry.credentials_issued("s1") == 2
+    assert registry.credentials_issued("nobody") == 0
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
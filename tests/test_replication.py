@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import threading
+import traceback
+import pytest
+from werkzeug.serving import make_server
+from backend import tally_server
+from backend.crypto.elgamal import ExponentialElGamal
+from backend.metrics import REPLICATION_LAG_RECORDS
+from backend.replication import Follower, ReplicationError
+from backend.auth.nullifier_store import credential_id
+from backend.storage import vote_db
+from backend.storage.vote_db import clear_votes, get_checkpoint, replicate_log, store_vote
+from backend.tally.controller import CredentialVerifier as WeightSigner
+from backend.vote.weighted_encrypt import encrypt_ballot
+"python3 -m pytest tests/test_replication.py -v"
+
+@pytest.fixture(autouse=True)
+def cleanup():
+    clear_votes()
+    yield
+    clear_votes()
+
+@pytest.fixture
+def leader_url():
+    """在后台线程中运行主节点（计票服务器）"""
+    server = make_server("127.0.0.1", 0, tally_server.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+def _store_ballots(count, weight=2):
+    public_key = ExponentialElGamal().public_key
+    signer = WeightSigner()
+    for i in range(count):
+        weight_signature = signer.sign_weight(credential_id(f"replica_{i}"), weight)
+        ballot = encrypt_ballot(public_key, i % 2, weight, weight_signature)
+        store_vote(ballot["ciphertext"], ballot["zkp"], ballot["weight_signature"])
+
+def _use_storage(path):
+    """让子进程中的 vote_db 使用从节点自己的存储目录"""
+    vote_db.STORAGE_DIR = path
+    vote_db.VOTE_LOG_PATH = os.path.join(path, "votes.log")
+    vote_db.VOTE_INDEX_PATH = os.path.join(path, "votes.idx")
+    vote_db.SNAPSHOT_PATH = os.path.join(path, "snapshot.json")
+    vote_db.RECEIPT_INDEX_PATH = os.path.join(path, "receipts.db")
+    vote_db.LEGACY_VOTE_DB_PATH = os.path.join(path, "votes.json")
+
+def _run_follower(storage_dir, leader_url, results, resume, seed_votes):
+    """从节点子进程：同步两轮，每轮结束后把结果交给测试进程"""
+    try:
+        _use_storage(storage_dir)
+        if seed_votes:
+            store_vote({"alpha": "5", "beta": "7"}, {"data": "local"}, "weight_1")
+        from backend import follower_server
+        client = follower_server.app.test_client()
+        follower = follower_server.follower = Follower(leader_url)
+        for _ in range(2):
+            try:
+                applied = follower.sync_once()
+            except ReplicationError as e:
+                results.put(("diverged", str(e)))
+                return
+            results.put(("synced", {
+                "applied": applied,
+                "checkpoint": get_checkpoint(),
+                "lag": REPLICATION_LAG_RECORDS.value(),
+                "verify": client.get("/verify/1").get_json(),
+                "export": client.get("/votes?start=2&limit=2").get_json(),
+                "status": client.get("/replication/status").get_json(),
+            }))
+            resume.wait(30)
+    except BaseException:
+        results.put(("error", traceback.format_exc()))
+
+def _start_follower(tmp_path, leader_url, seed_votes=False):
+    ctx = multiprocessing.get_context("fork")
+    results, resume = ctx.Queue(), ctx.Event()
+    process = ctx.Process(target=_run_follower,
+                          args=(str(tmp_path), leader_url, results, resume, seed_votes))
+    process.start()
+    return process, results, resume
+
+def test_follower_replicates_log(tmp_path, leader_url):
+    """测试从节点拉取日志、核对检查点并提供只读验证和导出"""
+    _store_ballots(4)
+    process, results, resume = _start_follower(tmp_path, leader_url)
+    try:
+        kind, first = results.get(timeout=60)
+        assert kind == "synced", first
+        assert first["applied"] == 4
+        assert first["checkpoint"] == get_checkpoint()
+        assert first["lag"] == 0
+        assert first["verify"]["verified"] is True
+        assert [r["index"] for r in first["export"]["records"]] == [2, 3]
+        assert first["export"]["merkle_root"] == get_checkpoint()["merkle_root"]
+
+        # 主节点继续写入后，从节点只拉取新增部分
+        _store_ballots(3)
+        resume.set()
+        kind, second = results.get(timeout=60)
+        assert kind == "synced", second
+        assert second["applied"] == 3
+        assert second["checkpoint"] == get_checkpoint()
+        assert second["status"]["lag_records"] == 0
+        assert second["status"]["local"]["count"] == 7
+    finally:
+        resume.set()
+        process.join(30)
+    assert process.exitcode == 0
+
+def test_diverged_follower_stops(tmp_path, leader_url):
+    """测试从节点本地日志与主节点不一致时停止复制"""
+    _store_ballots(3)
+    process, results, resume = _start_follower(tmp_path, leader_url, seed_votes=True)
+    try:
+        kind, detail = results.get(timeout=60)
+        assert kind == "diverged", detail
+    finally:
+        resume.set()
+        process.join(30)
+
+def test_incomplete_transfer_rolled_back():
+    """测试传输不完整时撤销本次追加"""
+    _store_ballots(2)
+    before = get_checkpoint()
+    size = os.path.getsize(vote_db.VOTE_LOG_PATH)
+    with pytest.raises(ValueError):
+        replicate_log([b'{"index": 2, '], before["log_offset"], 100)
+    assert os.path.getsize(vote_db.VOTE_LOG_PATH) == size
+    assert get_checkpoint() == before
+
+def test_replication_log_endpoint():
+    """测试主节点日志接口：检查点响应头和非记录边界的偏移"""
+    _store_ballots(2)
+    client = tally_server.app.test_client()
+    checkpoint = get_checkpoint()
+    response = client.get("/replication/log?offset=0")
+    assert response.status_code == 200
+    assert len(response.data) == checkpoint["log_offset"]
+    assert response.headers["X-Vote-Count"] == "2"
+    assert response.headers["X-Chain-Head"] == checkpoint["chain_head"]
+
+    response = client.get(f"/replication/log?offset={checkpoint['log_offset']}")
+    assert response.data == b""
+    assert client.get("/replication/log?offset=3").status_code == 416
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
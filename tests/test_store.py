@@ -1,8 +1,12 @@
 import pytest
 import json
+import multiprocessing
 import os
-from backend.storage.vote_db import init_vote_db, store_vote, get_all_votes, clear_votes
+from backend.storage import vote_db
+from backend.storage.vote_db import init_vote_db, store_vote, store_votes_batch, get_all_votes, clear_votes, get_vote, find_vote_by_receipt
+from backend.storage.receipt_index import DuplicateBallotError
 from backend.storage.merkle_tree import MerkleTree
+from backend.storage.hash_chain import HashChain, GENESIS_HASH
 from datetime import datetime
 "python3 -m pytest tests/test_store.py -v"
 
@@ -163,5 +167,146 @@ def test_error_handling():
             weight_signature="test"
         )
 
+def test_restart_from_snapshot(monkeypatch):
+    """测试从快照加日志尾部恢复"""
+    monkeypatch.setattr(vote_db, "SNAPSHOT_INTERVAL", 4)
+    for i in range(10):
+        store_vote(
+            ciphertext={"alpha": str(i + 2), "beta": str(i + 3)},
+            zkp={"data": str(i)},
+            weight_signature=str(i)
+        )
+    before = vote_db.get_storage_state()
+    assert os.path.exists(vote_db.SNAPSHOT_PATH)
+    with open(vote_db.SNAPSHOT_PATH) as f:
+        assert json.load(f)["count"] == 8
+
+    # 模拟重启：重新加载快照并重放尾部2票
+    init_vote_db()
+    assert vote_db.get_storage_state() == before
+
+    stored_data = get_all_votes()
+    expected_root = MerkleTree([json.dumps(v, sort_keys=True) for v in stored_data["votes"]]).get_root()
+    assert stored_data["merkle_root"] == expected_root
+
+    # 重启后继续追加，哈希链和索引保持连续
+    result = store_vote({"alpha": "99", "beta": "98"}, {"data": "x"}, "sig")
+    assert result["index"] == 10
+    assert get_vote(10)["vote_hash"] == result["vote_hash"]
+    assert get_vote(3)["vote"] == get_all_votes()["votes"][3]
+
+def test_recover_truncated_log():
+    """测试日志末尾不完整记录的恢复"""
+    for i in range(3):
+        store_vote({"alpha": str(i + 1), "beta": "1"}, {"data": str(i)}, "sig")
+    with open(vote_db.VOTE_LOG_PATH, "ab") as f:
+        f.write(b'{"index": 3, "vote"')
+
+    init_vote_db()
+    assert vote_db.get_storage_state()["count"] == 3
+    result = store_vote({"alpha": "7", "beta": "1"}, {"data": "3"}, "sig")
+    assert result["index"] == 3
+    assert len(get_all_votes()["votes"]) == 4
+
+def test_receipt_lookup():
+    """测试按回执查找投票"""
+    results = [
+        store_vote({"alpha": str(i + 1), "beta": "5"}, {"data": str(i)}, "sig")
+        for i in range(5)
+    ]
+    for i, result in enumerate(results):
+        assert find_vote_by_receipt(result["vote_hash"])["index"] == i
+        found = find_vote_by_receipt(result["receipt_code"])
+        assert found == {"index": i, "vote_hash": result["vote_hash"]}
+
+    assert find_vote_by_receipt("0" * 64) is None
+    assert find_vote_by_receipt("not-a-code") is None
+
+def test_duplicate_ciphertext_rejected():
+    """测试拒绝完全相同的密文重放"""
+    store_vote({"alpha": "11", "beta": "12"}, {"data": "0"}, "sig")
+    with pytest.raises(DuplicateBallotError):
+        store_vote({"alpha": "11", "beta": "12"}, {"data": "1"}, "sig")
+    assert len(get_all_votes()["votes"]) == 1
+
+def _ballot(i):
+    return {"ciphertext": {"alpha": str(i + 2), "beta": str(i + 3)}, "zkp": {"data": str(i)}, "weight_signature": "sig"}
+
+def test_store_votes_batch():
+    """测试批量存储：一次写入，重复密文跳过"""
+    store_vote(**_ballot(0))
+    results = store_votes_batch([_ballot(1), _ballot(0), _ballot(2), _ballot(1)])
+
+    assert results[1] is None and results[3] is None
+    assert [results[0]["index"], results[2]["index"]] == [1, 2]
+    votes = get_all_votes()["votes"]
+    assert len(votes) == 3
+    # 每张选票的证明都对应整批写入后的 Merkle 根
+    leaves = [json.dumps(v, sort_keys=True) for v in votes]
+    root = MerkleTree(leaves).get_root()
+    for result in (results[0], results[2]):
+        assert result["merkle_root"] == root
+        assert MerkleTree.verify_proof(leaves[result["index"]], result["merkle_proof"], root)
+    assert find_vote_by_receipt(results[2]["receipt_code"])["index"] == 2
+    assert get_vote(2)["batch"] == {"start": 1, "size": 2}
+
+    # 格式无效时整批不写入
+    with pytest.raises(ValueError):
+        store_votes_batch([_ballot(5), {"ciphertext": {"alpha": "x"}, "zkp": {}, "weight_signature": "sig"}])
+    assert vote_db.get_storage_state()["count"] == 3
+
+def test_recover_incomplete_batch(monkeypatch):
+    """测试恢复时丢弃写入不完整的批次"""
+    store_votes_batch([_ballot(0), _ballot(1)])
+    size = os.path.getsize(vote_db.VOTE_LOG_PATH)
+
+    # 模拟写入日志后崩溃，且日志只落盘了批次的前两条
+    def crash(record):
+        raise RuntimeError("crash")
+    with monkeypatch.context() as m:
+        m.setattr(vote_db, "_apply_record", crash)
+        with pytest.raises(RuntimeError):
+            store_votes_batch([_ballot(2), _ballot(3), _ballot(4)])
+    with open(vote_db.VOTE_LOG_PATH, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    with open(vote_db.VOTE_LOG_PATH, "wb") as f:
+        f.write(b"".join(lines[:-1]))
+
+    init_vote_db()
+    assert vote_db.get_storage_state()["count"] == 2
+    assert os.path.getsize(vote_db.VOTE_LOG_PATH) == size
+    assert store_vote(**_ballot(2))["index"] == 2
+
+def _store_in_worker(worker, count):
+    for i in range(count):
+        store_vote({"alpha": str(1000 * worker + i), "beta": "3"}, {"data": str(i)}, f"w{worker}")
+
+def test_multiple_worker_processes():
+    """测试多个工作进程共享同一份存储：哈希链、Merkle 根和回执保持一致"""
+    store_vote(**_ballot(0))
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_store_in_worker, args=(w, 10)) for w in range(1, 4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+        assert p.exitcode == 0
+
+    # 父进程追上其他进程追加的投票
+    state = vote_db.get_storage_state()
+    assert state["count"] == 31
+    votes = get_all_votes()["votes"]
+    assert state["merkle_root"] == MerkleTree([json.dumps(v, sort_keys=True) for v in votes]).get_root()
+    head = GENESIS_HASH
+    for i, vote in enumerate(votes):
+        head = HashChain.next_hash(head, json.dumps(vote, sort_keys=True))
+        assert get_vote(i)["vote_hash"] == head
+    assert state["chain_head"] == head
+    assert find_vote_by_receipt(get_vote(20)["vote_hash"])["index"] == 20
+
+    assert store_vote(**_ballot(1))["index"] == 31
+    with pytest.raises(DuplicateBallotError):
+        store_vote({"alpha": "2005", "beta": "3"}, {"data": "x"}, "sig")
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
\ No newline at end of file
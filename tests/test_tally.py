@@ -1,8 +1,10 @@
 import pytest
-from backend.tally.controller import TallyController
+from backend.tally.controller import TallyController, CredentialVerifier
 from backend.storage.vote_db import store_vote, clear_votes
 from backend.crypto.elgamal import ElGamalCiphertext
+from backend.auth.nullifier_store import credential_id
 import json
+import random
 
 @pytest.fixture
 def tally_controller():
@@ -16,6 +18,10 @@ def setup_and_cleanup():
     yield
     clear_votes()
 
+def _weight_signature(weight=1):
+    """为随机凭证签发权重签名"""
+    return CredentialVerifier().sign_weight(credential_id(random.getrandbits(128)), weight)
+
 def test_tally_initialization(tally_controller):
     """测试计票控制器初始化"""
     assert tally_controller.elgamal is not None
@@ -37,7 +43,7 @@ def test_single_vote_tally(tally_controller):
     store_vote(
         ciphertext={"alpha": str(ciphertext.alpha), "beta": str(ciphertext.beta)},
         zkp={"r": str(r), "plaintext": str(plaintext)},  # 存储r便于验证
-        weight_signature="test_weight"
+        weight_signature=_weight_signature()
     )
     
     result = tally_controller.tally_votes()
@@ -60,7 +66,7 @@ def test_multiple_votes_tally(tally_controller):
         vote_data = store_vote(
             ciphertext={"alpha": str(ciphertext.alpha), "beta": str(ciphertext.beta)},
             zkp={"r": str(r), "plaintext": str(plaintext)},
-            weight_signature="1"  # 权重为1
+            weight_signature=_weight_signature(1)  # 权重为1
         )
         votes.append(vote_data)
     
@@ -85,7 +91,7 @@ def test_weighted_tally(tally_controller):
         store_vote(
             ciphertext={"alpha": str(ciphertext.alpha), "beta": str(ciphertext.beta)},
             zkp={"r": str(r), "plaintext": str(plaintext)},
-            weight_signature=f"weight_{weight}"
+            weight_signature=_weight_signature(weight)
         )
     
     result = tally_controller.tally_votes()
@@ -108,13 +114,13 @@ def test_homomorphic_properties(tally_controller):
     vote1 = store_vote(
         ciphertext={"alpha": str(cipher1.alpha), "beta": str(cipher1.beta)},
         zkp={"r": str(r1), "plaintext": str(plaintext1)},
-        weight_signature="1"
+        weight_signature=_weight_signature()
     )
     
     vote2 = store_vote(
         ciphertext={"alpha": str(cipher2.alpha), "beta": str(cipher2.beta)},
         zkp={"r": str(r2), "plaintext": str(plaintext2)},
-        weight_signature="1"
+        weight_signature=_weight_signature()
     )
     
     result = tally_controller.tally_votes()
@@ -124,6 +130,25 @@ def test_homomorphic_properties(tally_controller):
     assert result["result"] == plaintext1 + plaintext2  # 验证同态加法正确性
     assert "proof" in result
 
+def test_invalid_weight_signature_dropped(tally_controller):
+    """测试计票时重新验证权重签名，未签名或篡改权重的选票不计入"""
+    elgamal = tally_controller.elgamal
+    signed = _weight_signature(3)
+    _, weight, cid, signature = signed.split("_")
+    for weight_signature in (signed, "weight_5", f"weight_9_{cid}_{signature}"):
+        r, ciphertext = elgamal.encrypt(3)
+        store_vote(
+            ciphertext={"alpha": str(ciphertext.alpha), "beta": str(ciphertext.beta)},
+            zkp={"r": str(r)},
+            weight_signature=weight_signature
+        )
+
+    result = tally_controller.tally_votes()
+    assert result["total_votes"] == 1
+    assert result["total_weight"] == 3
+    assert result["rejected_votes"] == 2
+    assert result["result"] == 3
+
 def test_tally_proof_verification(tally_controller):
     """测试计票证明验证"""
     elgamal = tally_controller.elgamal
@@ -133,7 +158,7 @@ def test_tally_proof_verification(tally_controller):
     store_vote(
         ciphertext={"alpha": str(ciphertext.alpha), "beta": str(ciphertext.beta)},
         zkp={"r": str(r), "plaintext": str(plaintext)},
-        weight_signature="test"
+        weight_signature=_weight_signature()
     )
     
     result = tally_controller.tally_votes()
@@ -0,0 +1,181 @@
+import pytest
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from backend.tally_asgi import TallyASGIApp
+from backend.auth.auth import CredentialVerifier
+from backend.auth.nullifier_store import NullifierStore
+from backend.storage import vote_db
+from backend.storage.vote_db import clear_votes
+from backend.tally.controller import CredentialVerifier as WeightSigner
+from backend.vote.weighted_encrypt import encrypt_ballot, public_key_from_dict
+"python3 -m pytest tests/test_tally_asgi.py -v"
+
+@pytest.fixture
+def app(tmp_path):
+    """使用线程池代替进程池，便于在测试中运行"""
+    clear_votes()
+    executor = ThreadPoolExecutor(max_workers=2)
+    app = TallyASGIApp(
+        crypto_executor=executor,
+        nullifier_store=NullifierStore(str(tmp_path / "used_serials.db"))
+    )
+    yield app
+    app.shutdown()
+    clear_votes()
+
+def _request(app, method, path, data=None):
+    """直接按 ASGI 协议调用应用，返回 (状态码, JSON)"""
+    body = json.dumps(data).encode() if data is not None else b""
+    scope = {"type": "http", "method": method, "path": path}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    status = sent[0]["status"]
+    return status, json.loads(b"".join(m.get("body", b"") for m in sent[1:]))
+
+def test_submit_and_tally(app):
+    """测试加密、提交与验证"""
+    status, vote = _request(app, "POST", "/encrypt", {"vote": 1, "weight": 1})
+    assert status == 200
+    assert "ciphertext" in vote
+
+    # 提交附带权重签名的选票
+    verifier = CredentialVerifier()
+    credential = verifier.generate_credential()
+    _, public_key = _request(app, "GET", "/public_key")
+    weight_signature = WeightSigner().sign_weight(verifier.credential_id(credential), 1)
+    vote = encrypt_ballot(public_key_from_dict(public_key), 1, 1, weight_signature)
+    status, result = _request(app, "POST", "/submit", {
+        "encrypted_vote": vote,
+        "credential": credential,
+        "voter_id": "test_voter"
+    })
+    assert status == 200
+    assert result["vote_index"] == 0
+    assert "receipt_code" in result
+
+    # 同一凭证不能再次使用
+    status, _ = _request(app, "POST", "/submit", {
+        "encrypted_vote": vote,
+        "credential": credential,
+        "voter_id": "test_voter"
+    })
+    assert status == 403
+
+    status, result = _request(app, "GET", "/verify/0")
+    assert status == 200
+    assert result["verified"]
+
+def test_credential_kept_after_rejected_store(app, monkeypatch):
+    """测试选票被拒绝为重复密文（409）或存储失败时撤销防重登记，凭证仍可使用"""
+    verifier = CredentialVerifier()
+    credential = verifier.generate_credential()
+    _, key = _request(app, "GET", "/public_key")
+    public_key = public_key_from_dict(key)
+    weight_signature = WeightSigner().sign_weight(verifier.credential_id(credential), 2)
+
+    duplicate = encrypt_ballot(public_key, 1, 2, weight_signature)
+    vote_db.store_vote(**duplicate)
+    request = {"encrypted_vote": duplicate, "credential": credential, "voter_id": "x"}
+    assert _request(app, "POST", "/submit", request)[0] == 409
+
+    def fail(**kwargs):
+        raise OSError("disk full")
+    request["encrypted_vote"] = encrypt_ballot(public_key, 1, 2, weight_signature)
+    with monkeypatch.context() as m:
+        m.setattr("backend.tally_asgi.store_vote", fail)
+        assert _request(app, "POST", "/submit", request)[0] == 500
+
+    status, result = _request(app, "POST", "/submit", request)
+    assert (status, result["vote_index"]) == (200, 1)
+
+def test_invalid_requests(app):
+    """测试无效请求"""
+    status, _ = _request(app, "POST", "/submit", {"voter_id": "x"})
+    assert status == 400
+
+    credential = {"serial_number": 5, "signature": 7}
+    weight_signature = WeightSigner().sign_weight(CredentialVerifier().credential_id(credential), 1)
+    status, _ = _request(app, "POST", "/submit", {
+        "encrypted_vote": {"ciphertext": {}, "zkp": {}, "weight_signature": weight_signature},
+        "credential": credential,
+        "voter_id": "x"
+    })
+    assert status == 400
+
+    status, public_key = _request(app, "GET", "/public_key")
+    assert status == 200
+    ballot = encrypt_ballot(public_key_from_dict(public_key), 1, 1)
+    status, result = _request(app, "POST", "/submit", {
+        "encrypted_vote": ballot, "credential": credential, "voter_id": "x"
+    })
+    assert (status, result) == (403, {"error": "Invalid weight signature"})
+
+    status, result = _request(app, "POST", "/submit", {
+        "encrypted_vote": dict(ballot, weight_signature=weight_signature), "credential": credential, "voter_id": "x"
+    })
+    assert (status, result) == (403, {"error": "Invalid credential"})
+
+    status, _ = _request(app, "GET", "/submit")
+    assert status == 405
+
+    status, _ = _request(app, "GET", "/nowhere")
+    assert status == 404
+
+def test_submit_batch(app):
+    """测试批量提交"""
+    _, key = _request(app, "GET", "/public_key")
+    public_key = public_key_from_dict(key)
+    verifier = CredentialVerifier()
+    weight_signer = WeightSigner()
+    ballots = []
+    for i in range(3):
+        credential = verifier.generate_credential()
+        weight_signature = weight_signer.sign_weight(verifier.credential_id(credential), 2)
+        ballots.append({
+            "encrypted_vote": encrypt_ballot(public_key, 1, 2, weight_signature),
+            "credential": credential,
+            "voter_id": f"proxy_{i}"
+        })
+    ballots.append(dict(ballots[0], encrypted_vote=encrypt_ballot(
+        public_key, 0, 2, ballots[0]["encrypted_vote"]["weight_signature"])))
+
+    status, result = _request(app, "POST", "/submit_batch", {"ballots": ballots})
+    assert status == 200
+    assert result["accepted"] == 3
+    assert [r.get("vote_index") for r in result["results"]] == [0, 1, 2, None]
+    assert result["results"][3]["status"] == 403
+
+def test_startup_off_event_loop(app, monkeypatch):
+    """未经 lifespan 时由第一个请求启动：只启动一次，且不在事件循环线程中执行"""
+    import threading
+    started = []
+    original = app._startup
+    monkeypatch.setattr(app, "_startup", lambda: (started.append(threading.get_ident()), original()))
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def two_requests():
+        scope = {"type": "http", "method": "GET", "path": "/public_key"}
+        await asyncio.gather(app(scope, receive, send), app(scope, receive, send))
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(two_requests())
+    assert len(started) == 1 and started[0] != loop_thread
+    assert _request(app, "GET", "/public_key")[0] == 200
+    assert len(started) == 1
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
@@ -0,0 +1,125 @@
+import json
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from backend import tally_server
+from backend.auth.auth import CredentialVerifier
+from backend.auth.nullifier_store import NullifierStore
+from backend.storage import vote_db
+from backend.storage.merkle_tree import MerkleTree
+from backend.storage.vote_db import clear_votes, get_all_votes
+from backend.tally import batch
+from backend.tally.controller import CredentialVerifier as WeightSigner
+from backend.vote.weighted_encrypt import encrypt_ballot
+"python3 -m pytest tests/test_tally_batch.py -v"
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    clear_votes()
+    monkeypatch.setattr(
+        tally_server.credential_verifier, "used_serials",
+        NullifierStore(str(tmp_path / "used_serials.db"))
+    )
+    yield tally_server.app.test_client()
+    clear_votes()
+
+def _ballots(count):
+    public_key = tally_server.vote_controller.elgamal.public_key
+    verifier = CredentialVerifier()
+    weight_signer = WeightSigner()
+    ballots = []
+    for i in range(count):
+        credential = verifier.generate_credential()
+        weight_signature = weight_signer.sign_weight(verifier.credential_id(credential), i + 1)
+        ballots.append({
+            "encrypted_vote": encrypt_ballot(public_key, i % 2, i + 1, weight_signature),
+            "credential": credential,
+            "voter_id": f"proxy_{i}"
+        })
+    return ballots
+
+def test_submit_batch(client):
+    """测试批量提交：有效选票一次性存储，无效选票逐个返回错误"""
+    ballots = _ballots(4)
+    public_key = tally_server.vote_controller.elgamal.public_key
+    weight_signature = ballots[2]["encrypted_vote"]["weight_signature"]
+    unsigned = dict(ballots[2], encrypted_vote=encrypt_ballot(public_key, 1, 9))
+    rebound = dict(ballots[2], encrypted_vote=ballots[3]["encrypted_vote"])
+    wrong_proof = dict(ballots[2], encrypted_vote=dict(encrypt_ballot(public_key, 1, 9),
+                                                       weight_signature=weight_signature))
+    reused = dict(ballots[1], encrypted_vote=_ballots(2)[1]["encrypted_vote"])
+    reused["encrypted_vote"]["weight_signature"] = ballots[1]["encrypted_vote"]["weight_signature"]
+    request = ballots + [unsigned, rebound, wrong_proof, reused, {"voter_id": "x"}]
+
+    response = client.post("/submit_batch", json={"ballots": request})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["accepted"] == 4
+    assert data["rejected"] == 5
+
+    results = data["results"]
+    assert [r["vote_index"] for r in results[:4]] == [0, 1, 2, 3]
+    assert all(r["receipt_code"] and r["merkle_proof"] is not None for r in results[:4])
+    # 未签名的权重、绑定其他凭证的权重签名都被拒绝；证明须对应签名的权重
+    assert results[4] == {"success": False, "error": "Invalid weight signature", "status": 403}
+    assert results[5] == {"success": False, "error": "Invalid weight signature", "status": 403}
+    assert results[6] == {"success": False, "error": "Invalid ZKP", "status": 400}
+    assert results[7] == {"success": False, "error": "Invalid credential", "status": 403}
+    assert results[8]["status"] == 400
+    assert len(get_all_votes()["votes"]) == 4
+
+    # 全部证明都对应整批写入后的根
+    assert data["merkle_root"] == get_all_votes()["merkle_root"]
+    for r in results[:4]:
+        leaf = json.dumps(get_all_votes()["votes"][r["vote_index"]], sort_keys=True)
+        assert MerkleTree.verify_proof(leaf, r["merkle_proof"], data["merkle_root"])
+
+    # 已存储的选票可以逐个验证
+    assert client.get("/verify/3").get_json()["verified"]
+
+def test_submit_batch_invalid_request(client):
+    """测试无效的批量请求"""
+    assert client.post("/submit_batch", json={"ballots": []}).status_code == 400
+    assert client.post("/submit_batch", json={"vote": 1}).status_code == 400
+
+def test_submit_batch_store_failure_keeps_credentials(client, monkeypatch):
+    """测试存储失败或被拒绝为重复密文时撤销防重登记，凭证可以重新提交"""
+    ballots = _ballots(3)
+
+    def fail(_):
+        raise OSError("disk full")
+    with monkeypatch.context() as m:
+        m.setattr(vote_db, "store_votes_batch", fail)
+        assert client.post("/submit_batch", json={"ballots": ballots}).status_code == 500
+
+    # 第三张选票的密文与第一张相同：被拒绝后其凭证仍可使用
+    weight_signature = WeightSigner().sign_weight(CredentialVerifier().credential_id(ballots[2]["credential"]), 1)
+    duplicate = dict(ballots[2], encrypted_vote=dict(ballots[0]["encrypted_vote"], weight_signature=weight_signature))
+    data = client.post("/submit_batch", json={"ballots": ballots[:2] + [duplicate]}).get_json()
+    assert data["accepted"] == 2
+    assert data["results"][2]["status"] == 409
+
+    data = client.post("/submit_batch", json={"ballots": [ballots[2]]}).get_json()
+    assert data["accepted"] == 1
+    assert data["results"][0]["vote_index"] == 2
+
+def test_check_ballots_parallel(monkeypatch):
+    """测试分块并行验证与单进程验证结果一致"""
+    monkeypatch.setattr(batch, "MIN_CHUNK_SIZE", 2)
+    ballots = _ballots(7)
+    # 凭证签名无效（权重签名仍绑定该凭证）
+    ballots[3]["credential"] = {"serial_number": 5, "signature": 7}
+    ballots[3]["encrypted_vote"]["weight_signature"] = WeightSigner().sign_weight(
+        CredentialVerifier().credential_id(ballots[3]["credential"]), 4)
+    ballots[4]["encrypted_vote"]["weight_signature"] = "weight_5"
+    # 签发凭证自带的权重与签名的权重不符
+    ballots[5]["credential"] = dict(ballots[5]["credential"], weight=1)
+
+    expected = batch.check_ballots(ballots)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert batch.check_ballots(ballots, executor, workers=2) == expected
+    assert [weight_ok for weight_ok, _, _ in expected] == [True, True, True, True, False, False, True]
+    assert [ok for _, ok, _ in expected] == [True, True, True, True, False, False, True]
+    assert [nullifier is not None for _, _, nullifier in expected] == [True, True, True, False, False, False, True]
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])
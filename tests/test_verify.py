@@ -3,6 +3,9 @@ from backend.verify.controller import VerifyController
 from backend.storage.vote_db import store_vote, clear_votes
 from backend.crypto.elgamal import ExponentialElGamal
 from backend.crypto.OR_Proof import ORProof
+from backend.vote.weighted_encrypt import prove_ballot
+from backend.tally.controller import CredentialVerifier as WeightSigner
+from backend.auth.nullifier_store import credential_id
 import random
 
 @pytest.fixture
@@ -22,26 +25,37 @@ def test_verify_valid_vote(verify_controller):
     plaintext = 1
     r, ciphertext = elgamal.encrypt(plaintext)
     
-    # 生成ZKP
-    prover = ORProof(elgamal.public_key)
-    com1, com2 = prover.generate_proof_step1(plaintext, (ciphertext.alpha, ciphertext.beta))
-    challenge = random.randint(1, elgamal.pk.p - 1)
-    cha1, resp1, cha2, resp2 = prover.generate_proof_step2(challenge, r)
+    # 生成ZKP（挑战由 Fiat-Shamir 哈希计算）
+    zkp = prove_ballot(elgamal.public_key, plaintext, 1, r, ciphertext)
     
     # 存储投票
     vote_data = store_vote(
         ciphertext={"alpha": str(ciphertext.alpha), "beta": str(ciphertext.beta)},
-        zkp={
-            "com1": com1,
-            "com2": com2,
-            "cha1": str(cha1),
-            "cha2": str(cha2),
-            "resp1": str(resp1),
-            "resp2": str(resp2)
-        },
-        weight_signature="weight_1"
+        zkp=zkp,
+        weight_signature=WeightSigner().sign_weight(credential_id(random.getrandbits(128)), 1)
     )
     
     # 验证投票
     result = verify_controller.verify_vote(0)
-    assert result["verified"] == True
\ No newline at end of file
+    assert result["verified"] == True
+
+def test_verify_unsigned_weight(verify_controller):
+    """测试未签名的权重无法通过验证"""
+    elgamal = ExponentialElGamal()
+    r, ciphertext = elgamal.encrypt(1)
+    store_vote(
+        ciphertext={"alpha": str(ciphertext.alpha), "beta": str(ciphertext.beta)},
+        zkp=prove_ballot(elgamal.public_key, 1, 1, r, ciphertext),
+        weight_signature="weight_1"
+    )
+    assert verify_controller.verify_vote(0) == {"verified": False, "error": "Invalid weight"}
+
+def test_verify_batch_limit():
+    """测试批量验证超过上限时返回 413，不做任何验证"""
+    from backend import tally_server
+    from backend.config import VERIFY_BATCH_MAX
+    client = tally_server.app.test_client()
+    response = client.post("/verify/batch", json={"vote_indices": list(range(VERIFY_BATCH_MAX + 1))})
+    assert response.status_code == 413
+    response = client.post("/verify/batch", json={"vote_indices": "0,1"})
+    assert response.status_code == 400
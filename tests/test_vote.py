@@ -2,6 +2,7 @@ import pytest
 from backend.vote.controller import VoteController
 from backend.crypto.elgamal import ElGamalCiphertext
 from backend.crypto.OR_Proof import ORProof
+from backend.vote.weighted_encrypt import ballot_challenge, encrypt_ballot, verify_ballot
 
 @pytest.fixture
 def vote_controller():
@@ -102,5 +103,41 @@ def _verify_vote_data(vote_data):
     # 验证权重签名格式
     assert vote_data['weight_signature'].startswith('weight_')
 
+def test_client_side_weighted_ballot(vote_controller):
+    """测试客户端加密的带权重选票及其证明"""
+    pk = vote_controller.elgamal.public_key
+    for plaintext in (0, 1):
+        ballot = encrypt_ballot(pk, plaintext, 7)
+        assert verify_ballot(pk, ballot["ciphertext"], ballot["zkp"], 7)
+        # 权重不符时证明无效
+        assert not verify_ballot(pk, ballot["ciphertext"], ballot["zkp"], 6)
+
+    # 篡改挑战后证明无效
+    ballot = encrypt_ballot(pk, 1, 3)
+    ballot["zkp"]["cha1"] = str(int(ballot["zkp"]["cha1"]) + 1)
+    assert not verify_ballot(pk, ballot["ciphertext"], ballot["zkp"], 3)
+
+def test_forged_proof_rejected(vote_controller):
+    """测试伪造的证明：子挑战为 0（含模 q 后为 0）的分支或交换分支顺序都不能通过"""
+    pk = vote_controller.elgamal.public_key
+    r, resp1 = 12345, 678
+    ciphertext = (pow(pk.g, r, pk.p), pow(pk.g, 1000000, pk.p) * pow(pk.y, r, pk.p) % pk.p)
+    com1 = (pow(pk.g, resp1, pk.p), pow(pk.y, resp1, pk.p))
+    com2 = (pow(pk.g, 99, pk.p), pow(pk.y, 99, pk.p))
+    challenge = ballot_challenge(pk, ciphertext, com1, com2, 5)
+    encoded = {"alpha": str(ciphertext[0]), "beta": str(ciphertext[1])}
+    for cha1 in (0, pk.q):
+        zkp = {"com1": com1, "com2": com2, "cha1": str(cha1), "cha2": str(challenge - cha1 % pk.q),
+               "resp1": str(resp1), "resp2": "1"}
+        assert not verify_ballot(pk, encoded, zkp, 5)
+
+    # 明文为 weight 的真实证明交换分支后，分支对应的陈述不符
+    ballot = encrypt_ballot(pk, 1, 5)
+    zkp = ballot["zkp"]
+    swapped = {"com1": zkp["com2"], "com2": zkp["com1"], "cha1": zkp["cha2"], "cha2": zkp["cha1"],
+               "resp1": zkp["resp2"], "resp2": zkp["resp1"]}
+    assert verify_ballot(pk, ballot["ciphertext"], zkp, 5)
+    assert not verify_ballot(pk, ballot["ciphertext"], swapped, 5)
+
 if __name__ == "__main__":
-    pytest.main(["-v", __file__])
\ No newline at end of file
+    pytest.main(["-v", __file__])
@@ -0,0 +1,101 @@
+import json
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from backend.storage import vote_db, vote_view
+from backend.storage.merkle_tree import MerkleTree
+from backend.storage.vote_db import clear_votes, store_vote, store_votes_batch
+from backend.storage.vote_view import current_view
+"python3 -m pytest tests/test_vote_view.py -v"
+
+@pytest.fixture(autouse=True)
+def cleanup():
+    clear_votes()
+    yield
+    clear_votes()
+
+def _store(i):
+    return store_vote({"alpha": str(i + 2), "beta": "3"}, {"data": str(i)}, "sig")
+
+def _ballot(i):
+    return {"ciphertext": {"alpha": str(i + 2), "beta": "3"}, "zkp": {"data": str(i)}, "weight_signature": "sig"}
+
+def test_view_versions_are_immutable():
+    """测试日志增长时生成新版本的视图，旧视图保持不变"""
+    for i in range(5):
+        _store(i)
+    old = current_view()
+    assert old.count == 5
+    old_root = old.merkle_root
+
+    _store(5)
+    new = current_view()
+    assert new is not old
+    assert (new.version, old.version) == (6, 5)
+    assert old.merkle_root == old_root and old.vote(5) is None
+    # 新旧视图共享已发布的记录
+    assert new.vote(2) is old.vote(2)
+
+    leaves = [json.dumps(v, sort_keys=True) for v in new.get_votes()]
+    assert new.merkle_root == MerkleTree(leaves).get_root() == vote_db.get_storage_state()["merkle_root"]
+    assert MerkleTree.verify_proof(leaves[3], new.get_proof(3), new.merkle_root)
+
+def test_unchanged_log_not_parsed_again(monkeypatch):
+    """测试日志未变化时直接返回当前视图，增长时只解析新增的尾部"""
+    for i in range(3):
+        _store(i)
+    view = current_view()
+
+    parsed = []
+    original = vote_view._ViewBuilder.read_tail
+    monkeypatch.setattr(vote_view._ViewBuilder, "read_tail",
+                        lambda self, f: parsed.append(self.log_offset) or original(self, f))
+    assert current_view() is view
+    assert vote_db.get_all_votes()["votes"] == view.get_votes()
+    assert parsed == []
+
+    _store(3)
+    assert current_view().count == 4
+    assert parsed == [view.log_offset]
+
+def test_incomplete_tail_hidden():
+    """测试写入中的半条记录和不完整的批次不出现在视图中"""
+    store_votes_batch([_ballot(0), _ballot(1)])
+    with open(vote_db.VOTE_LOG_PATH, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    store_votes_batch([_ballot(2), _ballot(3), _ballot(4)])
+    with open(vote_db.VOTE_LOG_PATH, "rb") as f:
+        batch = f.read().splitlines(keepends=True)[2:]
+
+    # 模拟读取时批次只写入了一部分
+    with open(vote_db.VOTE_LOG_PATH, "wb") as f:
+        f.write(b"".join(lines + batch[:2]) + batch[2][:10])
+    assert current_view().count == 2
+    with open(vote_db.VOTE_LOG_PATH, "ab") as f:
+        f.write(batch[2][10:])
+    assert current_view().count == 5
+
+def test_rebuilt_after_clear():
+    """测试日志被清空后重新建立视图"""
+    for i in range(3):
+        _store(i)
+    old = current_view()
+    clear_votes()
+    assert current_view().count == 0
+    for i in range(3):
+        _store(i + 10)
+    view = current_view()
+    assert view.count == 3 and view.vote(0)["zkp"] == {"data": "10"}
+    assert old.vote(0)["zkp"] == {"data": "0"}
+
+def test_reads_do_not_take_writer_lock():
+    """测试写入者持锁期间读取不被阻塞"""
+    for i in range(3):
+        _store(i)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with vote_db._writer():
+            view = executor.submit(current_view).result(timeout=5)
+            assert view.count == 3
+            assert executor.submit(vote_db.get_all_votes).result(timeout=5)["merkle_root"] == view.merkle_root
+
+if __name__ == "__main__":
+    pytest.main(["-v", __file__])